@@ -1,7 +1,21 @@
 import importlib.metadata
 
 from .inspect import Inspect
-from .core import Element, Constant, Equation, Auxiliary, Time, Function
+from .core import (
+    Element,
+    Constant,
+    Equation,
+    Sum,
+    Product,
+    Auxiliary,
+    Time,
+    Function,
+    Kernel,
+    Apply,
+    exp,
+    log,
+    sqrt,
+)
 from .components import (
     Delay,
     Smooth,
@@ -15,11 +29,17 @@ from .components import (
     Initial,
     Delay2,
     Delay3,
+    DelayN,
+    Conveyor,
     Policy,
     Flow,
+    Coupling,
 )
 from .stock import Stock
 from .model import Model
+from .cache import ModelCache
+from .result import SimulationResult
+from .snapshot import Snapshot
 from .scenario import Scenario, ScenarioRunner
 from .experiment import Experiment
 
@@ -29,6 +49,12 @@ __all__ = [
     "Element",
     "Constant",
     "Equation",
+    "Sum",
+    "Product",
+    "Apply",
+    "exp",
+    "log",
+    "sqrt",
     "Time",
     "Auxiliary",
     "Delay",
@@ -36,6 +62,7 @@ __all__ = [
     "Table",
     "IfThenElse",
     "Function",
+    "Kernel",
     "Min",
     "Max",
     "Pulse",
@@ -44,10 +71,16 @@ __all__ = [
     "Initial",
     "Delay2",
     "Delay3",
+    "DelayN",
+    "Conveyor",
     "Stock",
     "Flow",
     "Model",
+    "ModelCache",
+    "SimulationResult",
+    "Snapshot",
     "Policy",
+    "Coupling",
     "Scenario",
     "ScenarioRunner",
     "Experiment",
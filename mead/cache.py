@@ -0,0 +1,307 @@
+"""On-disk cache of compiled models, so that workers skip compilation."""
+
+from __future__ import annotations
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+import time
+import warnings
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional, Sequence
+
+import numpy as np
+
+from mead.core import Element
+from mead.compiler import _post_order
+from mead.module import Module
+from mead.utils import children
+
+if TYPE_CHECKING:
+    from mead.model import Model
+    from mead.compiler import Plan
+
+# bumped whenever the layout of compiled plans changes
+_FORMAT = 2
+
+
+def _fields(element: Element) -> list[tuple[str, Any]]:
+    """Attributes that define `element`, its derived names and ids left out."""
+    skipped = {"model", "uid"}
+    if element.anonymous:
+        # rendered from the operands
+        skipped.add("name")
+    found = []
+    for cls in reversed(type(element).__mro__):
+        for attr in cls.__dict__.get("__slots__", ()):
+            if attr not in skipped and hasattr(element, attr):
+                found.append((attr, getattr(element, attr)))
+    found.extend(
+        (attr, value)
+        for attr, value in getattr(element, "__dict__", {}).items()
+        if attr not in skipped
+    )
+    return found
+
+
+def _encode(value: Any, index: dict[int, int]) -> Any:
+    """A stable description of an attribute value, elements by their position."""
+    if isinstance(value, Element):
+        return ("element", index[id(value)])
+    if isinstance(value, (list, tuple)):
+        return tuple(_encode(item, index) for item in value)
+    if isinstance(value, dict):
+        return tuple((key, _encode(item, index)) for key, item in value.items())
+    if isinstance(value, Module):
+        return ("module", value.name)
+    if isinstance(value, np.ndarray):
+        return ("array", value.dtype.str, value.shape, value.tobytes())
+    code = getattr(value, "__code__", None)
+    if code is not None:
+        # functions are identified by their code, not by their address
+        return (
+            "function",
+            value.__module__,
+            value.__qualname__,
+            code.co_code,
+            repr([c for c in code.co_consts if not hasattr(c, "co_code")]),
+        )
+    return repr(value)
+
+
+def _ordered(model: Model) -> list[Element]:
+    """Elements of `model` in an order that only depends on its structure."""
+    all_elements = model._collect_all_elements()
+    roots = [all_elements[name] for name in sorted(all_elements)]
+    for name in sorted(model.stocks):
+        roots.extend(model.stocks[name].inflows + model.stocks[name].outflows)
+    # stocks are leaves of the post-order, their flows are roots
+    order = _post_order(roots)
+    seen = {id(element) for element in order}
+    for element in list(order):
+        for child in children(element):
+            if id(child) not in seen:
+                seen.add(id(child))
+                order.append(child)
+    return order
+
+
+def structural_hash(
+    model: Model, outputs: Optional[Sequence[Element | str]] = None
+) -> str:
+    """
+    Hash of everything that goes into compiling `model`.
+
+    Two models built by the same construction code hash the same, any change
+    of an equation, a parameter value or the outputs changes the hash.
+    """
+    order = _ordered(model)
+    index = {id(element): i for i, element in enumerate(order)}
+
+    digest = hashlib.sha256()
+    digest.update(repr((_FORMAT, model.dt, model.loop_method)).encode())
+    digest.update(repr((model.loop_tolerance, model.loop_iterations)).encode())
+    if outputs is not None:
+        names = [o if isinstance(o, str) else o.name for o in outputs]
+        digest.update(repr(("outputs", names)).encode())
+    for element in order:
+        fields = tuple((attr, _encode(v, index)) for attr, v in _fields(element))
+        digest.update(repr((type(element).__qualname__, fields)).encode())
+    return digest.hexdigest()
+
+
+def _is_node(value: Any) -> bool:
+    """Whether `value` is pickled on its own, elements and the objects of mead."""
+    if isinstance(value, type):
+        return False
+    return isinstance(value, Element) or type(value).__module__.startswith("mead.")
+
+
+class _Pickler(pickle.Pickler):
+    """Pickles the state of one node, the other nodes it holds as references."""
+
+    def __init__(self, file: io.BytesIO, nodes: list[Any], index: dict[int, int]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.nodes = nodes
+        self.index = index
+
+    def persistent_id(self, value: Any) -> int | None:
+        if not _is_node(value):
+            return None
+        if id(value) not in self.index:
+            self.index[id(value)] = len(self.nodes)
+            self.nodes.append(value)
+        return self.index[id(value)]
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file: io.BytesIO, nodes: list[Any]):
+        super().__init__(file)
+        self.nodes = nodes
+
+    def persistent_load(self, index: int) -> Any:
+        return self.nodes[index]
+
+
+def _set_state(node: Any, state: Any) -> None:
+    """What unpickling does with the state of an object, see `object.__getstate__`."""
+    slots = None
+    if isinstance(state, tuple):
+        state, slots = state
+    if state:
+        node.__dict__.update(state)
+    for attr, value in (slots or {}).items():
+        setattr(node, attr, value)
+
+
+def _dumps(model: Model, plan: Plan) -> bytes:
+    """
+    A model and its plan as a flat table of nodes, each pickled on its own.
+
+    References between nodes are positions in the table, so no pickling
+    recurses along a chain of elements. The model, its modules and its
+    elements, ordered by `_ordered`, come first: an identical model can
+    stand in for them, see `_loads`.
+    """
+    nodes: list[Any] = [model, *model._modules.values(), *_ordered(model)]
+    own = len(nodes)
+    index = {id(node): i for i, node in enumerate(nodes)}
+    states = []
+    buffer = io.BytesIO()
+    pickler = _Pickler(buffer, nodes, index)
+    root = pickler.persistent_id(plan)
+    # grows while nodes referenced by the pickled ones are found
+    while len(states) < len(nodes):
+        buffer.seek(0)
+        buffer.truncate()
+        pickler.clear_memo()
+        pickler.dump(nodes[len(states)].__getstate__())
+        states.append(buffer.getvalue())
+    classes = [type(node) for node in nodes]
+    return pickle.dumps((own, root, classes, states), pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(data: bytes, model: Optional[Model] = None) -> tuple[Model, Plan]:
+    """The model and plan of `_dumps`, the plan bound to `model` if given."""
+    own, root, classes, states = pickle.loads(data)
+    nodes = [cls.__new__(cls) for cls in classes]
+    first = 0
+    if model is not None:
+        nodes[:own] = [model, *model._modules.values(), *_ordered(model)]
+        if len(nodes) != len(classes):
+            raise ValueError(f"The cached plan doesn't match model '{model.name}'")
+        first = own
+    for node, state in zip(nodes[first:], states[first:]):
+        _set_state(node, _Unpickler(io.BytesIO(state), nodes).load())
+    return nodes[0], nodes[root]
+
+
+class ModelCache:
+    """
+    A directory of compiled models, keyed by `structural_hash`.
+
+    Entries hold a model together with its compiled plan, see `_dumps`. A
+    worker given a key loads a ready-to-run model with `load`, without running
+    any construction code or compiling. Setting `Model.cache` makes `compile`
+    go through the cache as well. The least recently used entries are evicted
+    once the directory grows over `max_bytes`.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int = 256 * 2**20):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.plan"
+
+    def __contains__(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def store(
+        self, model: Model, outputs: Optional[Sequence[Element | str]] = None
+    ) -> str:
+        """Compiles `model` into the cache, returns its key."""
+        key = structural_hash(model, outputs)
+        if key not in self:
+            plan = model._compile(outputs)
+            self._write(key, model, plan)
+        return key
+
+    def load(self, key: str) -> Model:
+        """The model stored under `key`, compiled."""
+        model, plan = _loads(self._read(key))
+        model._plan = plan
+        return model
+
+    def compile(
+        self, model: Model, outputs: Optional[Sequence[Element | str]] = None
+    ) -> Plan:
+        """
+        The plan of `model`, from the cache when an identical model was stored.
+
+        A cached plan is bound to the elements of `model`, as if compiled here.
+        """
+        key = structural_hash(model, outputs)
+        if key in self:
+            return _loads(self._read(key), model)[1]
+        plan = model._compile(outputs)
+        try:
+            self._write(key, model, plan)
+        except (pickle.PicklingError, AttributeError, TypeError) as error:
+            # e.g. a kernel defined in a function, the model compiles as usual
+            warnings.warn(
+                f"Model '{model.name}' can't be cached: {error}", stacklevel=3
+            )
+        return plan
+
+    def _read(self, key: str) -> bytes:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            raise ValueError(f"No compiled model under key '{key}'") from None
+        self._touch(path)
+        return data
+
+    def _write(self, key: str, model: Model, plan: Plan) -> None:
+        data = _dumps(model, plan)
+        # written aside then moved, concurrent readers never see half a file
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as file:
+                file.write(data)
+            os.replace(temporary, self._path(key))
+            self._touch(self._path(key))
+        finally:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+        self._evict()
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        # the modification time orders entries by last use, file system clocks
+        # are too coarse to tell apart entries used in a row
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    def _evict(self) -> None:
+        entries = sorted(
+            (entry.stat().st_mtime_ns, entry.stat().st_size, entry)
+            for entry in self.directory.glob("*.plan")
+        )
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        for entry in self.directory.glob("*.plan"):
+            entry.unlink(missing_ok=True)
+
+    def __repr__(self) -> str:
+        return f"ModelCache(directory={str(self.directory)!r}, max_bytes={self.max_bytes!r})"
@@ -0,0 +1,868 @@
+"""Preparation of a model graph before it is simulated."""
+
+from __future__ import annotations
+import copy
+import math
+import sys
+from typing import TYPE_CHECKING, Any, Callable, Container
+
+import numpy as np
+
+from mead.core import (
+    Element,
+    Expression,
+    Constant,
+    Equation,
+    Sum,
+    Product,
+    Time,
+    Apply,
+    Function,
+    Kernel,
+    _FUNCTIONS,
+    _OPERATORS,
+    _Factors,
+    _Linear,
+)
+from mead.stock import Stock
+from mead.dims import Dims
+from mead.context import current_model
+from mead.utils import attributes, child_attributes, strongly_connected
+
+if TYPE_CHECKING:
+    from mead.model import Model
+
+
+def is_literal(element: Element) -> bool:
+    """Literals are the anonymous constants created for plain numbers in equations."""
+    return isinstance(element, Constant) and element.anonymous
+
+
+def literal(value: float) -> Constant:
+    return Constant(f"literal_{value}", value)
+
+
+def _simplify_equation(left: Element, op: str, right: Element) -> Element | None:
+    """Simplified form of `left op right`, None when it can't be simplified."""
+    if op in ("+", "-"):
+        linear = _Linear()
+        linear.add(left, 1)
+        linear.add(right, 1 if op == "+" else -1)
+        return linear.build()
+
+    if op in ("*", "/"):
+        factors = _Factors()
+        factors.add(left, False)
+        factors.add(right, op == "/")
+        return factors.build()
+
+    if is_literal(left) and is_literal(right):
+        try:
+            return literal(float(_OPERATORS[op](left.value, right.value)))
+        except (TypeError, ZeroDivisionError, OverflowError):
+            # e.g. 0 ** -1, or a complex power
+            return None
+    return None
+
+
+def _simplify_apply(function: str, operand: Element) -> Element | None:
+    """Folded `function(operand)` for a literal operand, None otherwise."""
+    if not is_literal(operand):
+        return None
+    try:
+        return literal(float(_FUNCTIONS[function][0](operand.value)))
+    except (ValueError, OverflowError):
+        # e.g. log(0), left for the run to report
+        return None
+
+
+def _operands(element: Element) -> list[Element]:
+    """Distinct elements held by the attributes of `element`, what `compute` reads."""
+    found: dict[int, Element] = {}
+    for attr in child_attributes(element):
+        value = getattr(element, attr)
+        if isinstance(value, Element):
+            found[id(value)] = value
+        elif isinstance(value, list):
+            found.update((id(v), v) for v in value if isinstance(v, Element))
+    return list(found.values())
+
+
+def _replace_children(
+    element: Element, replace: Callable[[Element], Element]
+) -> Element:
+    """Copy of `element` with its children mapped by `replace`, itself if none change."""
+    changes = {}
+    for attr in child_attributes(element):
+        value = getattr(element, attr)
+        if isinstance(value, Element):
+            new_value = replace(value)
+            if new_value is not value:
+                changes[attr] = new_value
+        elif isinstance(value, list) and any(isinstance(v, Element) for v in value):
+            new_value = [replace(v) if isinstance(v, Element) else v for v in value]
+            if any(new is not old for new, old in zip(new_value, value)):
+                changes[attr] = new_value
+
+    if not changes:
+        return element
+
+    clone = copy.copy(element)
+    for attr, value in attributes(clone).items():
+        # don't share mutable state (e.g. Policy memory) with the original
+        if isinstance(value, (dict, list)):
+            setattr(clone, attr, copy.copy(value))
+    for attr, value in changes.items():
+        setattr(clone, attr, value)
+    return clone
+
+
+def _post_order(roots: list[Element], done: Container[int] = ()) -> list[Element]:
+    """
+    Nodes reachable from `roots`, every node after its operands.
+
+    Stocks are leaves and nodes whose id is in `done` are skipped. Walking the
+    graph with an explicit stack keeps deep models clear of the recursion limit.
+    """
+    order: list[Element] = []
+    visited: set[int] = set()
+    stack = [(root, False) for root in reversed(roots)]
+    while stack:
+        element, expanded = stack.pop()
+        if expanded:
+            order.append(element)
+            continue
+        if id(element) in visited or id(element) in done:
+            continue
+        visited.add(id(element))
+        stack.append((element, True))
+        if not isinstance(element, Stock):
+            stack.extend((op, False) for op in reversed(_operands(element)))
+    return order
+
+
+def _structure(element: Element) -> tuple | None:
+    """Structural key of an expression whose operands are already canonical."""
+    if is_literal(element):
+        return ("literal", element.value)
+    if isinstance(element, Equation):
+        return (element.op, id(element.left), id(element.right))
+    if isinstance(element, Apply):
+        return (element.function, id(element.operand))
+    if isinstance(element, Function) and element.pure and element.inputs is not None:
+        return ("function", id(element.func), tuple(map(id, element.inputs)))
+    if isinstance(element, Sum):
+        # addition commutes, the order of the terms doesn't matter
+        return (
+            "sum",
+            tuple(sorted(map(id, element.terms))),
+            tuple(sorted(map(id, element.subtracted))),
+            element.constant,
+        )
+    if isinstance(element, Product):
+        return (
+            "product",
+            tuple(sorted(map(id, element.factors))),
+            tuple(sorted(map(id, element.divisors))),
+            element.coefficient,
+        )
+    return None
+
+
+class _Rewriter:
+    """Rewrites a graph bottom-up: simplification plus hash-consing of expressions."""
+
+    def __init__(self):
+        self.memo: dict[int, Element] = {}
+        self.canonical: dict[tuple, Element] = {}
+
+    def rewrite(self, element: Element) -> Element:
+        if id(element) not in self.memo:
+            # operands first, so rewriting a node only looks up its operands
+            for node in _post_order([element], self.memo):
+                self.memo[id(node)] = self._rewrite(node)
+        return self.memo[id(element)]
+
+    def _rewrite(self, element: Element) -> Element:
+        if isinstance(element, Stock):
+            # stocks are read from the state, their flows are rewritten separately
+            result = element
+        elif isinstance(element, Equation):
+            left = self.rewrite(element.left)
+            right = self.rewrite(element.right)
+            result = _simplify_equation(left, element.op, right)
+            if result is None:
+                unchanged = left is element.left and right is element.right
+                result = element if unchanged else Equation(left, element.op, right)
+        elif isinstance(element, Apply):
+            operand = self.rewrite(element.operand)
+            result = _simplify_apply(element.function, operand)
+            if result is None:
+                unchanged = operand is element.operand
+                result = element if unchanged else Apply(element.function, operand)
+        elif isinstance(element, Sum):
+            linear = _Linear()
+            for term in element.terms:
+                linear.add(self.rewrite(term), 1)
+            for term in element.subtracted:
+                linear.add(self.rewrite(term), -1)
+            linear.constant += element.constant
+            result = linear.build()
+        elif isinstance(element, Product):
+            factors = _Factors()
+            for factor in element.factors:
+                factors.add(self.rewrite(factor), False)
+            for divisor in element.divisors:
+                factors.add(self.rewrite(divisor), True)
+            factors.coefficient *= element.coefficient
+            result = factors.build()
+        else:
+            result = _replace_children(element, self.rewrite)
+
+        return self._intern(result)
+
+    def _intern(self, element: Element) -> Element:
+        """The canonical node structurally identical to `element`."""
+        key = _structure(element)
+        if key is None:
+            return element
+        return self.canonical.setdefault(key, element)
+
+
+class Shared(Element):
+    """
+    A node referenced from several places, computed once per stage.
+
+    Also used as a checkpoint in deep graphs: `below` lists the nearest
+    checkpoints under this node, they are computed bottom-up with an explicit
+    stack before the node itself, so no `compute` call recurses deeper than
+    the distance between two checkpoints.
+    """
+
+    __slots__ = ("element", "index", "below")
+    _children = ("element",)
+
+    def __init__(self, element: Element, index: int):
+        self.model = element.model
+        self.element = element
+        self.index = index
+        self.below: list[Shared] = []
+
+    @property
+    def name(self) -> str:
+        return self.element.name
+
+    # the name is the one of the wrapped element, copies must not set it
+    __getstate__ = Expression.__getstate__
+
+    @property
+    def anonymous(self) -> bool:
+        return self.element.anonymous
+
+    def compute(self, context: dict[str, Any]) -> float:
+        cache = context.get("cache")
+        if cache is None:
+            return self.element.compute(context)
+        if self.index not in cache:
+            if self.below:
+                self._compute_below(context, cache)
+            cache[self.index] = self.element.compute(context)
+        return cache[self.index]
+
+    def _compute_below(self, context: dict[str, Any], cache: dict) -> None:
+        stack = list(self.below)
+        while stack:
+            checkpoint = stack[-1]
+            if checkpoint.index in cache:
+                stack.pop()
+                continue
+            missing = [c for c in checkpoint.below if c.index not in cache]
+            if missing:
+                stack.extend(missing)
+                continue
+            cache[checkpoint.index] = checkpoint.element.compute(context)
+            stack.pop()
+
+    @property
+    def dependencies(self) -> list[Element]:
+        return [self.element]
+
+    def __repr__(self) -> str:
+        return f"Shared({self.element!r})"
+
+
+def _shared_nodes(roots: list[Element]) -> set[int]:
+    """Nodes reached through more than one reference, ignoring cheap leaves."""
+    references: dict[int, int] = {}
+    to_process = list(roots)
+    while to_process:
+        element = to_process.pop()
+        references[id(element)] = references.get(id(element), 0) + 1
+        if references[id(element)] == 1 and not isinstance(element, Stock):
+            to_process.extend(_operands(element))
+    return {key for key, count in references.items() if count > 1}
+
+
+# how often a node's value changes, see `_invariance_kinds`
+_CONSTANT, _TIME, _STATE = 0, 1, 2
+
+
+def _invariance_kinds(roots: list[Element]) -> dict[int, int]:
+    """Whether every node is fixed for a run, a function of time only, or neither."""
+    kinds: dict[int, int] = {}
+    for element in _post_order(roots):
+        invariance = element._invariance
+        if isinstance(element, Stock) or invariance is None:
+            kind = _STATE
+        elif invariance == "constant":
+            kind = _CONSTANT
+        else:
+            kind = max(
+                (kinds[id(op)] for op in _operands(element)),
+                default=_CONSTANT,
+            )
+            if invariance == "time":
+                kind = max(kind, _TIME)
+        kinds[id(element)] = kind
+    return kinds
+
+
+def _hoisted_nodes(roots: list[Element], kinds: dict[int, int]) -> dict[int, int]:
+    """
+    The largest subgraphs that don't depend on the state, with their kind.
+
+    A node is hoisted when it is run-constant or depends on time only, while
+    its parent (if any) depends on the state. Plain constants and time are
+    left alone, they are as cheap to compute as to look up.
+    """
+    hoisted: dict[int, int] = {}
+    seen: set[int] = set()
+    to_process = [(root, _STATE) for root in roots]
+    while to_process:
+        element, parent = to_process.pop()
+        key = id(element)
+        kind = kinds[key]
+        if kind < _STATE:
+            if parent == _STATE and not isinstance(element, (Constant, Time)):
+                hoisted[key] = kind
+            continue
+        if key in seen or isinstance(element, Stock):
+            continue
+        seen.add(key)
+        to_process.extend((op, kind) for op in _operands(element))
+    # bottom-up, so that nested hoisted nodes are ready before the ones above
+    return {key: hoisted[key] for key in kinds if key in hoisted}
+
+
+class Hoisted(Element):
+    """
+    A node that doesn't depend on the state, evaluated outside the time loop.
+
+    Run-constant nodes are computed once per run. Nodes that depend on time
+    only are computed for every point of the run's time grid up front, in a
+    single vectorized evaluation over an array of times when the subgraph
+    supports it. Outside of a run, or at times off the grid, the node is
+    computed as usual.
+    """
+
+    __slots__ = ("element", "kind", "_values", "_step", "_first")
+    _children = ("element",)
+
+    def __init__(self, element: Element, kind: int):
+        self.model = element.model
+        self.element = element
+        self.kind = kind
+        self._values: Any = None
+        self._step = 0.0
+        # grid index of the first value, runs resumed from a snapshot start late
+        self._first = 0
+
+    @property
+    def name(self) -> str:
+        return self.element.name
+
+    # the name is the one of the wrapped element, copies must not set it
+    __getstate__ = Expression.__getstate__
+
+    @property
+    def anonymous(self) -> bool:
+        return self.element.anonymous
+
+    def compute(self, context: dict[str, Any]) -> float:
+        values = self._values
+        if values is None:
+            return self.element.compute(context)
+        if self.kind == _CONSTANT:
+            return values
+        time = context.get("time", 0.0)
+        if isinstance(time, np.ndarray):
+            return self.element.compute(context)
+        index = round(time / self._step) - self._first
+        grid_time = (index + self._first) * self._step
+        if 0 <= index < len(values) and abs(grid_time - time) <= 1e-9 * max(
+            1.0, abs(time)
+        ):
+            return values[index]
+        return self.element.compute(context)
+
+    def evaluate(self, context: dict[str, Any], times: list[float], step: float):
+        """Precomputes the node for a run whose stages fall on `times`."""
+        if self.kind == _CONSTANT:
+            self._values = self.element.compute(context)
+            return
+        values = None
+        if not context["seeds"] and _vectorizable(self.element):
+            try:
+                result = self.element.compute(
+                    {**context, "time": np.array(times), "cache": {}}
+                )
+                values = np.broadcast_to(
+                    np.asarray(result, dtype=float), (len(times),)
+                ).tolist()
+            except (TypeError, ValueError):
+                values = None
+        if values is None:
+            values = [
+                self.element.compute({**context, "time": time, "cache": {}})
+                for time in times
+            ]
+        self._values, self._step = values, step
+        self._first = round(times[0] / step) if times else 0
+
+    def release(self) -> None:
+        self._values = None
+
+    @property
+    def dependencies(self) -> list[Element]:
+        return [self.element]
+
+    def __repr__(self) -> str:
+        return f"Hoisted({self.element!r})"
+
+
+def _vectorizable(element: Element) -> bool:
+    """Whether a subgraph can be computed over an array of times at once."""
+    for node in _post_order([element]):
+        # user kernels may not expect arrays, subscripted nodes already are
+        if isinstance(node, Kernel) or node.dims:
+            return False
+    return True
+
+
+class _Sharing:
+    """
+    Puts a `Shared` node in front of every node that is referenced more than
+    once, and a `Hoisted` one in front of state-independent subgraphs.
+    """
+
+    def __init__(self, shared: set[int], hoisted: dict[int, int]):
+        self.shared = shared
+        self.hoisted = hoisted
+        self.memo: dict[int, Element] = {}
+
+    def substitute(self, element: Element) -> Element:
+        if id(element) not in self.memo:
+            for node in _post_order([element], self.memo):
+                self.memo[id(node)] = self._substitute(node)
+        return self.memo[id(element)]
+
+    def _substitute(self, element: Element) -> Element:
+        if isinstance(element, (Stock, Constant, Time)):
+            return element
+        result = _replace_children(element, self.substitute)
+        if id(element) in self.hoisted:
+            result = Hoisted(result, self.hoisted[id(element)])
+        elif id(element) in self.shared:
+            result = Shared(result, len(self.memo))
+        return result
+
+
+class _LoopState:
+    """Iterate, warm start and statistics of an algebraic loop, shared by its copies."""
+
+    __slots__ = ("values", "guess", "solves", "iterations", "most_iterations")
+
+    def __init__(self):
+        self.values: list[Any] = []
+        self.guess: list[Any] | None = None
+        self.solves = 0
+        self.iterations = 0
+        self.most_iterations = 0
+
+
+class LoopValue(Element):
+    """The current iterate of one unknown of an algebraic loop."""
+
+    __slots__ = ("state", "index")
+
+    def __init__(self, state: _LoopState, index: int):
+        self.name = f"loop_value_{index}"
+        self.model = None
+        self.state = state
+        self.index = index
+
+    @property
+    def anonymous(self) -> bool:
+        return True
+
+    def compute(self, context: dict[str, Any]) -> float:
+        return self.state.values[self.index]
+
+    def __repr__(self) -> str:
+        return f"LoopValue({self.index!r})"
+
+
+def _magnitude(value: Any) -> float:
+    """Largest absolute value in `value`, derivatives of dual numbers included."""
+    if isinstance(value, np.ndarray):
+        return float(np.max(np.abs(value), initial=0.0))
+    partials = getattr(value, "partials", None)
+    if partials:
+        return max(abs(value.value), *(abs(p) for p in partials.values()))
+    return abs(float(value))
+
+
+class AlgebraicLoop(Element):
+    """
+    Elements that depend on each other without a stock in between, solved together.
+
+    Every unknown has a body: its element, where the unknowns are read as
+    `LoopValue` iterates. Each stage solves x = G(x) starting from the
+    solution of the previous stage, with Newton's method (finite difference
+    Jacobian) or, for subscripted unknowns or `method="fixed_point"`, by
+    fixed-point iteration. It has converged once the change is within
+    `tolerance`, relative to the size of the unknowns.
+    """
+
+    __slots__ = ("bodies", "names", "state", "method", "tolerance", "max_iterations")
+    _children = ("bodies",)
+
+    def __init__(
+        self,
+        bodies: list[Element],
+        names: list[str],
+        state: _LoopState,
+        method: str = "newton",
+        tolerance: float = 1e-10,
+        max_iterations: int = 100,
+    ):
+        if method not in ("newton", "fixed_point"):
+            raise ValueError(f"Unknown algebraic loop method: {method}")
+        self.name = f"loop({', '.join(names)})"
+        self.model = None
+        self.bodies = bodies
+        self.names = names
+        self.state = state
+        self.method = method
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+
+    @property
+    def anonymous(self) -> bool:
+        return True
+
+    @property
+    def solves(self) -> int:
+        return self.state.solves
+
+    @property
+    def iterations(self) -> int:
+        """Iterations over all the solves, see also `most_iterations`."""
+        return self.state.iterations
+
+    @property
+    def most_iterations(self) -> int:
+        return self.state.most_iterations
+
+    def _evaluate(self, x: list[Any], context: dict[str, Any]) -> list[Any]:
+        self.state.values = x
+        # nodes below depend on the iterate, nothing is cached across iterations
+        context = {**context, "cache": {}}
+        return [body.compute(context) for body in self.bodies]
+
+    def compute(self, context: dict[str, Any]) -> list[Any]:
+        state = self.state
+        x = state.guess or [0.0] * len(self.bodies)
+        newton = self.method == "newton" and not any(
+            isinstance(value, np.ndarray) for value in x
+        )
+        for iteration in range(1, self.max_iterations + 1):
+            g = self._evaluate(x, context)
+            residual = [gi - xi for gi, xi in zip(g, x)]
+            scale = 1.0 + max(_magnitude(value) for value in g)
+            if max(_magnitude(r) for r in residual) <= self.tolerance * scale:
+                state.guess = g
+                state.solves += 1
+                state.iterations += iteration
+                state.most_iterations = max(state.most_iterations, iteration)
+                return g
+            if newton and not any(isinstance(value, np.ndarray) for value in g):
+                x = self._newton_step(x, g, residual, context)
+            else:
+                x = g
+        raise ValueError(
+            f"Algebraic loop {self.name} did not converge in "
+            f"{self.max_iterations} iterations"
+        )
+
+    def _newton_step(
+        self, x: list[Any], g: list[Any], residual: list[Any], context: dict[str, Any]
+    ) -> list[Any]:
+        """x - J⁻¹ (G(x) - x), J the Jacobian of G(x) - x by finite differences."""
+        n = len(x)
+        jacobian = -np.eye(n)
+        for j in range(n):
+            step = math.sqrt(sys.float_info.epsilon) * max(1.0, abs(float(x[j])))
+            bumped = list(x)
+            bumped[j] = x[j] + step
+            for i, value in enumerate(self._evaluate(bumped, context)):
+                jacobian[i, j] += (float(value) - float(g[i])) / step
+        try:
+            inverse = np.linalg.inv(jacobian)
+        except np.linalg.LinAlgError:
+            return g
+        # the inverse is applied with plain arithmetic to keep derivatives
+        return [
+            x[i] - sum(inverse[i, j] * residual[j] for j in range(n)) for i in range(n)
+        ]
+
+    def __repr__(self) -> str:
+        return (
+            f"AlgebraicLoop({', '.join(self.names)}: {self.solves} solves, "
+            f"{self.iterations} iterations, at most {self.most_iterations})"
+        )
+
+
+class LoopOutput(Element):
+    """One unknown of a solved algebraic loop, standing for the element it replaces."""
+
+    __slots__ = ("loop", "index", "source")
+    _children = ("loop",)
+
+    def __init__(self, loop: AlgebraicLoop, index: int, source: Element):
+        self.name = source.name
+        self.model = source.model
+        self.loop = loop
+        self.index = index
+        self.source = source
+
+    @property
+    def anonymous(self) -> bool:
+        return self.source.anonymous
+
+    @property
+    def dims(self):
+        return self.source.dims
+
+    def compute(self, context: dict[str, Any]) -> float:
+        return self.loop.compute(context)[self.index]
+
+    def __repr__(self) -> str:
+        return f"LoopOutput({self.name!r})"
+
+
+def _loop_operands(element: Element) -> list[Element]:
+    """Operands computed along with `element`, past values read from history excluded."""
+    if isinstance(element, Stock):
+        return []
+    lagged = {id(e) for e in element._history_reads}
+    return [op for op in _operands(element) if id(op) not in lagged]
+
+
+def _tear_loops(
+    roots: list[Element], rewriter: _Rewriter, model: Model
+) -> list[AlgebraicLoop]:
+    """
+    Replaces the algebraic loops reachable from `roots` by `AlgebraicLoop` nodes.
+
+    The named elements of every strongly connected component become the
+    unknowns of a loop. `rewriter` then maps them to `LoopOutput` nodes, so
+    the rewritten graph has no cycle left.
+    """
+    nodes = {id(e): e for e in _post_order(roots)}
+    graph = {key: [id(op) for op in _loop_operands(e)] for key, e in nodes.items()}
+    loops = []
+    # components come out before the ones that depend on them
+    for component in strongly_connected(graph):
+        members = [nodes[key] for key in component]
+        unknowns = [e for e in members if not e.anonymous] or members
+        state = _LoopState()
+        bodies_rewriter = _Rewriter()
+        bodies_rewriter.canonical = rewriter.canonical
+        bodies_rewriter.memo = dict(rewriter.memo)
+        for i, unknown in enumerate(unknowns):
+            bodies_rewriter.memo[id(unknown)] = LoopValue(state, i)
+        loop = AlgebraicLoop(
+            [_replace_children(e, bodies_rewriter.rewrite) for e in unknowns],
+            [e.name for e in unknowns],
+            state,
+            model.loop_method,
+            model.loop_tolerance,
+            model.loop_iterations,
+        )
+        for i, unknown in enumerate(unknowns):
+            rewriter.memo[id(unknown)] = LoopOutput(loop, i, unknown)
+        loops.append(loop)
+    return loops
+
+
+# longest chain of nested compute calls between two checkpoints
+_CHECKPOINT_DEPTH = 100
+
+
+def _checkpoints(roots: list[Element]) -> dict[int, list[int]]:
+    """
+    Nodes to evaluate as checkpoints, with the nearest checkpoints below each.
+
+    A node becomes a checkpoint once the longest path down to a leaf or to a
+    checkpoint reaches `_CHECKPOINT_DEPTH`; shallow graphs have none.
+    """
+    height: dict[int, int] = {}
+    frontier: dict[int, list[int]] = {}
+    checkpoints: dict[int, list[int]] = {}
+    for element in _post_order(roots):
+        key = id(element)
+        if isinstance(element, Stock):
+            height[key], frontier[key] = 0, []
+            continue
+        operands = _operands(element)
+        below: dict[int, None] = {}
+        for op in operands:
+            below.update(
+                dict.fromkeys([id(op)] if id(op) in checkpoints else frontier[id(op)])
+            )
+        element_height = 1 + max((height[id(op)] for op in operands), default=0)
+        if element_height >= _CHECKPOINT_DEPTH:
+            checkpoints[key] = list(below)
+            height[key], frontier[key] = 0, []
+        else:
+            height[key], frontier[key] = element_height, list(below)
+    return checkpoints
+
+
+def simplify(element: Element) -> Element:
+    """
+    Folds literal subtrees and applies algebraic identities to an element graph.
+
+    Chains of `+`/`-` become a single `Sum` and chains of `*`/`/` a single
+    `Product`, with their literals folded into one constant or coefficient.
+    That removes identities such as `x + 0`, `x * 1`, `x / 1` or `0 - y`. The
+    rules follow mead's safe division, where a zero divisor yields zero:
+    `0 / x` and `x / 0` both fold to zero, while `x / x` is left alone since it
+    is zero, not one, when `x` is zero. Structurally identical expressions are
+    collapsed into a single node.
+
+    The original graph is never modified, named elements whose equations
+    change are returned as copies.
+    """
+    token = current_model.set(None)
+    try:
+        return _Rewriter().rewrite(element)
+    finally:
+        current_model.reset(token)
+
+
+class Plan:
+    """
+    A model prepared for simulation.
+
+    Holds, for every element of the model graph, the element to actually
+    compute (its simplified equivalent) and the flows of every stock. Nodes
+    referenced from more than one place, including structurally identical
+    subexpressions of different flows and auxiliaries, are computed once per
+    stage and shared. Subgraphs that don't depend on the state are hoisted
+    out of the time loop, see `Hoisted`, and elements that depend on each
+    other are solved together, see `AlgebraicLoop`.
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        all_elements: dict[str, Element],
+        recorded: list[str] | None = None,
+    ):
+        self.model = model
+        # elements whose value is recorded at every step, all of them by default
+        self.recorded: list[str] = list(all_elements) if recorded is None else recorded
+
+        # build without registering the new nodes into an active model context
+        token = current_model.set(None)
+        try:
+            rewriter = _Rewriter()
+            sources = list(all_elements.values())
+            for stock in model.stocks.values():
+                sources.extend(stock.inflows + stock.outflows)
+            self.loops = _tear_loops(sources, rewriter, model)
+            elements = {
+                name: rewriter.rewrite(element)
+                for name, element in all_elements.items()
+            }
+            inflows = {
+                name: [rewriter.rewrite(f) for f in stock.inflows]
+                for name, stock in model.stocks.items()
+            }
+            outflows = {
+                name: [rewriter.rewrite(f) for f in stock.outflows]
+                for name, stock in model.stocks.items()
+            }
+
+            # dims of the flows of subscripted stocks laid out otherwise, by
+            # position, their values are aligned to the stock when added
+            self.layouts: dict[str, tuple[list[Dims], list[Dims]]] = {}
+            for name, stock in model.stocks.items():
+                for flow in stock.inflows + stock.outflows:
+                    if not set(flow.dims) <= set(stock.dims):
+                        raise ValueError(
+                            f"Flow '{flow.name}' is subscripted by {flow.dims}, "
+                            f"stock '{name}' only by {stock.dims}"
+                        )
+                layout = (
+                    [flow.dims for flow in stock.inflows],
+                    [flow.dims for flow in stock.outflows],
+                )
+                if any(d and d != stock.dims for d in layout[0] + layout[1]):
+                    self.layouts[name] = layout
+
+            roots = list(elements.values())
+            for flows in (*inflows.values(), *outflows.values()):
+                roots.extend(flows)
+            checkpoints = _checkpoints(roots)
+            hoisted = _hoisted_nodes(roots, _invariance_kinds(roots))
+            for key in checkpoints:
+                hoisted.pop(key, None)
+            sharing = _Sharing(_shared_nodes(roots) | set(checkpoints), hoisted)
+
+            self.elements: dict[str, Element] = {
+                name: sharing.substitute(e) for name, e in elements.items()
+            }
+            self.inflows: dict[str, list[Element]] = {
+                name: [sharing.substitute(f) for f in flows]
+                for name, flows in inflows.items()
+            }
+            self.outflows: dict[str, list[Element]] = {
+                name: [sharing.substitute(f) for f in flows]
+                for name, flows in outflows.items()
+            }
+            for key, below in checkpoints.items():
+                sharing.memo[key].below = [sharing.memo[k] for k in below]
+            self.hoisted: list[Hoisted] = [sharing.memo[key] for key in hoisted]
+        finally:
+            current_model.reset(token)
+
+    def hoist(self, context: dict[str, Any], times: list[float], step: float):
+        """Precomputes the hoisted nodes for a run, `times` every `step` apart."""
+        for node in self.hoisted:
+            node.evaluate(context, times, step)
+
+    def release(self) -> None:
+        """Back to computing the hoisted nodes on demand, once a run is over.
+
+        Algebraic loops forget their last solution, the next run starts over.
+        """
+        for node in self.hoisted:
+            node.release()
+        for loop in self.loops:
+            loop.state.guess = None
+
+    def __repr__(self) -> str:
+        return f"Plan(model={self.model.name!r}, elements={len(self.elements)!r})"
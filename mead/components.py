@@ -1,7 +1,12 @@
 from __future__ import annotations
+from functools import reduce
 from typing import TYPE_CHECKING, Any, Sequence, Tuple
 
-from mead.core import Element
+import numpy as np
+
+from mead.context import current_model
+from mead.core import Element, Auxiliary, Constant
+from mead.dims import safe_divide
 from mead.stock import Stock
 from mead.utils import as_element
 
@@ -15,8 +20,14 @@ class Delay(Element):
     Requires the model to manage history.
     """
 
+    __slots__ = ("input", "delay_time")
+    _children = ("input", "delay_time")
+
     def __init__(self, name: str, input: Element, delay_time: float | Element):
         super().__init__(name)
+        if input.anonymous:
+            # history is recorded by name, give the input one
+            input = Auxiliary(f"{name}_input", input)
         self.input = input
         self.delay_time = as_element(delay_time)
 
@@ -32,6 +43,16 @@ class Delay(Element):
         )  # Compute the value of delay_time
         return history_lookup(self.input.name, computed_delay_time)
 
+    @property
+    def _history_reads(self) -> list[Element]:
+        return [self.input]
+
+    @property
+    def _history_window(self) -> float | None:
+        if isinstance(self.delay_time, Constant):
+            return float(np.max(self.delay_time.value))
+        return None
+
     @property
     def dependencies(self) -> list[Element]:
         return [self.input, self.delay_time]
@@ -47,6 +68,9 @@ class Smooth(Element):
     Requires the model to manage history of this smooth element itself.
     """
 
+    __slots__ = ("target_value", "smoothing_time", "initial_value")
+    _children = ("target_value", "smoothing_time", "initial_value")
+
     def __init__(
         self,
         name: str,
@@ -81,6 +105,15 @@ class Smooth(Element):
             input_val - previous_smooth_val
         )
 
+    @property
+    def _history_reads(self) -> list[Element]:
+        return [self]
+
+    @property
+    def _history_window(self) -> float | None:
+        # the value of the previous step
+        return 0.0
+
     @property
     def dependencies(self) -> list[Element]:
         return [self.target_value, self.smoothing_time, self.initial_value]
@@ -95,6 +128,10 @@ class Table(Element):
     using linear interpolation.
     """
 
+    __slots__ = ("input_element", "points")
+    _children = ("input_element",)
+    _invariance = "inputs"
+
     def __init__(
         self, name: str, input: float | Element, points: Sequence[Tuple[float, float]]
     ):
@@ -108,6 +145,10 @@ class Table(Element):
 
     def compute(self, context: dict[str, Any]) -> float:
         input_val = self.input_element.compute(context)
+        if isinstance(input_val, np.ndarray):
+            # same interpolation and extrapolation, for every subscript at once
+            xs, ys = zip(*self.points)
+            return np.interp(input_val, xs, ys)
 
         # extrapolation (return first/last y-value)
         if input_val <= self.points[0][0]:
@@ -143,6 +184,10 @@ class IfThenElse(Element):
     If condition > 0, returns the true_element's value, else returns the false_element's value.
     """
 
+    __slots__ = ("condition", "true_element", "false_element")
+    _children = ("condition", "true_element", "false_element")
+    _invariance = "inputs"
+
     def __init__(
         self,
         name: str,
@@ -157,6 +202,12 @@ class IfThenElse(Element):
 
     def compute(self, context: dict[str, Any]) -> float:
         condition_val = self.condition.compute(context)
+        if isinstance(condition_val, np.ndarray):
+            return np.where(
+                condition_val > 0,
+                self.true_element.compute(context),
+                self.false_element.compute(context),
+            )
         if condition_val > 0:
             return self.true_element.compute(context)
         else:
@@ -178,6 +229,10 @@ class Min(Element):
     An element that returns the minimum of its input elements.
     """
 
+    __slots__ = ("input_elements",)
+    _children = ("input_elements",)
+    _invariance = "inputs"
+
     def __init__(self, name: str, *input_elements: float | Element):
         super().__init__(name)
         if not input_elements:
@@ -185,7 +240,10 @@ class Min(Element):
         self.input_elements = [as_element(i) for i in input_elements]
 
     def compute(self, context: dict[str, Any]) -> float:
-        return min(el.compute(context) for el in self.input_elements)
+        values = [el.compute(context) for el in self.input_elements]
+        if any(isinstance(value, np.ndarray) for value in values):
+            return reduce(np.minimum, values)
+        return min(values)
 
     @property
     def dependencies(self) -> list[Element]:
@@ -200,6 +258,10 @@ class Max(Element):
     An element that returns the maximum of its input elements.
     """
 
+    __slots__ = ("input_elements",)
+    _children = ("input_elements",)
+    _invariance = "inputs"
+
     def __init__(self, name: str, *input_elements: float | Element):
         super().__init__(name)
         if not input_elements:
@@ -207,7 +269,10 @@ class Max(Element):
         self.input_elements = [as_element(i) for i in input_elements]
 
     def compute(self, context: dict[str, Any]) -> float:
-        return max(el.compute(context) for el in self.input_elements)
+        values = [el.compute(context) for el in self.input_elements]
+        if any(isinstance(value, np.ndarray) for value in values):
+            return reduce(np.maximum, values)
+        return max(values)
 
     @property
     def dependencies(self) -> list[Element]:
@@ -222,6 +287,10 @@ class Pulse(Element):
     An element that generates a pulse (a temporary burst) of a given magnitude.
     """
 
+    __slots__ = ("start_time", "duration", "magnitude")
+    _children = ("start_time", "duration", "magnitude")
+    _invariance = "time"
+
     def __init__(
         self,
         name: str,
@@ -240,6 +309,11 @@ class Pulse(Element):
         dur = self.duration.compute(context)
         mag = self.magnitude.compute(context)
 
+        if isinstance(current_time, np.ndarray):
+            # the whole time axis at once
+            return np.where(
+                (start <= current_time) & (current_time < start + dur), mag, 0.0
+            )
         if start <= current_time < start + dur:
             return mag
         return 0.0
@@ -260,6 +334,10 @@ class Step(Element):
     An element that generates a step change in value at a specified start_time.
     """
 
+    __slots__ = ("start_time", "before_value", "after_value")
+    _children = ("start_time", "before_value", "after_value")
+    _invariance = "time"
+
     def __init__(
         self,
         name: str,
@@ -276,6 +354,12 @@ class Step(Element):
         current_time = context["time"]
         start = self.start_time.compute(context)
 
+        if isinstance(current_time, np.ndarray):
+            return np.where(
+                current_time < start,
+                self.before_value.compute(context),
+                self.after_value.compute(context),
+            )
         if current_time < start:
             return self.before_value.compute(context)
         else:
@@ -297,6 +381,10 @@ class Ramp(Element):
     An element that generates a linearly increasing (or decreasing) value over a period.
     """
 
+    __slots__ = ("start_time", "end_time", "slope", "initial_value")
+    _children = ("start_time", "end_time", "slope", "initial_value")
+    _invariance = "time"
+
     def __init__(
         self,
         name: str,
@@ -318,6 +406,8 @@ class Ramp(Element):
         slp = self.slope.compute(context)
         initial = self.initial_value.compute(context)
 
+        if isinstance(current_time, np.ndarray):
+            return initial + slp * np.clip(current_time - start, 0, max(end - start, 0))
         if current_time < start:
             return initial
         elif start <= current_time <= end:
@@ -342,6 +432,9 @@ class Delay2(Element):
     A second-order exponential delay element, implemented as a chain of two Smooth components.
     """
 
+    __slots__ = ("input_element", "delay_time", "initial_value", "smooth1", "smooth2")
+    _children = ("input_element", "delay_time", "initial_value", "smooth1", "smooth2")
+
     def __init__(
         self,
         name: str,
@@ -398,6 +491,23 @@ class Delay3(Element):
     A third-order exponential delay element, implemented as a chain of three Smooth components.
     """
 
+    __slots__ = (
+        "input_element",
+        "delay_time",
+        "initial_value",
+        "smooth1",
+        "smooth2",
+        "smooth3",
+    )
+    _children = (
+        "input_element",
+        "delay_time",
+        "initial_value",
+        "smooth1",
+        "smooth2",
+        "smooth3",
+    )
+
     def __init__(
         self,
         name: str,
@@ -456,11 +566,157 @@ class Delay3(Element):
         )
 
 
+class _StageFlow(Element):
+    """Rates of change of all the stages of a `DelayN`, as one vector."""
+
+    __slots__ = ("input", "delay_time", "stages", "order")
+    _children = ("input", "delay_time", "stages")
+
+    def __init__(
+        self, name: str, input: Element, delay_time: Element, stages: Stock, order: int
+    ):
+        super().__init__(name)
+        self.input = input
+        self.delay_time = delay_time
+        self.stages = stages
+        self.order = order
+
+    def compute(self, context: dict[str, Any]) -> float:
+        levels = self.stages.compute(context)
+        delay_time = self.delay_time.compute(context)
+        # every stage moves towards the one before it, the first towards the input
+        # (stages are the last axis, leading ones are e.g. instances of a module)
+        upstream = np.roll(levels, 1, axis=-1)
+        upstream[..., 0] = self.input.compute(context)
+        if np.ndim(delay_time):
+            return safe_divide((upstream - levels) * self.order, delay_time[..., None])
+        if delay_time == 0:
+            return np.zeros(np.shape(levels))
+        return (upstream - levels) * (self.order / delay_time)
+
+    @property
+    def dependencies(self) -> list[Element]:
+        return [self.input, self.delay_time, self.stages]
+
+    def __repr__(self) -> str:
+        return f"_StageFlow({self.name=!r}, {self.order=!r})"
+
+
+class DelayN(Element):
+    """
+    An exponential delay of any order.
+
+    Generalizes `Delay2` and `Delay3`: the `order` stages live in a single
+    internal stock (`<name>_stages`) subscripted by `<name>_stage` and are
+    advanced by the solver with one vectorized update, so the cost of a step
+    doesn't grow with the order in Python operations. The value is the output
+    of the last stage. The input must be a scalar element.
+    """
+
+    __slots__ = ("input_element", "delay_time", "initial_value", "order", "stages")
+    _children = ("input_element", "delay_time", "stages")
+
+    def __init__(
+        self,
+        name: str,
+        input_element: float | Element,
+        delay_time: float | Element,
+        initial_value: float = 0.0,
+        order: int = 3,
+    ):
+        super().__init__(name)
+        if order < 1:
+            raise ValueError("DelayN order must be at least 1")
+        self.input_element = as_element(input_element)
+        if self.input_element.dims:
+            raise ValueError("DelayN input must not be subscripted")
+        self.delay_time = as_element(delay_time)
+        self.initial_value = initial_value
+        self.order = order
+
+        self.stages = Stock(
+            f"{name}_stages",
+            initial_value=np.full(order, float(initial_value)),
+            dims=(f"{name}_stage",),
+        )
+        self.stages.add_inflow(
+            _StageFlow(
+                f"{name}_stage_flow",
+                self.input_element,
+                self.delay_time,
+                self.stages,
+                order,
+            )
+        )
+
+    def compute(self, context: dict[str, Any]) -> float:
+        levels = self.stages.compute(context)
+        # the last stage, per instance in a module
+        return levels[..., -1] if np.ndim(levels) > 1 else levels[-1]
+
+    @property
+    def dims(self) -> tuple[str, ...]:
+        # those of the stages but the stage, e.g. instances of a module
+        return self.stages.dims[:-1]
+
+    @property
+    def dependencies(self) -> list[Element]:
+        return [self.input_element, self.delay_time, self.stages]
+
+    def __repr__(self) -> str:
+        return (
+            f"DelayN({self.name=!r}, {self.input_element.name=!r}, "
+            f"{self.delay_time.name=!r}, {self.order=!r})"
+        )
+
+
+class Conveyor(DelayN):
+    """
+    A pipeline (FIFO) delay: what enters at time t leaves at t + delay_time.
+
+    The transit is stored as one slot per time step, `delay_time / dt` slots
+    that shift by one slot every step. The value is the rate leaving the
+    conveyor. Material is conserved exactly: what goes in equals what is in
+    transit plus what came out. The slots shift once per step with every
+    method: with RK4 they are left out of the intermediate stages and moved
+    by the rates at the start of the step, so nothing disperses.
+    """
+
+    __slots__ = ()
+
+    def __init__(
+        self,
+        name: str,
+        input_element: float | Element,
+        delay_time: float,
+        initial_value: float = 0.0,
+        dt: float | None = None,
+    ):
+        if dt is None:
+            active_model = current_model.get()
+            if active_model is None:
+                raise ValueError("Conveyor needs dt outside of a model context")
+            dt = active_model.dt
+        slots = round(delay_time / dt)
+        if slots < 1 or abs(slots * dt - delay_time) > 1e-9 * max(1.0, delay_time):
+            raise ValueError(
+                f"Conveyor delay_time {delay_time} must be a multiple of dt {dt}"
+            )
+        super().__init__(name, input_element, delay_time, initial_value, order=slots)
+
+    def __repr__(self) -> str:
+        return f"Conveyor({self.name=!r}, {self.input_element.name=!r}, slots={self.order!r})"
+
+
 class Initial(Element):
     """
     An element that returns the initial value of an input element.
     """
 
+    __slots__ = ("input_element",)
+    _children = ("input_element",)
+    _invariance = "constant"
+
     def __init__(self, name: str, input_element: Element):
         super().__init__(name)
         self.input_element = input_element
@@ -479,6 +735,8 @@ class Initial(Element):
             ),
             "history_lookup": lambda name, delay_time_param: 0.0,
             "dt": context.get("dt", 0.0),
+            "seeds": context.get("seeds"),
+            "cache": {},
         }
         return self.input_element.compute(initial_context)
 
@@ -490,9 +748,119 @@ class Initial(Element):
         return f"Initial({self.name=!r}, {self.input_element.name=!r})"
 
 
+class _CSR:
+    """Bare CSR arrays, the layout `Coupling` reads from sparse matrices."""
+
+    def __init__(self, data, indices, indptr, shape):
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.shape = shape
+
+
+class Coupling(Element):
+    """
+    Sparse matrix coupling between subscripts: the value is `matrix @ input`.
+
+    The matrix is kept in compressed sparse row (CSR) layout and applied with
+    one vectorized mat-vec per evaluation, so a network of thousands of nodes
+    needs a single element instead of one flow per edge. `matrix` is a dense
+    NumPy array or any object with `data`, `indices`, `indptr` and `shape`
+    (e.g. a `scipy.sparse.csr_matrix`), see `from_edges` for edge lists.
+    """
+
+    __slots__ = ("input", "data", "indices", "indptr", "shape", "_rows", "_dims")
+    _children = ("input",)
+    _invariance = "inputs"
+
+    def __init__(
+        self,
+        name: str,
+        input: Element,
+        matrix: Any,
+        dims: Sequence[str] | None = None,
+    ):
+        super().__init__(name)
+        if len(input.dims) != 1:
+            raise ValueError(f"Coupling input '{input.name}' must have one dimension")
+        self.input = input
+        if hasattr(matrix, "indptr"):
+            self.data = np.asarray(matrix.data, dtype=float)
+            self.indices = np.asarray(matrix.indices, dtype=np.int64)
+            self.indptr = np.asarray(matrix.indptr, dtype=np.int64)
+            self.shape = tuple(matrix.shape)
+        else:
+            dense = np.asarray(matrix, dtype=float)
+            if dense.ndim != 2:
+                raise ValueError("Coupling matrix must be two dimensional")
+            rows, self.indices = np.nonzero(dense)
+            self.data = dense[rows, self.indices]
+            self.indptr = np.concatenate(
+                ([0], np.cumsum(np.count_nonzero(dense, axis=1)))
+            )
+            self.shape = dense.shape
+        # row of every stored entry, so the mat-vec is a single bincount
+        self._rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        self._dims = tuple(dims) if dims is not None else input.dims
+
+    @classmethod
+    def from_edges(
+        cls,
+        name: str,
+        input: Element,
+        edges: Sequence[Tuple[int, int, float]],
+        size: int | Tuple[int, int],
+        dims: Sequence[str] | None = None,
+    ) -> Coupling:
+        """Coupling from `(row, column, weight)` edges, repeated edges add up."""
+        shape = (size, size) if isinstance(size, int) else tuple(size)
+        edge_array = np.asarray(edges, dtype=float).reshape(-1, 3)
+        rows = edge_array[:, 0].astype(np.int64)
+        columns = edge_array[:, 1].astype(np.int64)
+        order = np.lexsort((columns, rows))
+        matrix = _CSR(
+            data=edge_array[order, 2],
+            indices=columns[order],
+            indptr=np.concatenate(
+                ([0], np.cumsum(np.bincount(rows, minlength=shape[0])))
+            ),
+            shape=shape,
+        )
+        return cls(name, input, matrix, dims)
+
+    @property
+    def dims(self) -> tuple[str, ...]:
+        return self._dims
+
+    @property
+    def matrix(self) -> _CSR:
+        return _CSR(self.data, self.indices, self.indptr, self.shape)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def compute(self, context: dict[str, Any]) -> float:
+        x = self.input.compute(context)
+        return np.bincount(
+            self._rows, weights=self.data * x[self.indices], minlength=self.shape[0]
+        )
+
+    @property
+    def dependencies(self) -> list[Element]:
+        return [self.input]
+
+    def __repr__(self) -> str:
+        return f"Coupling({self.name=!r}, {self.input.name=!r}, {self.shape=!r}, {self.nnz=!r})"
+
+
 class Policy(Element):
     """Models an intervention when condition is met"""
 
+    __slots__ = ("condition", "effect", "apply", "_apply_mem")
+    _children = ("condition", "effect")
+    _run_state = ("apply", "_apply_mem")
+
     def __init__(
         self, name: str, condition: Element, effect: float | Element, apply: int = 1
     ):
@@ -504,6 +872,11 @@ class Policy(Element):
             apply(int): How many times the policy will by applied, -1 == always
         """
         super().__init__(name)
+        if condition.dims:
+            raise ValueError(
+                f"Policy '{name}' has a condition subscripted by {condition.dims}, "
+                "policies apply to the whole model on a scalar condition"
+            )
         self.condition = condition
         self.effect = as_element(effect)
         self.apply = apply
@@ -543,6 +916,10 @@ class Flow(Element):
     Its value is determined by its equation.
     """
 
+    __slots__ = ("equation",)
+    _children = ("equation",)
+    _invariance = "inputs"
+
     def __init__(self, name: str, equation: float | Element):
         super().__init__(name)
         self.equation = as_element(equation)
@@ -551,6 +928,11 @@ class Flow(Element):
         """Computes the flow's rate by evaluating its equation."""
         return self.equation.compute(context)
 
+    @property
+    def dims(self) -> tuple[str, ...]:
+        # those of the equation, not of everything the equation reads
+        return self.equation.dims
+
     @property
     def dependencies(self) -> list[Element]:
         """Returns the dependencies of the flow's equation."""
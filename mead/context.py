@@ -1,6 +1,7 @@
 from __future__ import annotations
 import contextvars
-from typing import TYPE_CHECKING, Optional
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Iterator, Optional
 
 if TYPE_CHECKING:
     from mead.model import Model
@@ -10,3 +11,56 @@ if TYPE_CHECKING:
 current_model: contextvars.ContextVar[Optional[Model]] = contextvars.ContextVar(
     "current_model", default=None
 )
+
+
+class EvalContext(Mapping):
+    """
+    What elements are computed against: the time, the stock values and helpers.
+
+    A run creates one and moves it from stage to stage with `reset`, instead
+    of building a new dict for every derivative evaluation. Elements read it
+    like a dict, e.g. `context["time"]`, so a plain dict works as well.
+    """
+
+    __slots__ = ("model", "time", "state", "dt", "seeds", "cache", "history_lookup")
+    _keys = ("time", "state", "history_lookup", "dt", "seeds", "cache")
+
+    def __init__(
+        self,
+        model: Model,
+        time: float,
+        state: dict[str, Any],
+        seeds: Optional[dict[str, Any]] = None,
+    ):
+        self.model = model
+        self.time = time
+        self.state = state
+        self.dt = model.dt
+        self.seeds = {} if seeds is None else seeds
+        # values of shared nodes, computed once per stage
+        self.cache: dict[int, Any] = {}
+        # bound once, looked up at the current time
+        self.history_lookup = self._lookup_history
+
+    def reset(self, time: float, state: dict[str, Any]) -> None:
+        """Moves the context to another stage."""
+        self.time = time
+        self.state = state
+        self.cache.clear()
+
+    def _lookup_history(self, name: str, delay_time: float) -> Any:
+        return self.model._lookup_history(name, self.time, delay_time)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self._keys else default
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -1,9 +1,14 @@
 from __future__ import annotations
 import inspect
+import itertools
+import math
+import operator
+import numpy as np
 from typing import TYPE_CHECKING, Any, Self
-from collections.abc import Callable
+from collections.abc import Callable, Sequence
 
 from mead.context import current_model
+from mead.dims import Dims, align, as_array, merge_dims, safe_divide
 
 # prevents circular import
 if TYPE_CHECKING:
@@ -11,7 +16,23 @@ if TYPE_CHECKING:
 
 
 class Element:
-    """The base class for all model elements."""
+    """
+    The base class for all model elements.
+
+    Elements use `__slots__`, attributes holding other elements (or lists of
+    elements) are declared in `_children` so the graph can be walked without
+    reflecting over the instance. Subclasses that don't declare `__slots__`
+    keep a `__dict__`, its attributes are then treated as possible children.
+    """
+
+    __slots__ = ("name", "model")
+    _children: tuple[str, ...] = ()
+    # What the value depends on besides the stocks: "inputs" (only its
+    # children), "time" (its children and time), "constant" (fixed for a run)
+    # or None when it may depend on anything (state, history, side effects).
+    _invariance: str | None = None
+    # Attributes that computing changes (e.g. counters), saved in snapshots
+    _run_state: tuple[str, ...] = ()
 
     def __init__(self, name: str):
         self.name = name
@@ -19,39 +40,40 @@ class Element:
 
         # If we are inside a Model context, automatically add this element
         active_model = current_model.get()
-        if active_model and not self.name.startswith("literal_"):
+        if active_model and not self.anonymous:
             try:
                 active_model.add(self)
             except ValueError:
                 # Ignore if the element (e.g., an equation) is already present
                 pass
 
-    def __add__(self, other: Any) -> Equation:
-        return Equation(self, "+", other)
+    # `+`, `-`, `*` and `/` chains build a single n-ary Sum or Product
+    def __add__(self, other: Any) -> Element:
+        return _sum((self, 1), (other, 1))
 
-    def __radd__(self, other: Any) -> Equation:
-        return Equation(other, "+", self)
+    def __radd__(self, other: Any) -> Element:
+        return _sum((other, 1), (self, 1))
 
-    def __sub__(self, other: Any) -> Equation:
-        return Equation(self, "-", other)
+    def __sub__(self, other: Any) -> Element:
+        return _sum((self, 1), (other, -1))
 
-    def __rsub__(self, other: Any) -> Equation:
-        return Equation(other, "-", self)
+    def __rsub__(self, other: Any) -> Element:
+        return _sum((other, 1), (self, -1))
 
-    def __mul__(self, other: Any) -> Equation:
-        return Equation(self, "*", other)
+    def __mul__(self, other: Any) -> Element:
+        return _product((self, False), (other, False))
 
-    def __rmul__(self, other: Any) -> Equation:
-        return Equation(other, "*", self)
+    def __rmul__(self, other: Any) -> Element:
+        return _product((other, False), (self, False))
 
-    def __truediv__(self, other: Any) -> Equation:
-        return Equation(self, "/", other)
+    def __truediv__(self, other: Any) -> Element:
+        return _product((self, False), (other, True))
 
-    def __rtruediv__(self, other: Any) -> Equation:
-        return Equation(other, "/", self)
+    def __rtruediv__(self, other: Any) -> Element:
+        return _product((other, False), (self, True))
 
-    def __neg__(self) -> Equation:
-        return Equation(0, "-", self)  # Negation as 0 - self
+    def __neg__(self) -> Element:
+        return _sum((self, -1))
 
     # Comparisons...
     # Overriding __eq__ leads to hash errors, for numerical
@@ -68,6 +90,31 @@ class Element:
     def __le__(self, other) -> Equation:
         return Equation(self, "<=", other)
 
+    def __pow__(self, other: Any) -> Equation:
+        return Equation(self, "**", other)
+
+    def __rpow__(self, other: Any) -> Equation:
+        return Equation(other, "**", self)
+
+    # Logical operators, values > 0 are true and results are 1.0 or 0.0
+    def __and__(self, other: Any) -> Equation:
+        return Equation(self, "and", other)
+
+    def __rand__(self, other: Any) -> Equation:
+        return Equation(other, "and", self)
+
+    def __or__(self, other: Any) -> Equation:
+        return Equation(self, "or", other)
+
+    def __ror__(self, other: Any) -> Equation:
+        return Equation(other, "or", self)
+
+    def __invert__(self) -> Apply:
+        return Apply("not", self)
+
+    def __abs__(self) -> Apply:
+        return Apply("abs", self)
+
     def __replace__(self, /, **changes) -> Self:
         cls = self.__class__
         sig = inspect.signature(cls.__init__)
@@ -81,6 +128,34 @@ class Element:
     def dependencies(self) -> list[Element]:
         return []
 
+    @property
+    def _history_reads(self) -> list[Element]:
+        """Elements whose recorded past values `compute` reads, instead of computing them."""
+        return []
+
+    @property
+    def _history_window(self) -> float | None:
+        """How far back, beyond one time step, `_history_reads` look; None if unknown."""
+        return None if self._history_reads else 0.0
+
+    @property
+    def anonymous(self) -> bool:
+        """Anonymous elements (expressions, literals) only exist inside other elements."""
+        return False
+
+    @property
+    def dims(self) -> Dims:
+        """Names of the dimensions the value of this element is subscripted by."""
+        return merge_dims(*(dep.dims for dep in self.dependencies))
+
+    def sum(self, dim: str) -> Reduction:
+        """Sum over the dimension `dim`."""
+        return Reduction(self, "sum", dim)
+
+    def mean(self, dim: str) -> Reduction:
+        """Mean over the dimension `dim`."""
+        return Reduction(self, "mean", dim)
+
     def compute(self, context: dict[str, Any]) -> float:
         """Computes the value of the element based on the current model context."""
         # By default, an element's value is its current state in the model
@@ -90,35 +165,142 @@ class Element:
 class Constant(Element):
     """An element with a fixed value."""
 
-    def __init__(self, name: str, value: float):
+    __slots__ = ("value", "dims")
+    _invariance = "inputs"
+
+    def __init__(self, name: str, value: float, dims: Dims = ()):
         super().__init__(name)
-        self.value = value
+        self.dims = tuple(dims)
+        self.value = as_array(value, self.dims)
 
     def compute(self, context: dict[str, Any]) -> float:
+        # parameters under sensitivity analysis carry their derivatives
+        seeds = context.get("seeds")
+        if seeds and self.name in seeds:
+            return seeds[self.name]
         return self.value
 
+    @property
+    def anonymous(self) -> bool:
+        return self.name.startswith("literal_")
+
     def __repr__(self) -> str:
         return f"Constant({self.name=!r}, {self.value=!r})"
 
 
-class Function(Element):
-    r"""A callable function with no dependencies"""
+def _carries_derivatives(value: Any) -> bool:
+    """Whether `value` is an array of dual numbers or tape variables."""
+    return (
+        isinstance(value, np.ndarray)
+        and value.dtype == object
+        and any(hasattr(v, "chain") for v in value.flat)
+    )
+
+
+class Kernel(Element):
+    """
+    Base class of custom elements computed from the values of declared inputs.
+
+    Subclasses implement `kernel(*values)`, which receives the value of each
+    element of `inputs`, in order. Written with NumPy operations, a kernel
+    is called once for a whole subscript range (or any other array of lanes)
+    instead of once per item. `pure` kernels have no side effects and depend
+    only on their inputs, so identical ones can be computed once.
+    """
+
+    __slots__ = ("inputs", "pure")
+    _children = ("inputs",)
+
+    def __init__(self, name: str, inputs: Sequence[Any] = (), pure: bool = False):
+        super().__init__(name)
+        self.inputs = [_literal(i) for i in inputs]
+        self.pure = pure
+
+    def kernel(self, *values: Any) -> Any:
+        raise NotImplementedError
+
+    @property
+    def _invariance(self) -> str | None:
+        return "inputs" if self.pure and self.inputs is not None else None
+
+    def compute(self, context: dict[str, Any]) -> float:
+        values = [i.compute(context) for i in self.inputs]
+        if any(hasattr(v, "chain") or _carries_derivatives(v) for v in values):
+            return self._differentiate(values)
+        return self.kernel(*values)
+
+    def _differentiate(self, values: list[Any]) -> Any:
+        """
+        The kernel of dual numbers or tape variables, see `Apply.compute`.
+
+        Kernels run NumPy code on plain values, the derivative towards every
+        input is estimated with a finite difference and applied with the
+        chain rule. Only scalar inputs are supported.
+        """
+        if any(_carries_derivatives(v) or np.ndim(v) for v in values):
+            raise ValueError(
+                f"Kernel '{self.name}' can't be differentiated on subscripted values"
+            )
+        plain = [getattr(v, "value", v) for v in values]
+        base = result = self.kernel(*plain)
+        for i, value in enumerate(values):
+            if not hasattr(value, "chain"):
+                continue
+            step = math.sqrt(np.finfo(float).eps) * max(1.0, abs(plain[i]))
+            bumped = plain[:i] + [plain[i] + step] + plain[i + 1 :]
+            derivative = (self.kernel(*bumped) - base) / step
+            result = value.chain(0.0, derivative) + result
+        return result
+
+    @property
+    def dependencies(self) -> list[Element]:
+        return self.inputs
+
+
+class Function(Kernel):
+    r"""A callable function, of the context or of declared inputs"""
 
-    def __init__(self, name: str, func: Callable[[dict[str, Any]], float]):
+    __slots__ = ("func",)
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., float],
+        inputs: Sequence[Any] | None = None,
+        pure: bool = False,
+    ):
         r"""
         Arguments
         ---------
         name : str
             A unique name in the model to refer to this element
-        value : Callable[ctx, float]
+        func : Callable[ctx, float]
             A function in the form of `function(ctx) -> float` that will
             be called during model processing.
+        inputs : Sequence[Element], optional
+            When given, `func` is a kernel instead: it's called with the
+            value of each input, `function(*values)`, and may receive NumPy
+            arrays.
+        pure : bool
+            Whether `func` only depends on its inputs, without side effects.
         """
-        super().__init__(name)
+        super().__init__(name, inputs or (), pure)
         self.func = func
+        if inputs is None:
+            # opaque: reads what it wants from the context
+            self.inputs = None
+
+    def kernel(self, *values: Any) -> Any:
+        return self.func(*values)
 
     def compute(self, context: dict[str, Any]) -> float:
-        return self.func(context)
+        if self.inputs is None:
+            return self.func(context)
+        return super().compute(context)
+
+    @property
+    def dependencies(self) -> list[Element]:
+        return self.inputs or []
 
     def __repr__(self) -> str:
         return f"Function(name={self.name}, func={self.func})"
@@ -127,6 +309,10 @@ class Function(Element):
 class Auxiliary(Element):
     """An element representing a named equation, useful for intermediate calculations."""
 
+    __slots__ = ("equation",)
+    _children = ("equation",)
+    _invariance = "inputs"
+
     def __init__(self, name: str, equation: Element):
         super().__init__(name)
         self.equation = equation
@@ -145,6 +331,9 @@ class Auxiliary(Element):
 class Time(Element):
     """Returns current time of simulation"""
 
+    __slots__ = ()
+    _invariance = "time"
+
     def __init__(self, name: str = "time"):
         super().__init__(name)
 
@@ -155,8 +344,6 @@ class Time(Element):
         return f"Time(name={self.name!r})"
 
 
-import operator
-
 # Map operator symbols to functions
 _OPERATORS = {
     "+": operator.add,
@@ -167,39 +354,232 @@ _OPERATORS = {
     "<": operator.lt,
     ">=": operator.ge,
     "<=": operator.le,
+    "**": operator.pow,
+    "and": lambda a, b: _logical(np.logical_and, a, b),
+    "or": lambda a, b: _logical(np.logical_or, a, b),
 }
 
 
-class Equation(Element):
+def _logical(function: Callable, *values: Any) -> Any:
+    """1.0 or 0.0 where the values (> 0 is true) satisfy the logical `function`."""
+    if any(isinstance(value, np.ndarray) for value in values):
+        return function(*(np.asarray(v) > 0 for v in values)).astype(float)
+    return float(function(*(v > 0 for v in values)))
+
+
+def _literal(value: Any) -> Element:
+    return (
+        value
+        if isinstance(value, Element)
+        else Constant(f"literal_{value}", float(value))
+    )
+
+
+class _Linear:
+    """Accumulates the terms of a flattened sum."""
+
+    def __init__(self):
+        self.terms: list[Element] = []
+        self.subtracted: list[Element] = []
+        self.constant = 0.0
+        self.dims: Dims = ()
+
+    def add(self, element: Any, sign: int):
+        if not isinstance(element, Element):
+            self.constant += sign * float(element)
+        elif isinstance(element, Constant) and element.anonymous:
+            self.constant += sign * element.value
+        elif isinstance(element, Sum):
+            # anonymous sums are never modified, their terms can be copied
+            self.terms.extend(element.terms if sign > 0 else element.subtracted)
+            self.subtracted.extend(element.subtracted if sign > 0 else element.terms)
+            self.constant += sign * element.constant
+            self.dims = merge_dims(self.dims, element.dims)
+        else:
+            (self.terms if sign > 0 else self.subtracted).append(element)
+            self.dims = merge_dims(self.dims, element.dims)
+
+    def adopt(self, element: Sum):
+        """Starts from the operands of `element`, taken over rather than copied."""
+        self.terms, self.subtracted = element._hand_over()
+        self.constant = element.constant
+        self.dims = element.dims
+
+    def build(self) -> Element:
+        if not self.terms and not self.subtracted:
+            return _literal(self.constant)
+        if len(self.terms) == 1 and not self.subtracted and self.constant == 0:
+            return self.terms[0]
+        result = Sum(constant=self.constant, dims=self.dims)
+        # the lists are the builder's own, or taken over, no need to copy them
+        result.terms, result.subtracted = self.terms, self.subtracted
+        return result
+
+
+class _Factors:
+    """Accumulates the factors of a flattened product."""
+
+    def __init__(self):
+        self.factors: list[Element] = []
+        self.divisors: list[Element] = []
+        self.coefficient = 1.0
+        # a literal zero divisor makes the whole product zero (safe division)
+        self.zero = False
+        self.dims: Dims = ()
+
+    def add(self, element: Any, inverse: bool):
+        if not isinstance(element, Element) or (
+            isinstance(element, Constant) and element.anonymous
+        ):
+            value = float(element.value if isinstance(element, Element) else element)
+            if not inverse:
+                self.coefficient *= value
+            elif value == 0:
+                self.zero = True
+            else:
+                self.coefficient /= value
+        elif isinstance(element, Product):
+            self.factors.extend(element.divisors if inverse else element.factors)
+            self.divisors.extend(element.factors if inverse else element.divisors)
+            self.add(element.coefficient, inverse)
+            self.dims = merge_dims(self.dims, element.dims)
+        else:
+            (self.divisors if inverse else self.factors).append(element)
+            self.dims = merge_dims(self.dims, element.dims)
+
+    def adopt(self, element: Product):
+        """Starts from the operands of `element`, taken over rather than copied."""
+        self.factors, self.divisors = element._hand_over()
+        self.coefficient = element.coefficient
+        self.dims = element.dims
+
+    def build(self) -> Element:
+        if self.zero or self.coefficient == 0:
+            return _literal(0.0)
+        if not self.factors and not self.divisors:
+            return _literal(self.coefficient)
+        if len(self.factors) == 1 and not self.divisors and self.coefficient == 1:
+            return self.factors[0]
+        result = Product(coefficient=self.coefficient, dims=self.dims)
+        # the lists are the builder's own, or taken over, no need to copy them
+        result.factors, result.divisors = self.factors, self.divisors
+        return result
+
+
+def _sum(*operands: tuple[Any, int]) -> Element:
+    linear = _Linear()
+    (first, sign), *rest = operands
+    if sign > 0 and isinstance(first, Sum):
+        # `s + x` extends the operands of `s` in place, see `_Chain`
+        linear.adopt(first)
+        operands = rest
+    for operand, sign in operands:
+        linear.add(operand, sign)
+    return linear.build()
+
+
+def _product(*operands: tuple[Any, bool]) -> Element:
+    factors = _Factors()
+    (first, inverse), *rest = operands
+    if not inverse and isinstance(first, Product):
+        factors.adopt(first)
+        operands = rest
+    for operand, inverse in operands:
+        factors.add(operand, inverse)
+    return factors.build()
+
+
+def _total(values: list[Any]) -> Any:
+    """Sum of `values`, correctly rounded (`math.fsum`) when they are plain numbers."""
+    for value in values:
+        if not isinstance(value, (float, int)):
+            # dual numbers, tape variables or arrays
+            return sum(values)
+    return math.fsum(values)
+
+
+_uids = itertools.count()
+
+
+class Expression(Element):
+    """
+    Base class of anonymous operations between elements.
+
+    Expressions are identified by a compact integer `uid`, their `name` is
+    only rendered when asked for. Naming every node of a large expression
+    eagerly would cost O(n log n) characters for a balanced tree and O(n^2)
+    for a chained sum.
+    """
+
+    __slots__ = ("uid",)
+    _invariance = "inputs"
+
+    def __init__(self):
+        # not registered into the model, they are reached through named elements
+        self.model: Model | None = None
+        self.uid = next(_uids)
+
+    @property
+    def anonymous(self) -> bool:
+        return True
+
+    def __getstate__(self) -> tuple[dict[str, Any] | None, dict[str, Any]]:
+        # the name is rendered from the operands, copies must not try to set it
+        slots = {}
+        for cls in type(self).__mro__:
+            for attr in cls.__dict__.get("__slots__", ()):
+                if attr != "name" and hasattr(self, attr):
+                    slots[attr] = getattr(self, attr)
+        return getattr(self, "__dict__", None), slots
+
+    def _tokens(self) -> list[str | Element]:
+        """The parts of the display name, strings or operand elements."""
+        raise NotImplementedError
+
+    @property
+    def name(self) -> str:
+        # rendered iteratively, deep expressions must not hit the recursion limit
+        parts: list[str] = []
+        to_render: list[str | Element] = [self]
+        while to_render:
+            item = to_render.pop()
+            if isinstance(item, Expression):
+                to_render.extend(reversed(item._tokens()))
+            elif isinstance(item, Element):
+                parts.append(item.name)
+            else:
+                parts.append(item)
+        return "".join(parts)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class Equation(Expression):
     """Operation between other elements"""
 
-    def __init__(self, left: Any, op: str, right: Any):
-        _left_element = (
-            left
-            if isinstance(left, Element)
-            else Constant(f"literal_{left}", float(left))
-        )
-        _right_element = (
-            right
-            if isinstance(right, Element)
-            else Constant(f"literal_{right}", float(right))
-        )
-        _name = f"({_left_element.name} {op} {_right_element.name})"  # Generate name correctly
+    __slots__ = ("left", "right", "op", "dims")
+    _children = ("left", "right")
 
-        super().__init__(_name)
-        self.left = _left_element
-        self.right = _right_element
+    def __init__(self, left: Any, op: str, right: Any):
+        super().__init__()
+        self.left = _literal(left)
+        self.right = _literal(right)
         self.op = op
         if self.op not in _OPERATORS:
             raise ValueError(f"Unknown operator: {self.op}")
+        self.dims = merge_dims(self.left.dims, self.right.dims)
 
     def compute(self, context: dict[str, Any]) -> float:
         left_val = self.left.compute(context)
         right_val = self.right.compute(context)
+        if self.dims:
+            left_val = align(left_val, self.left.dims, self.dims)
+            right_val = align(right_val, self.right.dims, self.dims)
 
         # Handle safe division explicitly before using the operator
-        if self.op == "/" and right_val == 0:
-            return 0.0
+        if self.op == "/":
+            return safe_divide(left_val, right_val)
 
         return _OPERATORS[self.op](left_val, right_val)
 
@@ -207,17 +587,299 @@ class Equation(Element):
     def dependencies(self) -> list[Element]:
         deps = []
         if isinstance(self.left, Element) and not (
-            isinstance(self.left, Constant) and self.left.name.startswith("literal_")
+            isinstance(self.left, Constant) and self.left.anonymous
         ):
             deps.append(self.left)
         if isinstance(self.right, Element) and not (
-            isinstance(self.right, Constant) and self.right.name.startswith("literal_")
+            isinstance(self.right, Constant) and self.right.anonymous
         ):
             deps.append(self.right)
         return list(set(deps))  # Remove duplicates
 
+    def _tokens(self) -> list[str | Element]:
+        return ["(", self.left, f" {self.op} ", self.right, ")"]
+
     def __repr__(self) -> str:
         return f"Equation(op={self.op!r}, left={self.left.name!r}, right={self.right.name!r})"
 
-    def __str__(self) -> str:
-        return self.name
+
+class _Chain:
+    """
+    Operand lists that the next node of an operator chain takes over.
+
+    `s + x` appends `x` to the lists of the sum `s` instead of copying them,
+    so that building `a1 + a2 + ... + an` takes linear time. `s` is left with
+    a view of the first items of the lists, copied out when first read. The
+    lists are only ever appended to while shared.
+    """
+
+    __slots__ = ()
+    # names of the two operand lists
+    _lists: tuple[str, str]
+
+    def _hand_over(self) -> tuple[list[Element], list[Element]]:
+        first, second = (getattr(self, attr) for attr in self._lists)
+        for attr in self._lists:
+            delattr(self, attr)
+        self._shared = (first, second, len(first), len(second))
+        return first, second
+
+    def __getattr__(self, attr: str) -> Any:
+        # only called for unset attributes, e.g. the lists of a view
+        if attr not in self._lists or getattr(self, "_shared", None) is None:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{attr}'"
+            )
+        first, second, first_size, second_size = self._shared
+        setattr(self, self._lists[0], first[:first_size])
+        setattr(self, self._lists[1], second[:second_size])
+        self._shared = None
+        return getattr(self, attr)
+
+    def __replace__(self, /, **changes) -> Self:
+        # the first list is passed positionally, e.g. `Sum(*terms, subtracted=...)`
+        cls = self.__class__
+        first = self._lists[0]
+        keywords = [
+            name
+            for name, param in inspect.signature(cls.__init__).parameters.items()
+            if param.kind is param.KEYWORD_ONLY
+        ]
+        unknown = set(changes) - {first, *keywords}
+        if unknown:
+            raise TypeError(f"{cls.__name__} has no field {', '.join(sorted(unknown))}")
+        kwargs = {name: changes.get(name, getattr(self, name)) for name in keywords}
+        # merged again from the operands, unless given
+        kwargs["dims"] = changes.get("dims")
+        return cls(*changes.get(first, getattr(self, first)), **kwargs)
+
+
+class Sum(_Chain, Expression):
+    """
+    Sum of any number of terms, minus any number of subtracted terms, plus a constant.
+
+    Built from `+` and `-` chains, `a1 + a2 + ... + an` is one node whatever n
+    is, evaluated with a single `math.fsum`.
+    """
+
+    __slots__ = ("terms", "subtracted", "constant", "dims", "_shared")
+    _lists = ("terms", "subtracted")
+    _children = ("terms", "subtracted")
+
+    def __init__(
+        self,
+        *terms: Element,
+        subtracted: Sequence[Element] = (),
+        constant: float = 0.0,
+        dims: Dims | None = None,
+    ):
+        super().__init__()
+        self.terms = list(terms)
+        self.subtracted = list(subtracted)
+        self.constant = constant
+        self._shared = None
+        # merged from the operands unless given, operators track them as they go
+        self.dims = (
+            merge_dims(*(term.dims for term in self.terms + self.subtracted))
+            if dims is None
+            else tuple(dims)
+        )
+
+    def compute(self, context: dict[str, Any]) -> float:
+        values = [term.compute(context) for term in self.terms]
+        values.extend(-term.compute(context) for term in self.subtracted)
+        if self.dims:
+            operands = self.terms + self.subtracted
+            values = [align(v, t.dims, self.dims) for v, t in zip(values, operands)]
+            return sum(values, self.constant)
+        if self.constant:
+            values.append(self.constant)
+        return _total(values)
+
+    @property
+    def dependencies(self) -> list[Element]:
+        return self.terms + self.subtracted
+
+    def _tokens(self) -> list[str | Element]:
+        tokens: list[str | Element] = ["("]
+        for term in self.terms:
+            tokens += [" + ", term] if len(tokens) > 1 else [term]
+        for term in self.subtracted:
+            tokens += [" - ", term] if len(tokens) > 1 else ["-", term]
+        if self.constant or len(tokens) == 1:
+            sign = "-" if self.constant < 0 else "+"
+            tokens.append(
+                f" {sign} {abs(self.constant)!r}"
+                if len(tokens) > 1
+                else f"{self.constant!r}"
+            )
+        return tokens + [")"]
+
+    def __repr__(self) -> str:
+        return f"Sum(uid={self.uid!r}, terms={len(self.terms)!r}, subtracted={len(self.subtracted)!r}, constant={self.constant!r})"
+
+
+class Product(_Chain, Expression):
+    """
+    Product of any number of factors, divided by any number of divisors, times a coefficient.
+
+    Built from `*` and `/` chains, follows the safe division of `Equation`:
+    the product is zero when any divisor is zero.
+    """
+
+    __slots__ = ("factors", "divisors", "coefficient", "dims", "_shared")
+    _lists = ("factors", "divisors")
+    _children = ("factors", "divisors")
+
+    def __init__(
+        self,
+        *factors: Element,
+        divisors: Sequence[Element] = (),
+        coefficient: float = 1.0,
+        dims: Dims | None = None,
+    ):
+        super().__init__()
+        self.factors = list(factors)
+        self.divisors = list(divisors)
+        self.coefficient = coefficient
+        self._shared = None
+        self.dims = (
+            merge_dims(*(factor.dims for factor in self.factors + self.divisors))
+            if dims is None
+            else tuple(dims)
+        )
+
+    def compute(self, context: dict[str, Any]) -> float:
+        dims = self.dims
+        values = [factor.compute(context) for factor in self.factors]
+        if dims:
+            values = [align(v, f.dims, dims) for v, f in zip(values, self.factors)]
+        value = math.prod(values, start=self.coefficient)
+        for divisor in self.divisors:
+            divisor_val = divisor.compute(context)
+            if dims or isinstance(divisor_val, np.ndarray):
+                # element-wise safe division
+                value = safe_divide(value, align(divisor_val, divisor.dims, dims))
+                continue
+            # same safe division as Equation
+            if divisor_val == 0:
+                return 0.0
+            value = value / divisor_val
+        return value
+
+    @property
+    def dependencies(self) -> list[Element]:
+        return self.factors + self.divisors
+
+    def _tokens(self) -> list[str | Element]:
+        tokens: list[str | Element] = ["("]
+        if self.coefficient != 1 or not self.factors:
+            tokens.append(f"{self.coefficient!r}")
+        for factor in self.factors:
+            tokens += [" * ", factor] if len(tokens) > 1 else [factor]
+        for divisor in self.divisors:
+            tokens += [" / ", divisor]
+        return tokens + [")"]
+
+    def __repr__(self) -> str:
+        return f"Product(uid={self.uid!r}, factors={len(self.factors)!r}, divisors={len(self.divisors)!r}, coefficient={self.coefficient!r})"
+
+
+_REDUCTIONS = {"sum": np.sum, "mean": np.mean}
+
+
+class Reduction(Expression):
+    """Reduces a subscripted element over one of its dimensions"""
+
+    __slots__ = ("element", "how", "dim", "axis", "dims")
+    _children = ("element",)
+
+    def __init__(self, element: Element, how: str, dim: str):
+        super().__init__()
+        if how not in _REDUCTIONS:
+            raise ValueError(f"Unknown reduction: {how}")
+        if dim not in element.dims:
+            raise ValueError(f"'{element.name}' has no dimension '{dim}'")
+        self.element = element
+        self.how = how
+        self.dim = dim
+        self.axis = element.dims.index(dim)
+        self.dims = tuple(d for d in element.dims if d != dim)
+
+    def compute(self, context: dict[str, Any]) -> float:
+        return _REDUCTIONS[self.how](self.element.compute(context), axis=self.axis)
+
+    @property
+    def dependencies(self) -> list[Element]:
+        return [self.element]
+
+    def _tokens(self) -> list[str | Element]:
+        return [f"{self.how}(", self.element, f", {self.dim!r})"]
+
+    def __repr__(self) -> str:
+        return f"Reduction(how={self.how!r}, element={self.element.name!r}, dim={self.dim!r})"
+
+
+# name: (function of a number, function of an array, derivative from x and f(x))
+_FUNCTIONS: dict[str, tuple[Callable, Callable, Callable]] = {
+    "exp": (math.exp, np.exp, lambda x, y: y),
+    "log": (math.log, np.log, lambda x, y: 1 / x),
+    "sqrt": (math.sqrt, np.sqrt, lambda x, y: 0.5 / y if y else 0.0),
+    "abs": (abs, np.abs, lambda x, y: (x > 0) - (x < 0)),
+    "not": (
+        lambda x: _logical(np.logical_not, x),
+        lambda x: _logical(np.logical_not, x),
+        lambda x, y: 0.0,
+    ),
+}
+
+
+class Apply(Expression):
+    """A math function applied to an element, see `exp`, `log` and `sqrt`"""
+
+    __slots__ = ("function", "operand", "dims")
+    _children = ("operand",)
+
+    def __init__(self, function: str, operand: Any):
+        super().__init__()
+        if function not in _FUNCTIONS:
+            raise ValueError(f"Unknown function: {function}")
+        self.function = function
+        self.operand = _literal(operand)
+        self.dims = self.operand.dims
+
+    def compute(self, context: dict[str, Any]) -> float:
+        scalar, vector, derivative = _FUNCTIONS[self.function]
+        x = self.operand.compute(context)
+        if isinstance(x, np.ndarray):
+            return vector(x)
+        if isinstance(x, (float, int)):
+            return scalar(x)
+        # dual numbers and tape variables apply the chain rule
+        y = scalar(x.value)
+        return x.chain(y, derivative(x.value, y))
+
+    @property
+    def dependencies(self) -> list[Element]:
+        return [self.operand]
+
+    def _tokens(self) -> list[str | Element]:
+        return [f"{self.function}(", self.operand, ")"]
+
+    def __repr__(self) -> str:
+        return f"Apply(function={self.function!r}, operand={self.operand.name!r})"
+
+
+def exp(x: Any) -> Apply:
+    """e raised to the power of `x`."""
+    return Apply("exp", x)
+
+
+def log(x: Any) -> Apply:
+    """Natural logarithm of `x`."""
+    return Apply("log", x)
+
+
+def sqrt(x: Any) -> Apply:
+    """Square root of `x`."""
+    return Apply("sqrt", x)
@@ -0,0 +1,59 @@
+"""Helpers for subscripted (array-valued) elements."""
+
+from __future__ import annotations
+from typing import Any
+
+import numpy as np
+
+Dims = tuple[str, ...]
+
+
+def merge_dims(*all_dims: Dims) -> Dims:
+    """Union of dimensions, in order of first appearance."""
+    merged: list[str] = []
+    for dims in all_dims:
+        merged.extend(dim for dim in dims if dim not in merged)
+    return tuple(merged)
+
+
+def as_array(value: Any, dims: Dims) -> Any:
+    """The value of an element subscripted by `dims`, a float array when it has any."""
+    if not dims:
+        return value
+    array = np.asarray(value, dtype=float)
+    if array.ndim != len(dims):
+        raise ValueError(
+            f"Value with {array.ndim} dimension(s) doesn't match dims {dims!r}"
+        )
+    return array
+
+
+def align(value: Any, dims: Dims, target: Dims) -> Any:
+    """Lays out `value`, indexed by `dims`, along `target` so it broadcasts."""
+    if not dims or dims == target:
+        return value
+    value = np.transpose(value, [dims.index(d) for d in target if d in dims])
+    sizes = iter(value.shape)
+    return np.reshape(value, [next(sizes) if d in dims else 1 for d in target])
+
+
+def safe_divide(a: Any, b: Any) -> Any:
+    """Division where a zero divisor gives zero, element-wise for arrays."""
+    if isinstance(b, np.ndarray):
+        shape = np.broadcast_shapes(np.shape(a), b.shape)
+        return np.divide(a, b, out=np.zeros(shape), where=b != 0)
+    if b == 0:
+        return 0.0
+    return a / b
+
+
+def flatten(values: dict[str, Any]) -> dict[str, Any]:
+    """One entry per array item, `name[i]` or `name[i,j]`, scalars left as is."""
+    flat: dict[str, Any] = {}
+    for name, value in values.items():
+        if isinstance(value, np.ndarray) and value.ndim:
+            for index, item in np.ndenumerate(value):
+                flat[f"{name}[{','.join(map(str, index))}]"] = item
+        else:
+            flat[name] = value
+    return flat
@@ -0,0 +1,332 @@
+"""Export of a model to a standalone Python module, see `Model.export_python`."""
+
+from __future__ import annotations
+import math
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+import numpy as np
+
+from mead.core import Element, Constant, Auxiliary, Time, Equation, Sum, Product
+from mead.core import Apply
+from mead.components import Delay, Smooth, Table, IfThenElse, Min, Max, Pulse
+from mead.components import Step, Ramp, Delay2, Delay3, Initial, Flow
+from mead.graph import _operands
+from mead.stock import Stock
+
+if TYPE_CHECKING:
+    from mead.model import Model
+
+# helpers and integration loop of every exported module, copied verbatim
+_RUNTIME = '''
+
+def _divide(a, b):
+    return 0.0 if b == 0 else a / b
+
+
+def _lookup(history, name, time, delay):
+    """Value of `name` at the last recorded time no later than `time - delay`."""
+    if history is None:
+        # initial values are computed without a history
+        return 0.0
+    times, records = history
+    target = time - delay
+    if not times or target < times[0]:
+        return INITIAL.get(name, 0.0)
+    return records[bisect.bisect_right(times, target) - 1].get(name, 0.0)
+
+
+def _smooth(history, name, time, target, smoothing_time):
+    previous = _lookup(history, name, time, DT)
+    if smoothing_time == 0:
+        return target
+    return previous + (DT / smoothing_time) * (target - previous)
+
+
+def _table(x, points):
+    if x <= points[0][0]:
+        return points[0][1]
+    if x >= points[-1][0]:
+        return points[-1][1]
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
+        if x1 <= x <= x2:
+            if x1 == x2:
+                return (y1 + y2) / 2
+            return y1 + (x - x1) * (y2 - y1) / (x2 - x1)
+    return 0.0
+
+
+def _ramp(time, start, end, slope, initial):
+    if time < start:
+        return initial
+    if time <= end:
+        return initial + slope * (time - start)
+    return initial + slope * (end - start)
+
+
+def _euler(time, state, history, initial):
+    k1 = _rates(time, state, history, initial)
+    return {name: state[name] + k1[name] * DT for name in state}
+
+
+def _rk4(time, state, history, initial):
+    half = DT / 2
+    k1 = _rates(time, state, history, initial)
+    stage = {name: state[name] + k1[name] * half for name in state}
+    k2 = _rates(time + half, stage, history, initial)
+    stage = {name: state[name] + k2[name] * half for name in state}
+    k3 = _rates(time + half, stage, history, initial)
+    stage = {name: state[name] + k3[name] * DT for name in state}
+    k4 = _rates(time + DT, stage, history, initial)
+    return {
+        name: state[name]
+        + (k1[name] + 2 * k2[name] + 2 * k3[name] + k4[name]) / 6 * DT
+        for name in state
+    }
+
+
+_METHODS = {"euler": _euler, "rk4": _rk4}
+
+
+def run(duration, method="euler", numpy=False):
+    """
+    Simulates the model for `duration` time units, "euler" or "rk4".
+
+    Returns the columns of the results by name, "time" first, as lists or
+    as NumPy arrays with `numpy=True`.
+    """
+    if method not in _METHODS:
+        raise ValueError(f"Unknown integration method: {method}")
+    step = _METHODS[method]
+    steps = int(duration / DT)
+    state = dict(INITIAL)
+    initial = _values(0.0, dict(INITIAL), None, None)
+    times, records = [], []
+    history = (times, records)
+    for i in range(steps + 1):
+        time = i * DT
+        records.append(_values(time, state, history, initial))
+        times.append(time)
+        if i < steps:
+            state = step(time, state, history, initial)
+    columns = {"time": times}
+    for name in COLUMNS:
+        columns[name] = [record[name] for record in records]
+    if numpy:
+        import numpy as np
+
+        columns = {name: np.asarray(values) for name, values in columns.items()}
+    return columns
+
+
+if __name__ == "__main__":
+    import sys
+
+    results = run(float(sys.argv[1]) if len(sys.argv) > 1 else 10.0)
+    print(",".join(results))
+    for row in zip(*results.values()):
+        print(",".join(map(repr, row)))
+'''
+
+
+def _number(value: Any) -> str:
+    """Python source of a plain number."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if not isinstance(value, (int, float)):
+        raise ValueError(f"Can't export value {value!r}, only plain numbers")
+    if isinstance(value, float) and not math.isfinite(value):
+        return f"float({str(value)!r})"
+    return repr(value)
+
+
+def _initial(element: Initial, ref: Callable[[Element], str]) -> str:
+    if isinstance(element.input_element, Stock):
+        return _number(element.input_element.initial_value)
+    # computed by the pass at t=0 that has no `initial` yet
+    return (
+        f"({ref(element.input_element)} if initial is None "
+        f"else initial[{element.name!r}])"
+    )
+
+
+def _equation(element: Equation, ref: Callable[[Element], str]) -> str:
+    left, right = ref(element.left), ref(element.right)
+    if element.op == "/":
+        return f"_divide({left}, {right})"
+    if element.op in ("and", "or"):
+        return f"float({left} > 0 {element.op} {right} > 0)"
+    return f"({left} {element.op} {right})"
+
+
+def _sum(element: Sum, ref: Callable[[Element], str]) -> str:
+    values = [ref(term) for term in element.terms]
+    values += [f"-{ref(term)}" for term in element.subtracted]
+    if element.constant:
+        values.append(_number(element.constant))
+    return f"math.fsum([{', '.join(values)}])"
+
+
+def _product(element: Product, ref: Callable[[Element], str]) -> str:
+    code = " * ".join(
+        [_number(element.coefficient)] + [ref(f) for f in element.factors]
+    )
+    if not element.divisors:
+        return f"({code})"
+    divisors = [ref(d) for d in element.divisors]
+    code += "".join(f" / {d}" for d in divisors)
+    zero = " or ".join(f"{d} == 0" for d in divisors)
+    return f"(0.0 if {zero} else {code})"
+
+
+def _table(element: Table, ref: Callable[[Element], str]) -> str:
+    points = ", ".join(f"({_number(x)}, {_number(y)})" for x, y in element.points)
+    return f"_table({ref(element.input_element)}, ({points},))"
+
+
+_APPLY = {
+    "exp": "math.exp({})",
+    "log": "math.log({})",
+    "sqrt": "math.sqrt({})",
+    "abs": "abs({})",
+    "not": "float(not {} > 0)",
+}
+
+# Python source of the value of an element, from the source of its operands
+_EMITTERS: dict[type, Callable[[Any, Callable[[Element], str]], str]] = {
+    Constant: lambda e, ref: _number(e.value),
+    Stock: lambda e, ref: f"state[{e.name!r}]",
+    Time: lambda e, ref: "time",
+    Auxiliary: lambda e, ref: ref(e.equation),
+    Flow: lambda e, ref: ref(e.equation),
+    Equation: _equation,
+    Sum: _sum,
+    Product: _product,
+    Apply: lambda e, ref: _APPLY[e.function].format(ref(e.operand)),
+    Table: _table,
+    IfThenElse: lambda e, ref: (
+        f"({ref(e.true_element)} if {ref(e.condition)} > 0 "
+        f"else {ref(e.false_element)})"
+    ),
+    Min: lambda e, ref: f"min([{', '.join(map(ref, e.input_elements))}])",
+    Max: lambda e, ref: f"max([{', '.join(map(ref, e.input_elements))}])",
+    Pulse: lambda e, ref: (
+        f"({ref(e.magnitude)} if {ref(e.start_time)} <= time "
+        f"< {ref(e.start_time)} + {ref(e.duration)} else 0.0)"
+    ),
+    Step: lambda e, ref: (
+        f"({ref(e.before_value)} if time < {ref(e.start_time)} "
+        f"else {ref(e.after_value)})"
+    ),
+    Ramp: lambda e, ref: (
+        f"_ramp(time, {ref(e.start_time)}, {ref(e.end_time)}, "
+        f"{ref(e.slope)}, {ref(e.initial_value)})"
+    ),
+    Initial: _initial,
+    Delay: lambda e, ref: (
+        f"_lookup(history, {e.input.name!r}, time, {ref(e.delay_time)})"
+    ),
+    Smooth: lambda e, ref: (
+        f"({ref(e.initial_value)} if time == 0.0 else _smooth(history, "
+        f"{e.name!r}, time, {ref(e.target_value)}, {ref(e.smoothing_time)}))"
+    ),
+    Delay2: lambda e, ref: ref(e.smooth2),
+    Delay3: lambda e, ref: ref(e.smooth3),
+}
+
+
+def _order(roots: list[Element]) -> list[Element]:
+    """Nodes below `roots`, operands first, refusing cycles."""
+    order: list[Element] = []
+    status: dict[int, bool] = {}  # done or not
+    stack = [(root, False) for root in reversed(roots)]
+    while stack:
+        element, expanded = stack.pop()
+        if expanded:
+            status[id(element)] = True
+            order.append(element)
+            continue
+        done = status.get(id(element))
+        if done:
+            continue
+        if done is not None:
+            raise ValueError(
+                f"'{element.name}' is on an algebraic loop, "
+                "models with algebraic loops can't be exported"
+            )
+        status[id(element)] = False
+        stack.append((element, True))
+        stack.extend((op, False) for op in reversed(_operands(element)))
+    return order
+
+
+def _function(name: str, roots: list[Element], result: Callable) -> list[str]:
+    """Source of a function computing `roots`, one line per node."""
+    refs: dict[int, str] = {}
+    lines = [f"def {name}(time, state, history, initial):"]
+    for element in _order(roots):
+        if isinstance(element, Constant) and element.anonymous:
+            refs[id(element)] = _number(element.value)
+            continue
+        emitter = _EMITTERS.get(type(element))
+        if emitter is None:
+            raise ValueError(
+                f"{type(element).__name__} '{element.name}' can't be exported"
+            )
+        if element.dims:
+            raise ValueError(
+                f"'{element.name}' is subscripted, only scalar models can be exported"
+            )
+        code = emitter(element, lambda e: refs[id(e)])
+        refs[id(element)] = f"v{len(lines) - 1}"
+        comment = "" if element.anonymous else f"  # {element.name}"
+        lines.append(f"    {refs[id(element)]} = {code}{comment}")
+    lines.append(f"    return {result(lambda e: refs[id(e)])}")
+    return lines
+
+
+def export_python(model: Model, path: str | Path) -> Path:
+    """Writes `model` as a Python module that runs without mead, see `Model.export_python`."""
+    from mead import __version__
+
+    all_elements = model._collect_all_elements()
+    stocks = list(model.stocks.values())
+    flows = [f for stock in stocks for f in stock.inflows + stock.outflows]
+
+    def rates(ref: Callable[[Element], str]) -> str:
+        entries = []
+        for stock in stocks:
+            rate = "0.0" + "".join(f" + {ref(f)}" for f in stock.inflows)
+            rate += "".join(f" - {ref(f)}" for f in stock.outflows)
+            entries.append(f"{stock.name!r}: {rate}")
+        return "{" + ", ".join(entries) + "}"
+
+    def values(ref: Callable[[Element], str]) -> str:
+        entries = [f"{name!r}: {ref(e)}" for name, e in all_elements.items()]
+        return "{" + ", ".join(entries) + "}"
+
+    initial = ", ".join(
+        f"{stock.name!r}: {_number(stock.initial_value)}" for stock in stocks
+    )
+    source = [
+        f'"""Model {model.name!r}, exported from mead {__version__}.',
+        "",
+        "Runs on the Python standard library alone, see `run`.",
+        '"""',
+        "",
+        "import bisect",
+        "import math",
+        "",
+        f"DT = {_number(model.dt)}",
+        f"INITIAL = {{{initial}}}",
+        f"COLUMNS = {tuple(all_elements)!r}",
+        "",
+        "",
+        *_function("_rates", flows, rates),
+        "",
+        "",
+        *_function("_values", list(all_elements.values()), values),
+    ]
+    path = Path(path)
+    path.write_text("\n".join(source) + _RUNTIME)
+    return path
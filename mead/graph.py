@@ -0,0 +1,255 @@
+"""Analysis of the element graph of a model: what a run needs and what it costs."""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Sequence
+
+from mead.core import Element, Function
+from mead.compiler import Hoisted, Shared
+from mead.stock import Stock
+from mead.utils import children, strongly_connected
+
+if TYPE_CHECKING:
+    from mead.model import Model
+
+
+def _distinct(elements: list[Element]) -> list[Element]:
+    return list({id(element): element for element in elements}.values())
+
+
+def _operands(element: Element) -> list[Element]:
+    """What computing `element` evaluates: stocks are leaves, history isn't computed."""
+    if isinstance(element, Stock):
+        return []
+    lagged = {id(e) for e in element._history_reads}
+    return [e for e in _distinct(children(element)) if id(e) not in lagged]
+
+
+def _resolve(
+    outputs: Sequence[Element | str], all_elements: dict[str, Element]
+) -> list[str]:
+    names = []
+    for output in outputs:
+        name = output if isinstance(output, str) else output.name
+        if name not in all_elements:
+            raise ValueError(f"Output '{name}' is not an element of the model")
+        names.append(name)
+    return names
+
+
+def live_elements(
+    model: Model,
+    all_elements: dict[str, Element],
+    outputs: Sequence[Element | str],
+) -> tuple[dict[str, Element], list[str]]:
+    """
+    Elements a run needs to produce the stocks and `outputs`, and the names to record.
+
+    Everything reachable from the stocks (through their flows) and from the
+    outputs is live. Elements whose past values are read from the history,
+    such as the input of a `Delay`, are recorded along with the outputs.
+    """
+    recorded = list(model.stocks) + [
+        name for name in _resolve(outputs, all_elements) if name not in model.stocks
+    ]
+    live: set[int] = set()
+    to_process = [all_elements[name] for name in recorded]
+    while to_process:
+        element = to_process.pop()
+        if id(element) in live:
+            continue
+        live.add(id(element))
+        for past in element._history_reads:
+            if past.name not in recorded:
+                recorded.append(past.name)
+        to_process.extend(children(element))
+    elements = {
+        name: element for name, element in all_elements.items() if id(element) in live
+    }
+    return elements, recorded
+
+
+@dataclass
+class GraphReport:
+    """
+    Statistics of the element graph of a model, see `Model.analyze`.
+
+    `fan_in` and `fan_out` count, for every named element, the named elements
+    it reads and that read it, looking through anonymous expressions. `loops`
+    lists the groups of elements that depend on each other without a stock or
+    a delay in between (algebraic loops), `subsystems` counts the parts of the
+    model that could be simulated independently. `cost` estimates the number of node
+    evaluations per derivative evaluation of the compiled model, after
+    simplification, sharing and hoisting, and `record_cost` the number per
+    recorded step. Algebraic loops count as a single iteration.
+    """
+
+    nodes: int
+    elements: int
+    depth: int
+    fan_in: dict[str, int] = field(repr=False)
+    fan_out: dict[str, int] = field(repr=False)
+    loops: list[list[str]]
+    pruned: list[str]
+    subsystems: int
+    cost: int
+    record_cost: int
+    # derivative evaluations per step of every integration method
+    stages: dict[str, int] = field(repr=False)
+
+    def step_cost(self, method: str = "euler") -> int:
+        """Estimated node evaluations per time step with an integration method."""
+        return self.cost * self.stages[method] + self.record_cost
+
+    def summary(self) -> str:
+        fan_in = max(self.fan_in.items(), key=lambda item: item[1], default=("-", 0))
+        fan_out = max(self.fan_out.items(), key=lambda item: item[1], default=("-", 0))
+        return "\n".join(
+            [
+                f"nodes: {self.nodes} ({self.elements} named, {len(self.pruned)} pruned)",
+                f"depth: {self.depth}",
+                f"max fan-in: {fan_in[1]} ({fan_in[0]})",
+                f"max fan-out: {fan_out[1]} ({fan_out[0]})",
+                f"algebraic loops: {len(self.loops)}",
+                f"independent subsystems: {self.subsystems}",
+                f"cost per step: {self.step_cost('euler')} (euler), "
+                f"{self.step_cost('rk4')} (rk4)",
+            ]
+        )
+
+
+def _named_operands(element: Element) -> list[Element]:
+    """The nearest named elements below `element`, through anonymous ones."""
+    found: dict[int, Element] = {}
+    seen: set[int] = set()
+    to_process = list(_operands(element))
+    while to_process:
+        node = to_process.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if node.anonymous:
+            to_process.extend(_operands(node))
+        else:
+            found[id(node)] = node
+    return list(found.values())
+
+
+def subsystems(model: Model) -> list[list[str]]:
+    """
+    Names of the elements of every independent part of a model.
+
+    These are the weakly connected components of the element graph: two
+    elements are in the same subsystem when one reads the other, directly or
+    through other elements, in either direction. A `Function` of the context
+    links the whole model. Subsystems can be simulated separately, see
+    `Model.run(workers=...)`.
+    """
+    all_elements = model._collect_all_elements()
+    parent = {id(e): id(e) for e in all_elements.values()}
+
+    def find(key: int) -> int:
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for element in all_elements.values():
+        # links go through anonymous expressions to the named elements below
+        seen: set[int] = set()
+        to_process = children(element)
+        while to_process:
+            node = to_process.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if id(node) in parent:
+                parent[find(id(node))] = find(id(element))
+            else:
+                to_process.extend(children(node))
+
+    # a function of the context may read any stock, or the history of any element
+    opaque = [
+        e for e in all_elements.values() if isinstance(e, Function) and e.inputs is None
+    ]
+    if opaque:
+        for element in all_elements.values():
+            parent[find(id(element))] = find(id(opaque[0]))
+
+    groups: dict[int, list[str]] = {}
+    for name, element in all_elements.items():
+        groups.setdefault(find(id(element)), []).append(name)
+    return list(groups.values())
+
+
+def _depth(roots: list[Element]) -> tuple[int, int]:
+    """Number of nodes and longest chain of nested evaluations below `roots`."""
+    depth: dict[int, int] = {}
+    stack = [(root, False) for root in roots]
+    while stack:
+        element, expanded = stack.pop()
+        key = id(element)
+        if expanded:
+            # operands still open are on a loop, they don't add to the depth
+            depth[key] = 1 + max(
+                (depth.get(id(op), 0) for op in _operands(element)), default=0
+            )
+        elif key not in depth:
+            depth[key] = 0
+            stack.append((element, True))
+            stack.extend((op, False) for op in _operands(element))
+    return len(depth), max(depth.values(), default=0)
+
+
+def _cost(roots: list[Element]) -> int:
+    """Nodes evaluated to compute `roots` in a compiled plan, once each."""
+    seen: set[int] = set()
+    cost = 0
+    to_process = list(roots)
+    while to_process:
+        element = to_process.pop()
+        if id(element) in seen:
+            continue
+        seen.add(id(element))
+        if not isinstance(element, Shared):
+            cost += 1
+        # hoisted subgraphs are looked up, stocks read from the state
+        if not isinstance(element, (Hoisted, Stock)):
+            to_process.extend(children(element))
+    return cost
+
+
+def analyze(model: Model, outputs: Sequence[Element | str] = ()) -> GraphReport:
+    """Graph statistics of the elements a run of `model` needs, and of its plan."""
+    all_elements = model._collect_all_elements()
+    live, recorded = live_elements(model, all_elements, outputs)
+    graph = {
+        name: [op.name for op in _named_operands(element)]
+        for name, element in live.items()
+        if not element.anonymous
+    }
+    fan_out = dict.fromkeys(graph, 0)
+    for operands in graph.values():
+        for name in operands:
+            fan_out[name] = fan_out.get(name, 0) + 1
+
+    stocks = list(model.stocks.values())
+    flows = [f for stock in stocks for f in stock.inflows + stock.outflows]
+    nodes, depth = _depth(flows + [live[name] for name in recorded])
+    plan = model.compile(outputs)
+    flows = [f for flows in plan.inflows.values() for f in flows]
+    flows += [f for flows in plan.outflows.values() for f in flows]
+    records = [plan.elements[name] for name in plan.recorded]
+    return GraphReport(
+        nodes=nodes,
+        elements=len(graph),
+        depth=depth,
+        fan_in={name: len(operands) for name, operands in graph.items()},
+        fan_out=fan_out,
+        loops=strongly_connected(graph),
+        pruned=[name for name in all_elements if name not in live],
+        subsystems=len(subsystems(model)),
+        cost=_cost(flows),
+        record_cost=_cost([e for e in records if not isinstance(e, Stock)]),
+        stages={name: solver.stages for name, solver in model._solvers.items()},
+    )
@@ -1,4 +1,5 @@
 from .components import Element
+from .utils import attributes
 from typing import TypeVar, Generic
 
 T = TypeVar("T", bound=Element)
@@ -61,7 +62,7 @@ class Inspect(Generic[T], metaclass=InspectMeta):
         return attr
 
     def _render(self):
-        attrs = vars(self._element)
+        attrs = attributes(self._element)
         out = []
         for name, value in attrs.items():
             if self._should_show(name):
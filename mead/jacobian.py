@@ -0,0 +1,205 @@
+"""Sparse Jacobian of the stock derivatives of a model."""
+
+from __future__ import annotations
+import sys
+from typing import TYPE_CHECKING, Any, Mapping, Sequence
+
+import numpy as np
+
+from mead.core import Element, Function, Kernel
+from mead.stock import Stock
+from mead.sensitivity import Dual
+from mead.utils import children
+
+if TYPE_CHECKING:
+    from mead.model import Model
+
+
+class _RecordingState(dict):
+    """A state mapping that remembers which stocks were read from it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read: set[str] = set()
+
+    def __getitem__(self, key):
+        self.read.add(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.read.add(key)
+        return super().get(key, default)
+
+
+def _reach(
+    roots: list[Element],
+) -> tuple[set[str], list[Kernel]]:
+    """Stocks and kernels (functions included) reachable from `roots` without crossing a stock."""
+    stocks: set[str] = set()
+    opaque: list[Kernel] = []
+    seen: set[int] = set()
+    to_process = list(roots)
+    while to_process:
+        element = to_process.pop()
+        if id(element) in seen:
+            continue
+        seen.add(id(element))
+        if isinstance(element, Stock):
+            stocks.add(element.name)
+            continue
+        if isinstance(element, Kernel):
+            opaque.append(element)
+        to_process.extend(children(element))
+    return stocks, opaque
+
+
+def _color_columns(rows: list[set[int]], n: int) -> list[int]:
+    """Greedy coloring: columns sharing a row never share a color."""
+    neighbours: list[set[int]] = [set() for _ in range(n)]
+    for columns in rows:
+        for j in columns:
+            neighbours[j].update(columns)
+    colors = [-1] * n
+    # color the most constrained columns first
+    for j in sorted(range(n), key=lambda j: -len(neighbours[j])):
+        taken = {colors[k] for k in neighbours[j] if k != j}
+        color = 0
+        while color in taken:
+            color += 1
+        colors[j] = color
+    return colors
+
+
+class Jacobian:
+    """
+    dF/dX of the stock derivatives F, in compressed sparse row (CSR) layout.
+
+    The sparsity pattern comes from the element graph: entry (i, j) exists
+    when stock j is reachable from the flows of stock i. Values are derived
+    from the `Equation` tree by propagating dual numbers seeded on every
+    stock, one evaluation for the whole matrix. Rows that go through opaque
+    code, a `Kernel` or `Function`, are estimated with finite differences instead, using
+    column coloring so that one perturbed evaluation serves every column of a
+    color.
+
+    A `Function` reading the context has no declared inputs: the stocks it
+    reads are found by calling it once, at t=0 on the initial state. Stocks
+    it only reads at other times or states are missing from the pattern,
+    declare its `inputs` for an exact one.
+
+    `(values, indices, indptr)` can be handed as is to
+    `scipy.sparse.csr_matrix` when scipy is available.
+    """
+
+    def __init__(self, model: Model):
+        if any(stock.dims for stock in model.stocks.values()):
+            raise ValueError("Jacobian of subscripted stocks is not supported")
+        self.model = model
+        model.compile()
+        self.stocks: list[str] = list(model.stocks)
+        column = {name: j for j, name in enumerate(self.stocks)}
+
+        rows: list[set[int]] = []
+        self.opaque_rows: list[int] = []
+        for i, stock in enumerate(model.stocks.values()):
+            reached, opaque = _reach(stock.inflows + stock.outflows)
+            for function in opaque:
+                if isinstance(function, Function) and function.inputs is None:
+                    # reads the state directly, find out what it reads
+                    reached |= self._probe(function)
+            rows.append({column[name] for name in reached if name in column})
+            if opaque:
+                self.opaque_rows.append(i)
+
+        self.indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        self.indices = np.array(
+            [j for columns in rows for j in sorted(columns)], dtype=np.int64
+        )
+        for i, columns in enumerate(rows):
+            self.indptr[i + 1] = self.indptr[i] + len(columns)
+
+        self.colors = _color_columns([rows[i] for i in self.opaque_rows], len(rows))
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return (len(self.stocks), len(self.stocks))
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    def _probe(self, function: Function) -> set[str]:
+        """Stocks an opaque function reads from the state, at the initial state."""
+        state = _RecordingState(
+            {name: s.initial_value for name, s in self.model.stocks.items()}
+        )
+        function.compute(self.model._create_element_context(0.0, state))
+        return state.read
+
+    def _state(
+        self, state: Mapping[str, float] | Sequence[float] | None
+    ) -> dict[str, float]:
+        if state is None:
+            return {name: s.initial_value for name, s in self.model.stocks.items()}
+        if isinstance(state, Mapping):
+            return {name: state[name] for name in self.stocks}
+        return dict(zip(self.stocks, state))
+
+    def __call__(
+        self,
+        time: float = 0.0,
+        state: Mapping[str, float] | Sequence[float] | None = None,
+    ) -> np.ndarray:
+        """Values of the nonzero entries at (time, state), aligned with `indices`."""
+        x = self._state(state)
+        values = np.zeros(self.nnz)
+
+        # kernels may not take dual numbers (e.g. NumPy or math calls),
+        # their rows come from finite differences alone
+        opaque = set(self.opaque_rows)
+        rows = [i for i in range(len(self.stocks)) if i not in opaque]
+        seeded = {name: Dual.seed(name, value) for name, value in x.items()}
+        derivatives = self.model._compute_derivatives(
+            time, seeded, stocks=[self.stocks[i] for i in rows]
+        )
+        for i in rows:
+            derivative = derivatives[self.stocks[i]]
+            if not isinstance(derivative, Dual):
+                continue
+            for k in range(self.indptr[i], self.indptr[i + 1]):
+                values[k] = derivative.derivative(self.stocks[self.indices[k]])
+
+        if self.opaque_rows:
+            self._finite_differences(time, x, values)
+        return values
+
+    def _finite_differences(
+        self, time: float, x: dict[str, float], values: np.ndarray
+    ) -> None:
+        base = self.model._compute_derivatives(time, x)
+        steps = [
+            np.sqrt(sys.float_info.epsilon) * max(1.0, abs(x[name]))
+            for name in self.stocks
+        ]
+        for color in range(max(self.colors) + 1):
+            perturbed = dict(x)
+            for j, name in enumerate(self.stocks):
+                if self.colors[j] == color:
+                    perturbed[name] = x[name] + steps[j]
+            bumped = self.model._compute_derivatives(time, perturbed)
+            for i in self.opaque_rows:
+                name = self.stocks[i]
+                for k in range(self.indptr[i], self.indptr[i + 1]):
+                    j = self.indices[k]
+                    if self.colors[j] == color:
+                        values[k] = (bumped[name] - base[name]) / steps[j]
+
+    def to_dense(self, values: np.ndarray) -> np.ndarray:
+        dense = np.zeros(self.shape)
+        for i in range(len(self.stocks)):
+            start, end = self.indptr[i], self.indptr[i + 1]
+            dense[i, self.indices[start:end]] = values[start:end]
+        return dense
+
+    def __repr__(self) -> str:
+        return f"Jacobian(shape={self.shape!r}, nnz={self.nnz!r}, colors={max(self.colors, default=-1) + 1!r})"
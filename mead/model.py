@@ -1,26 +1,65 @@
-import pandas as pd
-from typing import Literal, Type, Any, List, Optional, Dict
+from __future__ import annotations
+from typing import TYPE_CHECKING, Literal, Type, Any, List, Optional, Dict, Callable
 from pathlib import Path
-import matplotlib.pyplot as plt
-from copy import deepcopy
+from copy import copy, deepcopy
 
-from mead.core import Element
+from mead.core import Element, Constant
+from mead.components import Conveyor, DelayN
 from mead.stock import Stock
-from mead.context import current_model
+from mead.sensitivity import Dual, split_values
+from mead.adjoint import Tape
+from mead.jacobian import Jacobian
+from mead.compiler import Hoisted, Plan, Shared
+from mead.context import EvalContext, current_model
+from mead.dims import align, flatten
+from mead.graph import GraphReport, analyze, live_elements, subsystems
+from mead.cache import ModelCache
+from mead.export import export_python
+from mead.serialize import from_bytes, to_bytes
+from mead.module import Instance, Module
+from mead.result import SimulationResult
+from mead.snapshot import Snapshot
+from mead.utils import attributes, children
 from .solver import Solver, EulerSolver, RK4Solver
 
+# pandas and matplotlib are imported on first use, importing mead stays fast
+if TYPE_CHECKING:
+    import pandas as pd
+
 IntegrationMethod = Literal["euler", "rk4"]
 
 
+def _run_subsystem(
+    model: Model,
+    outputs: Optional[List[str]],
+    duration: float,
+    method: IntegrationMethod,
+    native: bool,
+) -> pd.DataFrame | SimulationResult:
+    """Runs one subsystem in a worker process, see `Model.run(workers=...)`."""
+    return model.run(duration, method, outputs=outputs, native=native)
+
+
 class Model:
     """
     A Model contains all the elements of a system dynamics simulation
     and runs the simulation over time.
     """
 
-    def __init__(self, name: str, dt: float = 0.25):
+    def __init__(
+        self,
+        name: str,
+        dt: float = 0.25,
+        loop_method: Literal["newton", "fixed_point"] = "newton",
+        loop_tolerance: float = 1e-10,
+        loop_iterations: int = 100,
+    ):
         self.name = name
         self.dt = dt
+        # how algebraic loops are solved, see `mead.compiler.AlgebraicLoop`
+        self.loop_method = loop_method
+        self.loop_tolerance = loop_tolerance
+        self.loop_iterations = loop_iterations
         self.elements: dict[str, Element] = {}
         self.stocks: dict[str, Stock] = {}
         self._solvers: dict[str, Type[Solver]] = {
@@ -28,7 +67,18 @@ class Model:
             "rk4": RK4Solver,
         }
         self._history: list[tuple[float, dict[str, float]]] = []
+        self._seeds: dict[str, Dual] = {}
+        self._plan: Optional[Plan] = None
+        # reused from stage to stage while a run is going on
+        self._context: Optional[EvalContext] = None
+        # included models, by name, see `include`
+        self._modules: dict[str, Module] = {}
+        self._stale_modules = False
         self._context_token: Optional[Any] = None
+        # the end of the last run, see `snapshot`
+        self._snapshot: Optional[Snapshot] = None
+        # where compiled plans are kept across processes, see `mead.cache`
+        self.cache: Optional[ModelCache] = None
 
     def __enter__(self):
         """Set this model as the active context."""
@@ -57,6 +107,56 @@ class Model:
         self.stocks.update(source_model.stocks)
         self.elements.update(source_model.elements)
 
+    def include(self, model: Model, prefix: str, **bindings: Any) -> Instance:
+        """Includes an instance of another model, under the names `<prefix>.<name>`.
+
+        Unlike `extend`, the included model isn't copied per instance: all the
+        instances of a model share one copy, subscripted by instance, and are
+        evaluated together (see `mead.module.Module`). Instances only differ by
+        `bindings`, values for constants and initial values for stocks of the
+        included model. Index the returned instance by element name, e.g.
+        `plant["output"]`, to use its elements in equations. Models with a
+        `Policy` or a `Function` reading the context can't be included.
+        """
+        module = self._modules.get(model.name)
+        if module is None:
+            module = self._modules[model.name] = Module(model, self)
+        elif module.source is not model:
+            raise ValueError(f"Another model named '{model.name}' is already included")
+        if any(i.prefix == prefix for m in self._modules.values() for i in m.instances):
+            raise ValueError(f"Prefix '{prefix}' is already used")
+        instance = module.add(prefix, bindings)
+        self._stale_modules = True
+        return instance
+
+    def _build_modules(self) -> None:
+        """(Re)builds the batched copies of the included models, when needed."""
+        if not self._stale_modules:
+            return
+        for module in self._modules.values():
+            for name in module.elements:
+                self.elements.pop(name, None)
+                self.stocks.pop(name, None)
+            for name, element in module.build().items():
+                element.model = self
+                self.elements[name] = element
+                if isinstance(element, Stock):
+                    self.stocks[name] = element
+        self._stale_modules = False
+
+    def _instance_columns(
+        self, results: pd.DataFrame | SimulationResult
+    ) -> pd.DataFrame | SimulationResult:
+        """Results of included models under the names of their instances."""
+        renamed: dict[str, str] = {}
+        for module in self._modules.values():
+            renamed.update(module.columns(list(results.columns)))
+        if not renamed:
+            return results
+        if isinstance(results, SimulationResult):
+            return results.rename(renamed)
+        return results.rename(columns=renamed)
+
     def add(self, *elements: Element):
         """Adds one or more elements to the model.
 
@@ -70,6 +170,12 @@ class Model:
             element.model = self
             if isinstance(element, Stock):
                 self.stocks[element.name] = element
+            # the stages of a delay built outside of the model come along, built
+            # in the model they are added on their own once created
+            stages = getattr(element, "stages", None)
+            if isinstance(element, DelayN) and stages is not None:
+                internal = [stages, *stages.inflows]
+                self.add(*(e for e in internal if e.name not in self.elements))
 
     def _lookup_history(
         self, name: str, current_sim_time: float, delay_time: float
@@ -93,97 +199,570 @@ class Model:
 
     def _create_element_context(
         self, time: float, state: dict[str, float]
-    ) -> dict[str, Any]:
-        """Helper to create the context dictionary for element compute methods."""
-        return {
-            "time": time,
-            "state": state,
-            "history_lookup": lambda name, delay_time_val: self._lookup_history(
-                name, time, delay_time_val
-            ),
-            "dt": self.dt,
-        }
+    ) -> EvalContext:
+        """Helper to create the context element compute methods are given."""
+        return EvalContext(self, time, state, self._seeds)
 
     def _compute_derivatives(
-        self, time: float, state: dict[str, float]
+        self,
+        time: float,
+        state: dict[str, float],
+        out: Optional[dict[str, float]] = None,
+        stocks: Optional[List[str]] = None,
     ) -> dict[str, float]:
-        """Calculates the net change for all stocks at a given time and state."""
-        derivatives = {}
-        context = self._create_element_context(time, state)
-
-        for stock in self.stocks.values():
-            inflow_rate = sum(flow.compute(context) for flow in stock.inflows)
-            outflow_rate = sum(flow.compute(context) for flow in stock.outflows)
-            derivatives[stock.name] = inflow_rate - outflow_rate
+        """Calculates the net change for all stocks at a given time and state.
+
+        During a run the context of the run is reused, and solvers pass `out`
+        to have the derivatives written into a buffer of theirs. `stocks`
+        restricts the computation to the stocks of these names.
+        """
+        derivatives = {} if out is None else out
+        context = self._context
+        if context is None:
+            context = self._create_element_context(time, state)
+        else:
+            context.reset(time, state)
+        plan = self._plan or self.compile()
+
+        for name in self.stocks if stocks is None else stocks:
+            rate = 0.0
+            layout = plan.layouts.get(name)
+            if layout is None:
+                for flow in plan.inflows[name]:
+                    rate = rate + flow.compute(context)
+                for flow in plan.outflows[name]:
+                    rate = rate - flow.compute(context)
+            else:
+                # flows subscripted in another order, or by fewer dims
+                dims = self.stocks[name].dims
+                for flow, flow_dims in zip(plan.inflows[name], layout[0]):
+                    rate = rate + align(flow.compute(context), flow_dims, dims)
+                for flow, flow_dims in zip(plan.outflows[name], layout[1]):
+                    rate = rate - align(flow.compute(context), flow_dims, dims)
+            derivatives[name] = rate
         return derivatives
 
     def _collect_all_elements(self) -> dict[str, Element]:
         """
-        Recursively collects all unique elements in the model's computation graph,
+        Collects all unique named elements in the model's computation graph,
         starting from the top-level elements added via model.add().
+
+        Anonymous expressions and literals are computed through the elements
+        that use them, they are only collected when explicitly added.
         """
+        self._build_modules()
         all_elements: dict[str, Element] = {}
+        seen: set[int] = set()
         to_process: list[Element] = list(self.elements.values())
 
         while to_process:
             current_element = to_process.pop()
-            if current_element.name not in all_elements:
-                all_elements[current_element.name] = current_element
-                # explicit dependencies
-                if hasattr(current_element, "dependencies"):
-                    for dep in current_element.dependencies:
-                        if isinstance(dep, Element) and dep.name not in all_elements:
-                            to_process.append(dep)
-
-                # collect internal dependencies
-                if hasattr(current_element, "__dict__"):
-                    for attr_value in current_element.__dict__.values():
-                        if (
-                            isinstance(attr_value, Element)
-                            and attr_value.name not in all_elements
-                        ):
-                            to_process.append(attr_value)
-                        elif isinstance(attr_value, list):
-                            for item in attr_value:
-                                if (
-                                    isinstance(item, Element)
-                                    and item.name not in all_elements
-                                ):
-                                    to_process.append(item)
+            if id(current_element) in seen:
+                continue
+            seen.add(id(current_element))
+            if not current_element.anonymous or current_element.model is self:
+                all_elements.setdefault(current_element.name, current_element)
+            to_process.extend(children(current_element))
         return all_elements
 
-    def run(self, duration: float, method: IntegrationMethod = "euler") -> pd.DataFrame:
+    def compile(self, outputs: Optional[List[Element | str]] = None) -> Plan:
+        """Prepares the model graph for simulation, see `mead.compiler.Plan`.
+
+        Runs compile the model on their own, this is useful to inspect what
+        will actually be computed. With `outputs`, elements that neither feed
+        a stock nor an output are left out, see `mead.graph.live_elements`.
+        With a `cache` set, the plan of an identical model compiled before,
+        possibly by another process, is loaded instead.
+        """
+        if self.cache is not None:
+            self._plan = self.cache.compile(self, outputs)
+        else:
+            self._plan = self._compile(outputs)
+        return self._plan
+
+    def _compile(self, outputs: Optional[List[Element | str]] = None) -> Plan:
+        all_elements = self._collect_all_elements()
+        if outputs is None:
+            return Plan(self, all_elements)
+        live, recorded = live_elements(self, all_elements, outputs)
+        return Plan(self, live, recorded)
+
+    def analyze(self, outputs: List[Element | str] = ()) -> GraphReport:
+        """Statistics of the model graph, to size a model before running it.
+
+        Elements that feed neither a stock nor one of `outputs` are reported
+        as pruned, a run given the same outputs skips them. See
+        `mead.graph.GraphReport`.
+        """
+        return analyze(self, outputs)
+
+    def export_python(self, path: str | Path) -> Path:
+        """Writes the model as a standalone Python module, returns its path.
+
+        The module holds the equations of every element, flattened into two
+        functions (stock rates and recorded values), and its own Euler and RK4
+        loops. It needs neither mead, NumPy nor pandas: `run(duration, method)`
+        returns the columns of `Model.run` as lists, or as NumPy arrays with
+        `numpy=True`. Only scalar models of the built-in elements can be
+        exported, `Function` and `Kernel` hold arbitrary Python code.
+        """
+        return export_python(self, path)
+
+    def to_bytes(self) -> bytes:
+        """The model as compact bytes, to ship it to other processes or machines.
+
+        Unlike pickling, the elements are encoded field by field in a
+        versioned format (see `mead.serialize`), functions by their import
+        path. Custom element types must be registered with
+        `mead.serialize.register`. Read it back with `Model.from_bytes`.
+        """
+        return to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Model:
+        """A model from the output of `to_bytes`."""
+        return from_bytes(data)
+
+    def _sensitivity_seeds(
+        self,
+        parameters: List[Element | str],
+        all_elements: dict[str, Element],
+    ) -> dict[str, Dual]:
+        """Seeds one derivative direction per parameter (a `Constant` in the model)."""
+        seeds = {}
+        for parameter in parameters:
+            name = parameter if isinstance(parameter, str) else parameter.name
+            element = all_elements.get(name)
+            if not isinstance(element, Constant):
+                raise ValueError(f"Sensitivity parameter '{name}' is not a Constant")
+            seeds[name] = Dual.seed(name, element.value)
+        return seeds
+
+    def _simulate(
+        self,
+        duration: float,
+        method: IntegrationMethod,
+        seeds: dict[str, Any],
+        start: Optional[Snapshot] = None,
+        checkpoint: Optional[tuple[int, Path]] = None,
+    ) -> int:
+        """Integrates the model, leaving the value of every element per time step in `_history`.
+
+        A run `start`ing from a snapshot begins with the history of the
+        snapshot. `checkpoint` is a number of steps and a path, a snapshot
+        is saved there that often. Returns the index in `_history` of the
+        first value of this run.
+        """
         solver = self._solvers[method]()
-        self._history = []  # Reset history for each run
+        solver.discrete = frozenset(
+            e.stages.name
+            for e in self._collect_all_elements().values()
+            if isinstance(e, Conveyor) and e.stages.name in self.stocks
+        )
+        self._seeds = seeds
+        recorded = {name: self._plan.elements[name] for name in self._plan.recorded}
+        # recorded values of module instances, split into a column per instance
+        batched = {
+            name: module
+            for module in self._modules.values()
+            for name, element in module.elements.items()
+            if name in recorded and module.dim in element.dims
+        }
+
+        if start is None:
+            first_step = 0
+            self._history = []  # Reset history for each run
+            # Initialize state with initial values of all stocks
+            state = {s.name: s.initial_value for s in self.stocks.values()}
+        else:
+            first_step = round(start.time / self.dt)
+            self.restore(start)
+            # the values at the start time are computed again
+            self._history.pop()
+            state = dict(start.state)
+        first_record = len(self._history)
+        last_step = first_step + int(duration / self.dt)
+
+        try:
+            context = self._create_element_context(first_step * self.dt, state)
+            # every time the solver evaluates the model at
+            step = self.dt / solver.substeps
+            self._plan.hoist(
+                context,
+                [
+                    i * step
+                    for i in range(
+                        first_step * solver.substeps, last_step * solver.substeps + 1
+                    )
+                ],
+                step,
+            )
+            if start is not None:
+                for loop, guess in zip(self._plan.loops, start.loops):
+                    loop.state.guess = deepcopy(guess)
+            self._context = context
+
+            for i in range(first_step, last_step + 1):
+                time = i * self.dt
+                context.reset(time, state)
+                context_for_elements = context
+
+                # Compute values for all collected elements
+                current_element_values = {}
+                for name, element in recorded.items():
+                    if name in state:  # If it's a stock, its value is in the state
+                        current_element_values[name] = state[name]
+                    else:  # Otherwise, compute its value
+                        current_element_values[name] = element.compute(
+                            context_for_elements
+                        )
+                        if name in batched:
+                            current_element_values[name] = batched[name].batch(
+                                current_element_values[name], element.dims
+                            )
+
+                self._history.append((time, current_element_values))
+                if (
+                    checkpoint
+                    and i > first_step
+                    and (i - first_step) % checkpoint[0] == 0
+                ):
+                    self._take_snapshot(time, state).save(checkpoint[1])
+
+                if i < last_step:
+                    state = solver.step(time, self.dt, state, self._compute_derivatives)
+            self._snapshot = self._take_snapshot(time, state)
+        finally:
+            self._context = None
+            self._plan.release()
+            self._seeds = {}
+        return first_record
+
+    def _take_snapshot(self, time: float, state: dict[str, Any]) -> Snapshot:
+        """The run at `time`, once its values are recorded and before stepping."""
+        all_elements = self._collect_all_elements()
+        windows = [element._history_window for element in all_elements.values()]
+        history = self._history
+        if None not in windows:
+            # the last value recorded before what delays may look up is kept,
+            # lookups find it at the start of the window
+            cutoff = time - max(windows, default=0.0) - self.dt
+            keep = len(history) - 1
+            while keep > 0 and history[keep][0] > cutoff:
+                keep -= 1
+            history = history[keep:]
+        return Snapshot(
+            time=time,
+            dt=self.dt,
+            state=dict(state),
+            history=list(history),
+            elements={
+                name: {
+                    attr: deepcopy(getattr(element, attr))
+                    for attr in element._run_state
+                }
+                for name, element in self._stateful(all_elements).items()
+            },
+            loops=[deepcopy(loop.state.guess) for loop in self._plan.loops],
+        )
+
+    def _stateful(self, all_elements: dict[str, Element]) -> dict[str, Element]:
+        """Elements with a state of their own during a run, as the plan runs them.
+
+        The plan computes copies of the elements whose children it rewrote.
+        """
+        stateful = {n: e for n, e in all_elements.items() if e._run_state}
+        if self._plan is not None:
+            for name in stateful.keys() & self._plan.elements.keys():
+                element = self._plan.elements[name]
+                while isinstance(element, (Shared, Hoisted)):
+                    element = element.element
+                if type(element) is type(stateful[name]):
+                    stateful[name] = element
+        return stateful
+
+    def snapshot(self) -> Snapshot:
+        """The state at the end of the last run, to continue it later.
+
+        Pass it to `run(start_from=...)`, in this or another process (see
+        `Snapshot.save` and `Snapshot.load`) to continue the run.
+        """
+        if self._snapshot is None:
+            raise ValueError("The model has not been run yet")
+        return self._snapshot
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """Puts stateful elements and the history back as they were in `snapshot`."""
+        if snapshot.dt != self.dt:
+            raise ValueError(
+                f"Snapshot taken with dt={snapshot.dt}, the model has dt={self.dt}"
+            )
+        if set(snapshot.state) != set(self.stocks):
+            raise ValueError("Snapshot stocks don't match the stocks of the model")
+        all_elements = self._collect_all_elements()
+        stateful = self._stateful(all_elements)
+        for name, attributes in snapshot.elements.items():
+            if name not in all_elements:
+                raise ValueError(f"Snapshot element '{name}' is not in the model")
+            for attr, value in attributes.items():
+                setattr(stateful.get(name, all_elements[name]), attr, deepcopy(value))
+        self._history = list(snapshot.history)
+        self._snapshot = snapshot
+
+    def subsystems(self) -> list[list[str]]:
+        """Names of the elements of every independent part of the model.
+
+        See `mead.graph.subsystems`.
+        """
+        return subsystems(self)
+
+    def _subsystem(self, names: list[str]) -> Model:
+        """A model of a copy of the given elements only, e.g. to send to a worker."""
+        model = Model(
+            self.name,
+            self.dt,
+            self.loop_method,
+            self.loop_tolerance,
+            self.loop_iterations,
+        )
+        model._solvers = self._solvers
+        # elements are copied one by one, each attribute against `memo`, so a
+        # long chain of elements doesn't nest a call per link as `deepcopy` does
+        memo: dict[int, Any] = {id(self): model}
+        originals: list[Element] = []
+        part = set(names)
+        to_process = [e for n, e in self.elements.items() if n in part]
+        while to_process:
+            element = to_process.pop()
+            if id(element) in memo:
+                continue
+            memo[id(element)] = copy(element)
+            originals.append(element)
+            to_process.extend(children(element))
+        for element in originals:
+            clone = memo[id(element)]
+            for attr, value in attributes(element).items():
+                setattr(clone, attr, deepcopy(value, memo))
+        # the copies belong to the new model, nothing else of this one comes along
+        elements = {n: memo[id(e)] for n, e in self.elements.items() if n in part}
+        stocks = {n: memo[id(s)] for n, s in self.stocks.items() if n in part}
+        model.elements, model.stocks = elements, stocks
+        return model
+
+    def __getstate__(self) -> dict[str, Any]:
+        # what pickling needs to run the model again, e.g. in another process
+        state = dict(self.__dict__)
+        state.update(
+            _context_token=None,
+            _plan=None,
+            _context=None,
+            _history=[],
+            cache=None,
+            _snapshot=None,
+        )
+        return state
+
+    def run(
+        self,
+        duration: float,
+        method: IntegrationMethod = "euler",
+        sensitivities: Optional[List[Element | str]] = None,
+        outputs: Optional[List[Element | str]] = None,
+        workers: Optional[int] = None,
+        native: bool = False,
+        start_from: Optional[Snapshot] = None,
+        checkpoint_every: Optional[float] = None,
+        checkpoint_path: Optional[str | Path] = None,
+    ) -> pd.DataFrame | SimulationResult:
+        """Simulates the model for `duration` time units.
 
-        # Collect all elements in the computation graph
-        all_elements_to_compute = self._collect_all_elements()
+        Args:
+            duration: Simulated time span, starting at t=0 or at the time of
+                `start_from`.
+            method: Integration method, "euler" or "rk4".
+            sensitivities: Constants to differentiate against. For each stock and
+                parameter a `d(stock)/d(param)` column is added to the results,
+                integrated in the same pass as the stocks themselves.
+            outputs: Elements to record besides the stocks, all of them when
+                None. Elements that feed neither are not computed at all.
+            workers: Simulate the independent subsystems of the model (see
+                `subsystems`) concurrently, in up to that many processes, and
+                merge their results. The model must be picklable.
+            native: Return a `SimulationResult`, backed by plain arrays,
+                instead of a DataFrame indexed by time.
+            start_from: A `Snapshot` to continue from, see `snapshot`. The
+                results start at its time and match those of a run that never
+                stopped. Use the `outputs` of the run the snapshot comes from.
+            checkpoint_every: Time between snapshots saved to
+                `checkpoint_path` during the run, a multiple of dt. A run that
+                dies continues from `Snapshot.load(checkpoint_path)`.
+
+        Subscripted elements get one column per item, e.g. `pop[0]`, `pop[1]`.
+        """
+        checkpoint = None
+        if (checkpoint_every is None) != (checkpoint_path is None):
+            raise ValueError("checkpoint_every and checkpoint_path go together")
+        if checkpoint_every is not None:
+            steps = round(checkpoint_every / self.dt)
+            if steps < 1 or abs(steps * self.dt - checkpoint_every) > 1e-9 * max(
+                1.0, checkpoint_every
+            ):
+                raise ValueError(
+                    f"checkpoint_every {checkpoint_every} must be a multiple of dt {self.dt}"
+                )
+            checkpoint = (steps, Path(checkpoint_path))
+        if (start_from or checkpoint) and (sensitivities or workers is not None):
+            raise ValueError(
+                "Snapshots can't be combined with sensitivities or workers"
+            )
+        if workers is not None:
+            if sensitivities:
+                raise ValueError("Sensitivities can't be combined with workers")
+            parts = self.subsystems()
+            if len(parts) > 1:
+                return self._run_parallel(
+                    parts, duration, method, outputs, workers, native
+                )
+
+        plan = self.compile(outputs)
+        if sensitivities and any(s.dims for s in self.stocks.values()):
+            raise ValueError("Sensitivities of subscripted stocks are not supported")
+        seeds = self._sensitivity_seeds(sensitivities or [], plan.elements)
+        first = self._simulate(duration, method, seeds, start_from, checkpoint)
+
+        parameters = list(seeds)
+        history = self._history[first:]
+        if outputs is not None:
+            # leave out what was only recorded for delays to look up
+            requested = {o if isinstance(o, str) else o.name for o in outputs}
+            columns = [
+                name
+                for name in plan.recorded
+                if name in self.stocks or name in requested
+            ]
+            history = [
+                (time, {name: values[name] for name in columns})
+                for time, values in history
+            ]
+        if native:
+            if parameters:
+                history = [
+                    (time, split_values(values, list(self.stocks), parameters))
+                    for time, values in history
+                ]
+            return self._instance_columns(
+                SimulationResult.from_records(
+                    history, self.name, self.dt, method, self._parameters()
+                )
+            )
+        results_list = [
+            {
+                "time": time,
+                **(
+                    split_values(values, list(self.stocks), parameters)
+                    if parameters
+                    else flatten(values)
+                ),
+            }
+            for time, values in history
+        ]
+        import pandas as pd
+
+        return self._instance_columns(pd.DataFrame(results_list).set_index("time"))
+
+    def _parameters(self) -> dict[str, Any]:
+        """Values of the named constants, the parameters of a run."""
+        return {
+            name: element.value
+            for name, element in self._collect_all_elements().items()
+            if isinstance(element, Constant) and not element.anonymous
+        }
 
-        # Initialize state with initial values of all stocks
-        state = {s.name: s.initial_value for s in self.stocks.values()}
+    def _run_parallel(
+        self,
+        parts: list[list[str]],
+        duration: float,
+        method: IntegrationMethod,
+        outputs: Optional[List[Element | str]],
+        workers: int,
+        native: bool,
+    ) -> pd.DataFrame | SimulationResult:
+        from concurrent.futures import ProcessPoolExecutor
+
+        import pandas as pd
+
+        requested = None
+        if outputs is not None:
+            requested = {o if isinstance(o, str) else o.name for o in outputs}
+        tasks = [
+            (
+                self._subsystem(names),
+                None if requested is None else [n for n in names if n in requested],
+            )
+            for names in parts
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(
+                pool.map(
+                    _run_subsystem,
+                    *zip(*tasks),
+                    [duration] * len(tasks),
+                    [method] * len(tasks),
+                    [native] * len(tasks),
+                )
+            )
+        self._history = []
+        if native:
+            return self._instance_columns(SimulationResult.concat(frames))
+        return self._instance_columns(pd.concat(frames, axis=1))
+
+    def gradient(
+        self,
+        objective: Callable[[dict[str, list[Any]]], Any],
+        duration: float,
+        method: IntegrationMethod = "euler",
+    ) -> dict[str, float]:
+        """Gradient of a scalar objective with respect to every `Constant` of the model.
 
-        num_steps = int(duration / self.dt)
-        times = [i * self.dt for i in range(num_steps + 1)]
-        results_list = []
+        The run is recorded on a tape and swept once in reverse (the discrete
+        adjoint of the integration), so the cost is about two simulations no
+        matter how many constants the model has.
 
-        for i, time in enumerate(times):
-            context_for_elements = self._create_element_context(time, state)
+        Args:
+            objective: Receives the trajectories of the run as a mapping of
+                column name to the list of values per time step (same columns
+                as `run`), and returns the scalar to differentiate.
+            duration: Simulated time span, starting at t=0.
+            method: Integration method, "euler" or "rk4".
+
+        Returns:
+            The derivative of the objective for each constant, by name.
+        """
+        all_elements = self.compile().elements
+        tape = Tape()
+        seeds = {
+            name: tape.variable(element.value)
+            for name, element in all_elements.items()
+            if isinstance(element, Constant) and not name.startswith("literal_")
+        }
+        self._simulate(duration, method, seeds)
 
-            # Compute values for all collected elements
-            current_element_values = {}
-            for name, element in all_elements_to_compute.items():
-                if name in state:  # If it's a stock, its value is in the state
-                    current_element_values[name] = state[name]
-                else:  # Otherwise, compute its value
-                    current_element_values[name] = element.compute(context_for_elements)
+        trajectories: dict[str, list[Any]] = {
+            "time": [time for time, _ in self._history]
+        }
+        for name in all_elements:
+            trajectories[name] = [values[name] for _, values in self._history]
 
-            self._history.append((time, current_element_values.copy()))
-            results_list.append({"time": time, **current_element_values})
+        adjoints = tape.gradient(objective(trajectories))
+        return {name: adjoints[variable.index] for name, variable in seeds.items()}
 
-            if i < num_steps:
-                state = solver.step(time, self.dt, state, self._compute_derivatives)
+    def jacobian(self) -> Jacobian:
+        """Sparse Jacobian of the stock derivatives with respect to the stocks.
 
-        return pd.DataFrame(results_list).set_index("time")
+        The returned `Jacobian` holds the CSR structure (`indptr`, `indices`)
+        and is called as `jacobian(time, state)` to get the nonzero values.
+        """
+        return Jacobian(self)
 
     def __str__(self):
         return f"Model(name={self.name})"
@@ -209,6 +788,8 @@ class Model:
             labels: A tuple in the form (x_label, y_label), defaults to *Time x Value*
             save_path: If provided, the plot is saved; otherwise, it's displayed.
         """
+        import matplotlib.pyplot as plt
+
         fig, ax1 = plt.subplots(figsize=(12, 7))
 
         if columns is None:
@@ -0,0 +1,190 @@
+"""Instances of a model included in another one, simulated as a single batch."""
+
+from __future__ import annotations
+from copy import deepcopy
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from mead.core import Element, Constant, Expression, Equation, Sum, Product
+from mead.core import Reduction, Apply, Function
+from mead.components import Policy
+from mead.dims import Dims, as_array, merge_dims
+from mead.stock import Stock
+from mead.compiler import _post_order
+
+if TYPE_CHECKING:
+    from mead.model import Model
+
+
+def _derive_dims(element: Element) -> None:
+    """Recomputes the dims an expression stored when it was built."""
+    if isinstance(element, Equation):
+        element.dims = merge_dims(element.left.dims, element.right.dims)
+    elif isinstance(element, Sum):
+        element.dims = merge_dims(*(e.dims for e in element.terms + element.subtracted))
+    elif isinstance(element, Product):
+        element.dims = merge_dims(*(e.dims for e in element.factors + element.divisors))
+    elif isinstance(element, Reduction):
+        element.axis = element.element.dims.index(element.dim)
+        element.dims = tuple(d for d in element.element.dims if d != element.dim)
+    elif isinstance(element, Apply):
+        element.dims = element.operand.dims
+
+
+class Select(Expression):
+    """The value of an element of a module for one of its instances."""
+
+    __slots__ = ("module", "element_name", "index", "dims")
+    # resolved by name when computed, see `dependencies`
+    _invariance = None
+
+    def __init__(self, module: Module, element_name: str, index: int, dims: Dims):
+        super().__init__()
+        self.module = module
+        self.element_name = element_name
+        self.index = index
+        self.dims = dims
+
+    def compute(self, context: dict[str, Any]) -> Any:
+        return self.module.elements[self.element_name].compute(context)[self.index]
+
+    @property
+    def dependencies(self) -> list[Element]:
+        element = self.module.elements.get(self.element_name)
+        return [] if element is None else [element]
+
+    def _tokens(self) -> list[str | Element]:
+        prefix = self.module.instances[self.index].prefix
+        return [f"{prefix}.{self.element_name.split('.', 1)[1]}"]
+
+    def __repr__(self) -> str:
+        return f"Select({self.element_name!r}, index={self.index!r})"
+
+
+class Instance:
+    """One inclusion of a module into a model, see `Model.include`."""
+
+    __slots__ = ("module", "prefix", "index", "bindings")
+
+    def __init__(
+        self, module: Module, prefix: str, index: int, bindings: dict[str, Any]
+    ):
+        self.module = module
+        self.prefix = prefix
+        self.index = index
+        self.bindings = bindings
+
+    def __getitem__(self, name: str) -> Select:
+        """An element of the module, for this instance, to use in equations."""
+        self.module.model._build_modules()
+        qualified = f"{self.module.name}.{name}"
+        element = self.module.elements.get(qualified)
+        if element is None:
+            raise ValueError(f"Module '{self.module.name}' has no element '{name}'")
+        return Select(self.module, qualified, self.index, element.dims[1:])
+
+    def __repr__(self) -> str:
+        return f"Instance(module={self.module.name!r}, prefix={self.prefix!r})"
+
+
+class Module:
+    """
+    Every instance of a model included in another one, simulated as one copy.
+
+    The copy is subscripted by one more dimension, `<name>_instance`, with an
+    item per instance. Its stocks and named constants hold the value of each
+    instance, from the bindings of the instance or else from the included
+    model. The equations are shared: a module included 200 times is copied
+    and compiled once, and evaluated on arrays of 200 items.
+    """
+
+    def __init__(self, source: Model, model: Model):
+        self.source = source
+        self.model = model
+        self.name = source.name
+        self.dim = f"{source.name}_instance"
+        self.instances: list[Instance] = []
+        # the batched copy, by qualified name `<name>.<element>`
+        self.elements: dict[str, Element] = {}
+
+    def add(self, prefix: str, bindings: dict[str, Any]) -> Instance:
+        elements = self.source._collect_all_elements()
+        for element in elements.values():
+            # both act on the whole model rather than on values per instance
+            if isinstance(element, Policy):
+                raise ValueError(
+                    f"Module '{self.name}' has a Policy, '{element.name}', "
+                    "policies can't be included as module instances"
+                )
+            if isinstance(element, Function) and element.inputs is None:
+                raise ValueError(
+                    f"Module '{self.name}' has a Function reading the context, "
+                    f"'{element.name}', only functions of declared inputs can be "
+                    "included as module instances"
+                )
+        for name in bindings:
+            if not isinstance(elements.get(name), (Constant, Stock)):
+                raise ValueError(
+                    f"'{name}' is not a Constant or Stock of module '{self.name}'"
+                )
+        instance = Instance(self, prefix, len(self.instances), bindings)
+        self.instances.append(instance)
+        return instance
+
+    def _stack(self, name: str, default: Any, dims: Dims) -> np.ndarray:
+        values = [
+            (
+                as_array(instance.bindings.get(name, default), dims)
+                if dims
+                else float(instance.bindings.get(name, default))
+            )
+            for instance in self.instances
+        ]
+        return np.array(values, dtype=float)
+
+    def build(self) -> dict[str, Element]:
+        """The batched copy of the module, for the current instances."""
+        copy = deepcopy(self.source)
+        elements = copy._collect_all_elements()
+        for name, element in elements.items():
+            if isinstance(element, Stock):
+                element.initial_value = self._stack(
+                    name, element.initial_value, element.dims
+                )
+                element.dims = (self.dim, *element.dims)
+            elif isinstance(element, Constant) and not element.anonymous:
+                element.value = self._stack(name, element.value, element.dims)
+                element.dims = (self.dim, *element.dims)
+        for element in _post_order(list(elements.values())):
+            _derive_dims(element)
+
+        self.elements = {}
+        for element in elements.values():
+            if not element.anonymous:
+                element.name = f"{self.name}.{element.name}"
+                self.elements[element.name] = element
+        return self.elements
+
+    def batch(self, value: Any, dims: Dims) -> np.ndarray:
+        """`value` of an element subscripted by `dims`, with an item per instance.
+
+        Elements such as `Step` or `Smooth` compute a scalar, the same for every
+        instance, on some steps.
+        """
+        value = np.asarray(value, dtype=float)
+        shape = (1,) * (len(dims) - value.ndim) + value.shape
+        return np.broadcast_to(value.reshape(shape), (len(self.instances), *shape[1:]))
+
+    def columns(self, columns: list[str]) -> dict[str, str]:
+        """Result columns of the batch, `<name>.x[i,...]`, renamed `<prefix>.x[...]`."""
+        renamed = {}
+        for column in columns:
+            if not column.startswith(f"{self.name}.") or not column.endswith("]"):
+                continue
+            base, _, subscripts = column[:-1].rpartition("[")
+            index, _, rest = subscripts.partition(",")
+            prefix = self.instances[int(index)].prefix
+            name = f"{prefix}.{base[len(self.name) + 1:]}"
+            renamed[column] = f"{name}[{rest}]" if rest else name
+        return renamed
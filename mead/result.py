@@ -0,0 +1,145 @@
+"""Results of a run as plain arrays, see `Model.run(native=True)`."""
+
+from __future__ import annotations
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Iterator, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+
+class SimulationResult(Mapping):
+    """
+    The recorded columns of a run, by name, over `time`.
+
+    Values are held in one float array with a contiguous row per column:
+    `result["pop"]` is a view, and the conversions share the same memory
+    wherever the target library allows it. Subscripted elements get one
+    column per item, e.g. `pop[0]`, as in the DataFrame results.
+    `parameters` holds the values of the named constants of the model.
+    """
+
+    __slots__ = ("time", "columns", "values", "model", "dt", "method", "parameters")
+
+    def __init__(
+        self,
+        time: np.ndarray,
+        columns: Sequence[str],
+        values: np.ndarray,
+        model: str,
+        dt: float,
+        method: str,
+        parameters: dict[str, Any],
+    ):
+        if values.shape != (len(columns), len(time)):
+            raise ValueError(
+                f"Values of shape {values.shape} don't match "
+                f"{len(columns)} columns over {len(time)} times"
+            )
+        self.time = time
+        # column name -> row of `values`
+        self.columns = {name: i for i, name in enumerate(columns)}
+        self.values = values
+        self.model = model
+        self.dt = dt
+        self.method = method
+        self.parameters = parameters
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Sequence[tuple[float, dict[str, Any]]],
+        model: str,
+        dt: float,
+        method: str,
+        parameters: dict[str, Any],
+    ) -> SimulationResult:
+        """Result from `(time, {name: value})` records, arrays split into items."""
+        time = np.array([t for t, _ in records], dtype=float)
+        columns: list[str] = []
+        rows: list[np.ndarray] = []
+        for name in records[0][1] if records else ():
+            stacked = np.asarray([values[name] for _, values in records], dtype=float)
+            if stacked.ndim == 1:
+                columns.append(name)
+                rows.append(stacked)
+                continue
+            for index in np.ndindex(stacked.shape[1:]):
+                columns.append(f"{name}[{','.join(map(str, index))}]")
+            rows.extend(stacked.reshape(len(records), -1).T)
+        values = np.empty((len(rows), len(time)))
+        for i, row in enumerate(rows):
+            values[i] = row
+        return cls(time, columns, values, model, dt, method, parameters)
+
+    @classmethod
+    def concat(cls, results: Sequence[SimulationResult]) -> SimulationResult:
+        """The columns of results over the same times, side by side."""
+        first = results[0]
+        parameters: dict[str, Any] = {}
+        for result in results:
+            parameters.update(result.parameters)
+        return cls(
+            first.time,
+            [name for result in results for name in result.columns],
+            np.concatenate([result.values for result in results]),
+            first.model,
+            first.dt,
+            first.method,
+            parameters,
+        )
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.values[self.columns[name]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.columns)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def rename(self, names: dict[str, str]) -> SimulationResult:
+        """The same result, sharing its arrays, with columns renamed."""
+        return SimulationResult(
+            self.time,
+            [names.get(name, name) for name in self.columns],
+            self.values,
+            self.model,
+            self.dt,
+            self.method,
+            self.parameters,
+        )
+
+    def to_numpy(self) -> np.ndarray:
+        """The values with a row per time and a column per column, a view."""
+        return self.values.T
+
+    def to_pandas(self) -> pd.DataFrame:
+        """A DataFrame indexed by time, as `Model.run` returns, on the same memory."""
+        import pandas as pd
+
+        return pd.DataFrame(
+            self.values.T,
+            index=pd.Index(self.time, name="time"),
+            columns=list(self.columns),
+            copy=False,
+        )
+
+    def to_arrow(self) -> pa.Table:
+        """A pyarrow Table with a "time" column first, on the same memory."""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("SimulationResult.to_arrow needs pyarrow") from None
+
+        arrays = [pa.array(self.time)] + [pa.array(row) for row in self.values]
+        return pa.table(arrays, names=["time", *self.columns])
+
+    def __repr__(self) -> str:
+        return (
+            f"SimulationResult(model={self.model!r}, method={self.method!r}, "
+            f"columns={len(self.columns)!r}, times={len(self.time)!r})"
+        )
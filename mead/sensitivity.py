@@ -0,0 +1,164 @@
+"""Forward sensitivities by propagating derivatives alongside values."""
+
+from __future__ import annotations
+import math
+from typing import Any
+
+
+def _merge(
+    a: dict[str, float], ca: float, b: dict[str, float], cb: float
+) -> dict[str, float]:
+    """Linear combination ca * a + cb * b of two partial derivative maps."""
+    result = {name: ca * value for name, value in a.items()} if ca else {}
+    if cb:
+        for name, value in b.items():
+            result[name] = result.get(name, 0.0) + cb * value
+    return result
+
+
+def _partials(value: Any) -> dict[str, float]:
+    return value.partials if isinstance(value, Dual) else {}
+
+
+def _value(value: Any) -> float:
+    return value.value if isinstance(value, Dual) else value
+
+
+class Dual:
+    """
+    A number carrying its partial derivatives with respect to model parameters.
+
+    Duals flow through `compute` exactly like floats, so every operation of an
+    `Equation` tree (and of the components built on it) applies its own
+    derivative rule: `IfThenElse`, `Min` and `Max` follow the selected branch,
+    `Table` uses the slope of the interpolated segment and comparisons have
+    zero derivative. Stocks holding Duals are integrated by the regular
+    solvers, which yields dX/dp for every stock in the same run.
+    """
+
+    __slots__ = ("value", "partials")
+
+    def __init__(self, value: float, partials: dict[str, float] | None = None):
+        self.value = float(value)
+        self.partials = partials if partials is not None else {}
+
+    @classmethod
+    def seed(cls, name: str, value: float) -> Dual:
+        """A parameter: its derivative with respect to itself is one."""
+        return cls(value, {name: 1.0})
+
+    def derivative(self, name: str) -> float:
+        return self.partials.get(name, 0.0)
+
+    def __add__(self, other: Any) -> Dual:
+        return Dual(
+            self.value + _value(other), _merge(self.partials, 1, _partials(other), 1)
+        )
+
+    __radd__ = __add__
+
+    def __sub__(self, other: Any) -> Dual:
+        return Dual(
+            self.value - _value(other), _merge(self.partials, 1, _partials(other), -1)
+        )
+
+    def __rsub__(self, other: Any) -> Dual:
+        return Dual(
+            _value(other) - self.value, _merge(_partials(other), 1, self.partials, -1)
+        )
+
+    def __mul__(self, other: Any) -> Dual:
+        b = _value(other)
+        return Dual(
+            self.value * b, _merge(self.partials, b, _partials(other), self.value)
+        )
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: Any) -> Dual:
+        b = _value(other)
+        return Dual(
+            self.value / b,
+            _merge(self.partials, 1 / b, _partials(other), -self.value / (b * b)),
+        )
+
+    def __rtruediv__(self, other: Any) -> Dual:
+        a = _value(other)
+        return Dual(
+            a / self.value,
+            _merge(_partials(other), 1 / self.value, self.partials, -a / self.value**2),
+        )
+
+    def __pow__(self, exponent: Any) -> Dual:
+        b = _value(exponent)
+        value = self.value**b
+        # a^b also depends on b when the exponent carries derivatives
+        db = value * math.log(self.value) if self.value > 0 else 0.0
+        return Dual(
+            value,
+            _merge(self.partials, b * self.value ** (b - 1), _partials(exponent), db),
+        )
+
+    def __rpow__(self, base: float) -> Dual:
+        value = base**self.value
+        return self.chain(value, value * math.log(base) if base > 0 else 0.0)
+
+    def chain(self, value: float, derivative: float) -> Dual:
+        """Result of a function of this number, given its derivative (chain rule)."""
+        return Dual(value, _merge(self.partials, derivative, {}, 0))
+
+    def __neg__(self) -> Dual:
+        return Dual(-self.value, _merge(self.partials, -1, {}, 0))
+
+    def __pos__(self) -> Dual:
+        return self
+
+    def __abs__(self) -> Dual:
+        return -self if self.value < 0 else self
+
+    # Comparisons act on values only, their derivative is zero
+    def __eq__(self, other: Any) -> bool:
+        return self.value == _value(other)
+
+    def __ne__(self, other: Any) -> bool:
+        return self.value != _value(other)
+
+    def __lt__(self, other: Any) -> bool:
+        return self.value < _value(other)
+
+    def __le__(self, other: Any) -> bool:
+        return self.value <= _value(other)
+
+    def __gt__(self, other: Any) -> bool:
+        return self.value > _value(other)
+
+    def __ge__(self, other: Any) -> bool:
+        return self.value >= _value(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __bool__(self) -> bool:
+        return bool(self.value)
+
+    def __float__(self) -> float:
+        return self.value
+
+    def __repr__(self) -> str:
+        return f"Dual({self.value!r}, {self.partials!r})"
+
+
+def gradient_column(name: str, parameter: str) -> str:
+    """Name of the results column holding d(name)/d(parameter)."""
+    return f"d({name})/d({parameter})"
+
+
+def split_values(
+    values: dict[str, Any], stocks: list[str], parameters: list[str]
+) -> dict[str, float]:
+    """Flattens Duals into plain values plus one gradient column per stock and parameter."""
+    row = {name: float(_value(value)) for name, value in values.items()}
+    for stock in stocks:
+        partials = _partials(values.get(stock))
+        for parameter in parameters:
+            row[gradient_column(stock, parameter)] = partials.get(parameter, 0.0)
+    return row
@@ -0,0 +1,271 @@
+"""
+Compact, versioned serialization of models, see `Model.to_bytes`.
+
+A model is encoded as JSON: the model settings, a table of element types
+and one entry per element, with references to other elements as indices.
+Nothing is pickled, the bytes can be read by any process that has the
+element types, whatever was used to build the model.
+"""
+
+from __future__ import annotations
+import importlib
+import json
+import types
+from functools import cache
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+import numpy as np
+
+from mead import components, core
+from mead.core import Element, Expression, _uids
+from mead.stock import Stock
+
+if TYPE_CHECKING:
+    from mead.model import Model
+
+FORMAT = "mead"
+VERSION = 1
+
+Encoder = Callable[[Element], dict[str, Any]]
+Decoder = Callable[[Element, dict[str, Any]], None]
+
+
+@cache
+def _slots(cls: type) -> tuple[str, ...]:
+    """Slots of `cls` holding state, not shadowed by a property (e.g. rendered names)."""
+    found = []
+    for base in reversed(cls.__mro__):
+        for attr in base.__dict__.get("__slots__", ()):
+            if attr in ("model", "uid", "__dict__", "__weakref__"):
+                continue
+            if isinstance(getattr(cls, attr, None), types.MemberDescriptorType):
+                found.append(attr)
+    return tuple(found)
+
+
+def _fields(element: Element) -> dict[str, Any]:
+    """Default encoding: every slot and instance attribute."""
+    fields = {
+        attr: getattr(element, attr)
+        for attr in _slots(type(element))
+        if hasattr(element, attr)
+    }
+    fields.update(
+        (attr, value)
+        for attr, value in getattr(element, "__dict__", {}).items()
+        if attr != "model"
+    )
+    return fields
+
+
+def _set_fields(element: Element, fields: dict[str, Any]) -> None:
+    for attr, value in fields.items():
+        setattr(element, attr, value)
+
+
+# element type by tag, and tag, encoder and decoder by element type
+_TAGS: dict[str, type] = {}
+_TYPES: dict[type, tuple[str, Encoder, Decoder]] = {}
+
+
+def register(
+    cls: type,
+    tag: Optional[str] = None,
+    encode: Encoder = _fields,
+    decode: Decoder = _set_fields,
+) -> type:
+    """
+    Makes elements of type `cls` serializable, usable as a class decorator.
+
+    By default every attribute is saved. `encode` may return other fields
+    instead, `decode` sets them back onto a blank instance (created without
+    calling `__init__`). Field values are numbers, strings, elements, NumPy
+    arrays, importable functions, or lists, tuples and dicts of those. The
+    tag, the qualified class name by default, must be the same in the
+    process that reads the model back.
+    """
+    tag = tag or f"{cls.__module__}.{cls.__qualname__}"
+    if _TAGS.get(tag, cls) is not cls:
+        raise ValueError(f"Tag '{tag}' is already registered for another type")
+    _TAGS[tag] = cls
+    _TYPES[cls] = (tag, encode, decode)
+    return cls
+
+
+for _module in (core, components):
+    for _cls in vars(_module).values():
+        if (
+            isinstance(_cls, type)
+            and issubclass(_cls, Element)
+            and _cls.__module__ == _module.__name__
+            and _cls is not core.Kernel
+        ):
+            register(_cls, _cls.__name__)
+register(Stock, "Stock")
+
+
+def _function(value: Callable) -> dict[str, str]:
+    qualname = getattr(value, "__qualname__", getattr(value, "__name__", ""))
+    module = getattr(value, "__module__", None)
+    owner = getattr(value, "__self__", None)
+    if (
+        not module
+        or not qualname
+        or "<" in qualname
+        # bound methods would be read back without their instance
+        or not (owner is None or isinstance(owner, (types.ModuleType, type)))
+    ):
+        raise ValueError(
+            f"Function {value!r} can't be serialized, "
+            "only module-level functions are referenced by name"
+        )
+    reference = f"{module}:{qualname}"
+    try:
+        found = _import(reference)
+    except (ImportError, AttributeError):
+        found = None
+    if found != value:
+        raise ValueError(
+            f"Function {value!r} can't be serialized, "
+            f"'{reference}' doesn't refer to it"
+        )
+    return {"function": reference}
+
+
+def _import(reference: str) -> Callable:
+    module, _, qualname = reference.partition(":")
+    value: Any = importlib.import_module(module)
+    for attr in qualname.split("."):
+        value = getattr(value, attr)
+    return value
+
+
+class _Encoder:
+    def __init__(self):
+        self.nodes: list[Element] = []
+        self.index: dict[int, int] = {}
+
+    def ref(self, element: Element) -> int:
+        index = self.index.get(id(element))
+        if index is None:
+            index = self.index[id(element)] = len(self.nodes)
+            self.nodes.append(element)
+        return index
+
+    def value(self, value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, Element):
+            return {"@": self.ref(value)}
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, np.ndarray):
+            return {
+                "array": value.ravel().tolist(),
+                "dtype": value.dtype.str,
+                "shape": list(value.shape),
+            }
+        if isinstance(value, list):
+            return [self.value(item) for item in value]
+        if isinstance(value, tuple):
+            return {"tuple": [self.value(item) for item in value]}
+        if isinstance(value, dict):
+            return {"dict": [[self.value(k), self.value(v)] for k, v in value.items()]}
+        if callable(value):
+            return _function(value)
+        raise ValueError(f"Can't serialize {type(value).__name__} value {value!r}")
+
+
+def _decode(value: Any, nodes: list[Element]) -> Any:
+    if isinstance(value, list):
+        return [_decode(item, nodes) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "@" in value:
+        return nodes[value["@"]]
+    if "array" in value:
+        array = np.array(value["array"], dtype=value["dtype"])
+        return array.reshape(value["shape"])
+    if "tuple" in value:
+        return tuple(_decode(item, nodes) for item in value["tuple"])
+    if "dict" in value:
+        return {_decode(k, nodes): _decode(v, nodes) for k, v in value["dict"]}
+    return _import(value["function"])
+
+
+def to_bytes(model: Model) -> bytes:
+    """The model in the serialization format, see `Model.to_bytes`."""
+    if model._modules:
+        raise ValueError("Models with included modules can't be serialized")
+    encoder = _Encoder()
+    elements = {name: encoder.ref(e) for name, e in model.elements.items()}
+    stocks = {name: encoder.ref(s) for name, s in model.stocks.items()}
+
+    tags: dict[str, int] = {}
+    nodes = []
+    # grows while elements referenced by the encoded ones are found
+    position = 0
+    while position < len(encoder.nodes):
+        element = encoder.nodes[position]
+        position += 1
+        registered = _TYPES.get(type(element))
+        if registered is None:
+            raise ValueError(
+                f"{type(element).__name__} '{element.name}' is not serializable, "
+                "register its type with `mead.serialize.register`"
+            )
+        tag, encode, _ = registered
+        fields = {k: encoder.value(v) for k, v in encode(element).items()}
+        owned = element.model is model
+        nodes.append([tags.setdefault(tag, len(tags)), owned, fields])
+
+    document = {
+        "format": FORMAT,
+        "version": VERSION,
+        "model": {
+            "name": model.name,
+            "dt": model.dt,
+            "loop_method": model.loop_method,
+            "loop_tolerance": model.loop_tolerance,
+            "loop_iterations": model.loop_iterations,
+        },
+        "types": list(tags),
+        "nodes": nodes,
+        "elements": elements,
+        "stocks": stocks,
+    }
+    return json.dumps(document, separators=(",", ":")).encode()
+
+
+def from_bytes(data: bytes) -> Model:
+    """A model read from `to_bytes` output, see `Model.from_bytes`."""
+    from mead.model import Model
+
+    try:
+        document = json.loads(data)
+    except (UnicodeDecodeError, json.JSONDecodeError) as error:
+        raise ValueError(f"Not a serialized model: {error}") from None
+    if not isinstance(document, dict) or document.get("format") != FORMAT:
+        raise ValueError("Not a serialized model")
+    if document["version"] > VERSION:
+        raise ValueError(
+            f"Model serialized with format version {document['version']}, "
+            f"this version of mead reads up to {VERSION}"
+        )
+    for tag in document["types"]:
+        if tag not in _TAGS:
+            raise ValueError(f"Unknown element type '{tag}', register it first")
+
+    model = Model(**document["model"])
+    classes = [_TAGS[tag] for tag in document["types"]]
+    nodes = [classes[t].__new__(classes[t]) for t, _, _ in document["nodes"]]
+    for node, (_, owned, fields) in zip(nodes, document["nodes"]):
+        node.model = model if owned else None
+        if isinstance(node, Expression):
+            node.uid = next(_uids)
+        _, _, decode = _TYPES[type(node)]
+        decode(node, {k: _decode(v, nodes) for k, v in fields.items()})
+
+    model.elements = {name: nodes[i] for name, i in document["elements"].items()}
+    model.stocks = {name: nodes[i] for name, i in document["stocks"].items()}
+    return model
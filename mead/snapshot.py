@@ -0,0 +1,49 @@
+"""Saved states of a run, to resume it later, see `Model.snapshot`."""
+
+from __future__ import annotations
+import os
+import pickle
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+
+@dataclass
+class Snapshot:
+    """
+    Everything a run needs to continue from `time` as if it never stopped.
+
+    `state` holds the stock values, `history` the recorded values far enough
+    back for delays and smooths to look up, `elements` the attributes that
+    stateful elements change while running (see `Element._run_state`) and
+    `loops` the warm start of every algebraic loop.
+    """
+
+    time: float
+    dt: float
+    state: dict[str, Any]
+    history: list[tuple[float, dict[str, Any]]] = field(repr=False)
+    elements: dict[str, dict[str, Any]] = field(repr=False)
+    loops: list[Any] = field(repr=False)
+
+    def save(self, path: str | Path) -> Path:
+        """Writes the snapshot to `path`, replacing it at once."""
+        path = Path(path)
+        handle, temporary = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as file:
+                pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path) -> Snapshot:
+        with open(path, "rb") as file:
+            snapshot = pickle.load(file)
+        if not isinstance(snapshot, cls):
+            raise ValueError(f"'{path}' doesn't hold a snapshot")
+        return snapshot
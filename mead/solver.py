@@ -12,13 +12,55 @@ class Solver(ABC):
     to advance the system state forward in time.
     """
 
+    # derivative evaluations per step, falling on multiples of dt / substeps
+    stages = 1
+    substeps = 1
+
+    def __init__(self):
+        # dicts reused from step to step for stage states and derivatives
+        self._buffers: dict[str, dict[str, float]] = {}
+        # stocks shifted once per step rather than integrated (e.g. conveyors),
+        # by the rates at the start of the step and held during the stages
+        self.discrete: frozenset[str] = frozenset()
+
+    def _buffer(self, key: str) -> dict[str, float]:
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = {}
+        return buffer
+
+    @staticmethod
+    def _advance_state(
+        state: dict[str, float],
+        derivatives: dict[str, float],
+        dt: float,
+        out: dict[str, float],
+    ) -> dict[str, float]:
+        """Advance state by dt using given derivatives, into `out`."""
+        for name in state:
+            out[name] = state[name] + derivatives[name] * dt
+        return out
+
+    def _hold(
+        self, state: dict[str, float], stage: dict[str, float]
+    ) -> dict[str, float]:
+        """Keeps the discrete stocks of a stage state at their value in `state`."""
+        for name in self.discrete:
+            stage[name] = state[name]
+        return stage
+
+    def _next_state(self, state: dict[str, float]) -> dict[str, float]:
+        """A buffer for the new state, alternating so it is never `state` itself."""
+        buffer = self._buffer("state")
+        return self._buffer("next_state") if buffer is state else buffer
+
     @abstractmethod
     def step(
         self,
         time: float,
         dt: float,
         state: dict[str, float],
-        compute_derivatives: Callable[[float, dict[str, float]], dict[str, float]],
+        compute_derivatives: Callable[..., dict[str, float]],
     ) -> dict[str, float]:
         """
         Perform one integration step.
@@ -27,10 +69,11 @@ class Solver(ABC):
             time: Current simulation time
             dt: Time step size
             state: Current state (stock name -> value)
-            compute_derivatives: Function to compute derivatives at given time and state
+            compute_derivatives: Function to compute derivatives at given time and
+                state, written into the dict given as third argument
 
         Returns:
-            New state after one time step
+            New state after one time step, a buffer reused by later steps
         """
         pass
 
@@ -48,11 +91,11 @@ class EulerSolver(Solver):
         time: float,
         dt: float,
         state: dict[str, float],
-        compute_derivatives: Callable[[float, dict[str, float]], dict[str, float]],
+        compute_derivatives: Callable[..., dict[str, float]],
     ) -> dict[str, float]:
         """Perform one Euler integration step."""
-        derivatives = compute_derivatives(time, state)
-        return {name: state[name] + derivatives[name] * dt for name in state}
+        derivatives = compute_derivatives(time, state, self._buffer("k1"))
+        return self._advance_state(state, derivatives, dt, self._next_state(state))
 
 
 class RK4Solver(Solver):
@@ -63,37 +106,44 @@ class RK4Solver(Solver):
     Uses weighted average of four derivative evaluations per step.
     """
 
+    stages = 4
+    substeps = 2
+
     def step(
         self,
         time: float,
         dt: float,
         state: dict[str, float],
-        compute_derivatives: Callable[[float, dict[str, float]], dict[str, float]],
+        compute_derivatives: Callable[..., dict[str, float]],
     ) -> dict[str, float]:
         """Perform one RK4 integration step."""
         half_dt = dt / 2
+        stage = self._buffer("stage")
 
-        k1 = compute_derivatives(time, state)
+        k1 = compute_derivatives(time, state, self._buffer("k1"))
         k2 = compute_derivatives(
-            time + half_dt, self._advance_state(state, k1, half_dt)
+            time + half_dt,
+            self._hold(state, self._advance_state(state, k1, half_dt, stage)),
+            self._buffer("k2"),
         )
         k3 = compute_derivatives(
-            time + half_dt, self._advance_state(state, k2, half_dt)
+            time + half_dt,
+            self._hold(state, self._advance_state(state, k2, half_dt, stage)),
+            self._buffer("k3"),
+        )
+        k4 = compute_derivatives(
+            time + dt,
+            self._hold(state, self._advance_state(state, k3, dt, stage)),
+            self._buffer("k4"),
         )
-        k4 = compute_derivatives(time + dt, self._advance_state(state, k3, dt))
 
-        new_state = {}
+        new_state = self._next_state(state)
         for name in state:
             weighted_derivative = (
                 k1[name] + 2 * k2[name] + 2 * k3[name] + k4[name]
             ) / 6
             new_state[name] = state[name] + weighted_derivative * dt
+        for name in self.discrete:
+            new_state[name] = state[name] + k1[name] * dt
 
         return new_state
-
-    @staticmethod
-    def _advance_state(
-        state: dict[str, float], derivatives: dict[str, float], dt: float
-    ) -> dict[str, float]:
-        """Advance state by dt using given derivatives."""
-        return {name: state[name] + derivatives[name] * dt for name in state}
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING
 from mead.core import Element
+from mead.dims import Dims, as_array
 
 if TYPE_CHECKING:
     from mead.components import Flow
@@ -12,9 +13,20 @@ class Stock(Element):
     Stocks are changed by flows.
     """
 
-    def __init__(self, name: str, initial_value: float = 0.0):
+    __slots__ = ("initial_value", "inflows", "outflows", "dims")
+    _children = ("inflows", "outflows")
+
+    def __init__(self, name: str, initial_value: float = 0.0, dims: Dims = ()):
+        """
+        Args:
+            name: Unique name of the stock in the model.
+            initial_value: Value at t=0, an array shaped like `dims` if any.
+            dims: Names of the dimensions the stock is subscripted by, e.g.
+                `("region",)`. Every subscript is integrated as one array.
+        """
         super().__init__(name)
-        self.initial_value = initial_value
+        self.dims = tuple(dims)
+        self.initial_value = as_array(initial_value, self.dims)
         self.inflows: list[Flow] = []
         self.outflows: list[Flow] = []
 
@@ -12,6 +12,90 @@ def as_element(value: Any) -> Element:
             raise ValueError(f"Can't handle type of {value}")
 
 
+def attributes(element: Element) -> dict[str, Any]:
+    """Instance attributes of `element`, from its slots and its `__dict__` if any."""
+    skipped = {"__dict__", "__weakref__"}
+    if element.anonymous:
+        # rendered from the whole subtree on every access
+        skipped.add("name")
+    found = {}
+    for cls in reversed(type(element).__mro__):
+        for attr in cls.__dict__.get("__slots__", ()):
+            if attr not in skipped and hasattr(element, attr):
+                found[attr] = getattr(element, attr)
+    found.update(getattr(element, "__dict__", {}))
+    return found
+
+
+def child_attributes(element: Element) -> list[str]:
+    """Attributes that may hold children: the declared ones, plus `__dict__` ones."""
+    names = list(type(element)._children)
+    for attr in getattr(element, "__dict__", ()):
+        if attr != "model" and attr not in names:
+            names.append(attr)
+    return names
+
+
+def children(element: Element) -> list[Element]:
+    """Elements directly referenced by `element`, explicitly or through its attributes."""
+    found = [dep for dep in element.dependencies if isinstance(dep, Element)]
+    for attr in child_attributes(element):
+        value = getattr(element, attr)
+        if isinstance(value, Element):
+            found.append(value)
+        elif isinstance(value, list):
+            found.extend(item for item in value if isinstance(item, Element))
+    return found
+
+
+def strongly_connected(graph: dict[Any, list[Any]]) -> list[list[Any]]:
+    """
+    Groups of nodes of `graph` (node -> successors) that lie on a common cycle.
+
+    Tarjan's algorithm, with an explicit stack. Nodes on no cycle are left out,
+    components come out successors first.
+    """
+    index: dict[Any, int] = {}
+    low: dict[Any, int] = {}
+    on_stack: set[Any] = set()
+    stack: list[Any] = []
+    components: list[list[Any]] = []
+    for start in graph:
+        if start in index:
+            continue
+        work = [(start, iter(graph[start]))]
+        index[start] = low[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = low[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(graph.get(successor, ()))))
+                    break
+                if successor in on_stack:
+                    low[node] = min(low[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in graph.get(node, ()):
+                        components.append(component[::-1])
+    return components
+
+
 def deep_replace(
     obj: Any, replacements: dict[str, Element], memo: set | None = None
 ) -> Any:
@@ -23,10 +107,13 @@ def deep_replace(
         return obj
     memo.add(id(obj))
 
-    if isinstance(obj, Element) and obj.name in replacements:
+    if isinstance(obj, Element) and not obj.anonymous and obj.name in replacements:
         return replacements[obj.name]
 
-    if isinstance(obj, list):
+    if isinstance(obj, Element):
+        for attr in child_attributes(obj):
+            setattr(obj, attr, deep_replace(getattr(obj, attr), replacements, memo))
+    elif isinstance(obj, list):
         for i, item in enumerate(obj):
             obj[i] = deep_replace(item, replacements, memo)
     elif isinstance(obj, tuple):
@@ -0,0 +1,65 @@
+import pytest
+import mead as m
+from mead.adjoint import Tape
+
+
+def test_tape_reverse_sweep():
+    tape = Tape()
+    x = tape.variable(3.0)
+    y = tape.variable(2.0)
+    z = x * y + x / y - 1
+    adjoints = tape.gradient(z)
+    # dz/dx = y + 1/y, dz/dy = x - x/y^2
+    assert adjoints[x.index] == pytest.approx(2.5)
+    assert adjoints[y.index] == pytest.approx(2.25)
+
+
+def _aging_chain(**overrides):
+    rates = {"birth": 0.05, "aging": 0.1, "youth_death": 0.01, "adult_death": 0.02}
+    rates.update(overrides)
+    with m.Model("aging", dt=0.5) as model:
+        birth = m.Constant("birth", rates["birth"])
+        aging = m.Constant("aging", rates["aging"])
+        youth_death = m.Constant("youth_death", rates["youth_death"])
+        adult_death = m.Constant("adult_death", rates["adult_death"])
+        youth = m.Stock("youth", 100)
+        adults = m.Stock("adults", 300)
+        youth.add_inflow(m.Flow("births", adults * birth))
+        moving = m.Flow("moving", youth * aging)
+        youth.add_outflow(moving)
+        youth.add_outflow(m.Flow("youth_deaths", youth * youth_death))
+        adults.add_inflow(moving)
+        adults.add_outflow(m.Flow("adult_deaths", adults * adult_death))
+        m.Smooth("perceived", adults, 2.0, initial_value=300)
+    return model
+
+
+@pytest.mark.parametrize("method", ["euler", "rk4"])
+def test_gradient_matches_forward_sensitivities(method):
+    model = _aging_chain()
+    constants = ["birth", "aging", "youth_death", "adult_death"]
+
+    gradient = model.gradient(lambda r: r["adults"][-1], duration=10, method=method)
+    forward = model.run(duration=10, method=method, sensitivities=constants)
+
+    assert set(gradient) == set(constants)
+    for name in constants:
+        assert gradient[name] == pytest.approx(forward.loc[10, f"d(adults)/d({name})"])
+
+
+def test_gradient_of_objective_over_trajectory():
+    data = [300 + 2 * i for i in range(21)]
+
+    def objective(r):
+        # squared error of the smoothed adults against observations
+        return sum((x - d) ** 2 for x, d in zip(r["perceived"], data))
+
+    gradient = _aging_chain().gradient(objective, duration=10)
+
+    def error(birth):
+        perceived = _aging_chain(birth=birth).run(duration=10)["perceived"]
+        return sum((x - d) ** 2 for x, d in zip(perceived, data))
+
+    h = 1e-6
+    fd = (error(0.05 + h) - error(0.05 - h)) / (2 * h)
+    assert gradient["birth"] == pytest.approx(fd, rel=1e-4)
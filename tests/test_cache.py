@@ -0,0 +1,76 @@
+import mead as m
+from mead.cache import structural_hash
+
+
+def _model(rate=0.1):
+    with m.Model("cached", dt=0.5) as model:
+        population = m.Stock("population", 100)
+        growth = m.Constant("growth", rate)
+        population.add_inflow(m.Flow("births", population * growth))
+        m.Auxiliary("double", m.Delay("late", population, 1) * 2)
+    return model
+
+
+def test_structural_hash_follows_equations_and_values():
+    assert structural_hash(_model()) == structural_hash(_model())
+    assert structural_hash(_model()) != structural_hash(_model(0.2))
+    assert structural_hash(_model()) != structural_hash(_model(), ["double"])
+
+
+def test_load_returns_a_compiled_model(tmp_path):
+    cache = m.ModelCache(tmp_path)
+    key = cache.store(_model())
+    assert key in cache
+
+    loaded = m.ModelCache(tmp_path).load(key)
+    assert loaded._plan is not None
+    assert loaded.run(duration=3).equals(_model().run(duration=3))
+
+
+def test_compile_reuses_the_cached_plan(tmp_path, monkeypatch):
+    m.ModelCache(tmp_path).store(_model())
+
+    expected = _model().run(duration=3)
+    model = _model()
+    model.cache = m.ModelCache(tmp_path)
+    monkeypatch.setattr(m.Model, "_compile", None)
+    assert model.run(duration=3).equals(expected)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = m.ModelCache(tmp_path)
+    first = cache.store(_model(0.1))
+    size = (tmp_path / f"{first}.plan").stat().st_size
+    cache.max_bytes = 2 * size + size // 2
+
+    second = cache.store(_model(0.2))
+    cache.load(first)
+    third = cache.store(_model(0.3))
+    assert first in cache and third in cache
+    assert second not in cache
+
+
+def _ring():
+    with m.Model("ring", dt=0.5) as model:
+        stocks = [m.Stock(f"s{i}", 1.0) for i in range(3000)]
+        for i, stock in enumerate(stocks):
+            flow = m.Flow(f"f{i}", stock * 0.1)
+            stock.add_outflow(flow)
+            stocks[i - 1].add_inflow(flow)
+        stocks[0].add_inflow(m.Flow("aid", m.Policy("relief", stocks[0] > 0.5, 1)))
+    return model
+
+
+def test_cached_plans_run_on_the_elements_of_the_model(tmp_path, monkeypatch):
+    # linked too deep for pickle to walk the graph in one go
+    first = _ring()
+    first.cache = m.ModelCache(tmp_path)
+    expected = first.run(duration=1)
+    assert len(list(tmp_path.glob("*.plan"))) == 1
+
+    model = _ring()
+    model.cache = m.ModelCache(tmp_path)
+    monkeypatch.setattr(m.Model, "_compile", None)
+    assert model.run(duration=1).equals(expected)
+    assert model._plan.elements["relief"].element is model.elements["relief"]
+    assert model.elements["relief"].apply == 0
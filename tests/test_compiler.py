@@ -0,0 +1,298 @@
+import time
+
+import pytest
+import mead as m
+from mead.core import Equation, Sum, Product
+from mead.compiler import simplify, is_literal, Shared
+
+
+def _unwrap(element):
+    return element.element if isinstance(element, Shared) else element
+
+
+def test_identities_are_removed():
+    x = m.Constant("x", 3)
+    assert simplify(x * 1) is x
+    assert simplify(x + 0) is x
+    assert simplify(x / 1) is x
+    assert simplify(1 * (x - 0)) is x
+
+
+def test_negation_becomes_subtraction():
+    y = m.Constant("y", 3)
+    neg = simplify(-y)
+    assert isinstance(neg, Sum)
+    assert neg.terms == [] and neg.subtracted == [y]
+    assert neg.compute({}) == -3
+
+
+def test_literal_subtrees_are_folded():
+    folded = simplify(Equation(Equation(2, "*", 3), "+", Equation(8, "/", 2)))
+    assert is_literal(folded)
+    assert folded.value == 10
+    assert simplify(Equation(2, ">", 1)).value == 1
+
+
+def test_division_follows_safe_division():
+    x = m.Constant("x", 0)
+    assert simplify(0 / x).value == 0
+    assert simplify(x / 0).value == 0
+    # x / x is zero, not one, when x is zero
+    same = simplify(x / x)
+    assert isinstance(same, Product)
+    assert same.compute({}) == 0
+
+
+def test_chains_are_flattened():
+    a, b, c, d = (m.Constant(n, v) for n, v in zip("abcd", (1, 2, 3, 4)))
+    total = simplify(a + b - c + d + 1 + 2)
+    assert isinstance(total, Sum)
+    assert total.terms == [a, b, d]
+    assert total.subtracted == [c]
+    assert total.constant == 3
+    assert total.compute({}) == 7
+
+    product = simplify(a * 2 * b / c * d * 0.5)
+    assert isinstance(product, Product)
+    assert product.factors == [a, b, d]
+    assert product.divisors == [c]
+    assert product.coefficient == 1
+    assert product.compute({}) == pytest.approx(8 / 3)
+
+
+def test_model_runs_the_simplified_graph():
+    with m.Model("chickens", dt=1) as model:
+        chickens = m.Stock("chickens", 10)
+        # explicit binary equations, operators already build flattened nodes
+        eggs = m.Flow(
+            "eggs", Equation(Equation(Equation(chickens, "*", 0.6), "*", 0.5), "+", 0)
+        )
+        deaths = m.Flow("deaths", 0 - (-chickens) * 0.1)
+        chickens.add_inflow(eggs)
+        chickens.add_outflow(deaths)
+
+    plan = model.compile()
+    simplified = _unwrap(_unwrap(plan.elements["eggs"]).equation)
+    assert isinstance(simplified, Product)
+    assert simplified.factors == [chickens]
+    assert simplified.coefficient == pytest.approx(0.3)
+    # the model itself is left untouched
+    assert isinstance(eggs.equation, Equation)
+
+    results = model.run(duration=2)
+    assert results.loc[1, "chickens"] == pytest.approx(12)
+    assert results.loc[2, "chickens"] == pytest.approx(14.4)
+
+
+def test_identical_subexpressions_are_computed_once_per_stage():
+    calls = []
+
+    def pressure(ctx):
+        calls.append(ctx["time"])
+        return 2.0
+
+    with m.Model("cse", dt=1) as model:
+        stock = m.Stock("stock", 1)
+        f = m.Function("pressure", pressure)
+        # built separately, structurally identical
+        inflow = m.Flow("inflow", (stock * f + 1) * 0.5)
+        outflow = m.Flow("outflow", (stock * f + 1) * 0.25)
+        stock.add_inflow(inflow)
+        stock.add_outflow(outflow)
+
+    plan = model.compile()
+    inflow = _unwrap(_unwrap(plan.inflows["stock"][0]).equation)
+    outflow = _unwrap(_unwrap(plan.outflows["stock"][0]).equation)
+    inflow_term, outflow_term = inflow.factors[0], outflow.factors[0]
+    assert isinstance(inflow_term, Shared)
+    assert inflow_term is outflow_term
+
+    results = model.run(duration=2, method="rk4")
+    # once per output step and once per RK4 stage
+    assert len(calls) == 3 + 2 * 4
+    assert results.loc[1, "stock"] > 1
+
+
+def test_operator_chains_build_one_node():
+    terms = [m.Constant(f"a{i}", 0.1) for i in range(5000)]
+    total = terms[0]
+    for term in terms[1:]:
+        total = total + term
+    assert isinstance(total, Sum)
+    assert total.terms == terms
+    # evaluated with fsum, no rounding drift
+    assert total.compute({}) == 500.0
+    assert m.Sum(*terms).compute({}) == 500.0
+
+    product = terms[0] * 2 / terms[1] * terms[2]
+    assert isinstance(product, Product)
+    assert product.factors == [terms[0], terms[2]]
+    assert product.divisors == [terms[1]]
+
+
+def _chain_seconds(n):
+    s = m.Constant("s", 1.0)
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        total, product = s * 0, s
+        for i in range(n):
+            total = total + s * i
+            product = product * s
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_operator_chains_build_in_linear_time():
+    # eight times the operands, quadratic building would take 64 times as long
+    assert _chain_seconds(8000) < 24 * _chain_seconds(1000)
+
+
+def test_chains_built_on_the_same_node_keep_their_operands():
+    a, b, c, d = (m.Constant(n, v) for n, v in zip("abcd", (1, 2, 3, 4)))
+    base = a + b
+    first, second = base + c, base - d
+    assert base.terms == [a, b]
+    assert first.terms == [a, b, c]
+    assert second.terms == [a, b] and second.subtracted == [d]
+    assert (base + base).compute({}) == 6
+
+    product = a * b
+    assert (product * c).factors == [a, b, c]
+    assert (product / d).factors == [a, b] and product.factors == [a, b]
+
+
+def test_deep_models_evaluate_without_recursion_limit():
+    depth = 5000
+    with m.Model("deep", dt=1) as model:
+        stock = m.Stock("stock", 0)
+        level = m.Auxiliary("level0", stock + 1)
+        for i in range(1, depth):
+            level = m.Auxiliary(f"level{i}", level * 1 + 1)
+        stock.add_inflow(m.Flow("inflow", level / depth))
+
+    results = model.run(duration=2, method="rk4")
+    assert results.loc[0, f"level{depth - 1}"] == depth
+    assert results.loc[1, "stock"] == pytest.approx(1, rel=1e-3)
+
+
+def test_identical_pure_functions_are_shared():
+    calls = []
+
+    def double(x):
+        calls.append(x)
+        return 2 * x
+
+    with m.Model("pure", dt=1) as model:
+        stock = m.Stock("stock", 1)
+        first = m.Function("first", double, inputs=[stock], pure=True)
+        second = m.Function("second", double, inputs=[stock], pure=True)
+        stock.add_inflow(m.Flow("inflow", first + second))
+
+    plan = model.compile()
+    assert _unwrap(plan.elements["first"]) is _unwrap(plan.elements["second"])
+    results = model.run(duration=1)
+    assert results.loc[1, "stock"] == 5
+    # per recorded step and per derivative evaluation, not per element
+    assert len(calls) == 3
+
+
+def test_state_independent_subgraphs_are_hoisted_out_of_the_loop(monkeypatch):
+    calls = []
+
+    def forcing(t):
+        calls.append(t)
+        return 1 + 0.5 * t
+
+    with m.Model("hoisted", dt=0.5) as model:
+        time = m.Time()
+        stock = m.Stock("stock", 0)
+        rate = m.Auxiliary("rate", m.exp(m.Constant("k", 0.0)) * 2)
+        drive = m.Function("drive", forcing, inputs=[time], pure=True)
+        ramp = m.Step("ramp", 1, 0, 1)
+        stock.add_inflow(m.Flow("inflow", rate * drive + ramp * stock))
+
+    results = model.run(duration=2, method="rk4")
+    # once per point of the dt / 2 grid rather than per stage and record
+    assert sorted(calls) == [i * 0.25 for i in range(9)]
+    assert results.loc[2, "drive"] == 2
+
+    # same results as computing everything at every stage
+    monkeypatch.setattr(m.compiler.Plan, "hoist", lambda *args: None)
+    expected = model.run(duration=2, method="rk4")
+    assert list(results["stock"]) == list(expected["stock"])
+    assert list(results["inflow"]) == list(expected["inflow"])
+
+    plan = model.compile()
+    hoisted = {node.name for node in plan.hoisted}
+    assert {"rate", "drive", "ramp"} <= hoisted
+    assert "inflow" not in hoisted
+    # without a run the hoisted nodes are computed directly
+    assert plan.elements["ramp"].compute({"time": 1.5}) == 1
+
+
+def _market(k=2.0, **options):
+    with m.Model("market", dt=1, **options) as model:
+        supply = m.Stock("supply", 100)
+        price = m.Auxiliary("price", m.Constant("guess", 1.0))
+        demand = m.Auxiliary("demand", 200 / (price + 1))
+        # price and demand depend on each other
+        price.equation = demand / supply * m.Constant("k", k)
+        supply.add_inflow(m.Flow("production", price * 10))
+        supply.add_outflow(m.Flow("sales", demand * 0.1))
+    return model
+
+
+@pytest.mark.parametrize("method", ["newton", "fixed_point"])
+def test_algebraic_loops_are_solved_every_stage(method):
+    model = _market(loop_method=method)
+    results = model.run(duration=5, method="rk4")
+    for _, row in results.iterrows():
+        assert row["demand"] == pytest.approx(200 / (row["price"] + 1))
+        assert row["price"] == pytest.approx(2 * row["demand"] / row["supply"])
+
+    (loop,) = model._plan.loops
+    assert loop.names == ["demand", "price"]
+    # once per recorded step and per RK4 stage
+    assert loop.solves == 6 + 5 * 4
+    assert loop.most_iterations < 100
+    assert model.analyze().loops == [["demand", "price"]]
+
+
+def test_algebraic_loops_carry_sensitivities():
+    results = _market().run(duration=3, sensitivities=["k"])
+    step = 1e-6
+    up = _market(2 + step).run(duration=3)["supply"]
+    down = _market(2 - step).run(duration=3)["supply"]
+    assert results.loc[3, "d(supply)/d(k)"] == pytest.approx(
+        (up[3] - down[3]) / (2 * step), rel=1e-5
+    )
+
+
+def test_diverging_algebraic_loop():
+    with m.Model("diverging", dt=1) as model:
+        stock = m.Stock("stock", 0)
+        x = m.Auxiliary("x", m.Constant("start", 0))
+        x.equation = x + 1
+        stock.add_inflow(m.Flow("inflow", x))
+
+    with pytest.raises(ValueError):
+        model.run(duration=1)
+
+
+def test_compiling_copies_expressions_without_rendering_names(monkeypatch):
+    with m.Model("deep", dt=1) as model:
+        stock = m.Stock("stock", 1.0)
+        level = Equation(stock, "*", 1)
+        for _ in range(3000):
+            level = abs(level)
+        # simplifying the innermost node copies every node above it
+        stock.add_inflow(m.Flow("inflow", level))
+
+    rendered = []
+    tokens = m.Apply._tokens
+    monkeypatch.setattr(
+        m.Apply, "_tokens", lambda self: rendered.append(1) or tokens(self)
+    )
+    model.compile()
+    assert not rendered
@@ -1,3 +1,6 @@
+import numpy as np
+import pytest
+
 import mead as m
 
 
@@ -184,6 +187,13 @@ def test_policy_applied_multiple():
     assert results.loc[7.0, "s"] == 0  # policy non-longer in effect
 
 
+def test_policy_refuses_subscripted_conditions():
+    with m.Model("test", dt=1.0):
+        pop = m.Stock("pop", initial_value=np.array([8.0, 10.0]), dims=("r",))
+        with pytest.raises(ValueError, match="subscripted"):
+            m.Policy("pol", pop < 9, 1)
+
+
 def test_policy_continuous_application():
     with m.Model("test", dt=1.0) as model:
         s = m.Stock("s", initial_value=50)
@@ -208,3 +218,69 @@ def test_policy_works_with_fractional_dt():
     results = model.run(duration=5)
     assert results.loc[0.0, "s"] == 20
     assert results.loc[5.0, "s"] == 10  # policy keeps the stock at 10
+
+
+def test_delay_of_an_expression():
+    with m.Model("test", dt=1.0) as model:
+        stock = m.Stock("stock", initial_value=10)
+        stock.add_inflow(m.Flow("flow", 1))
+        m.Delay("delayed", stock * 2, delay_time=2)
+
+    results = model.run(duration=5)
+    # expressions are not result columns, the delayed one is recorded by name
+    assert not any(column.startswith("(") for column in results.columns)
+    assert results.loc[4.0, "delayed"] == results.loc[2.0, "delayed_input"]
+
+
+def test_delayn():
+    with m.Model("test", dt=0.1) as model:
+        target = m.Step("target", start_time=1, before_value=100, after_value=200)
+        m.DelayN("delay", target, delay_time=2.0, initial_value=100, order=8)
+        m.Delay3("delay3", target, delay_time=2.0, initial_value=100)
+
+    results = model.run(duration=10, method="rk4")
+    assert results.loc[1.0, "delay"] == pytest.approx(100)
+    # higher order: less output early on, then a steeper rise
+    assert results.loc[2.0, "delay"] < results.loc[2.0, "delay3"]
+    assert results.loc[3.0, "delay"] == pytest.approx(150, abs=15)
+    assert results.loc[10.0, "delay"] == pytest.approx(200, abs=0.1)
+
+
+def test_delayn_built_outside_of_the_model():
+    target = m.Step("target", start_time=1, before_value=100, after_value=200)
+    delay = m.DelayN("delay", target, delay_time=2.0, initial_value=100, order=8)
+    model = m.Model("test", dt=0.1)
+    model.add(target, delay)
+    assert "delay_stages" in model.stocks
+
+    with m.Model("test", dt=0.1) as expected:
+        target = m.Step("target", start_time=1, before_value=100, after_value=200)
+        m.DelayN("delay", target, delay_time=2.0, initial_value=100, order=8)
+    assert model.run(duration=5).equals(expected.run(duration=5))
+
+
+def test_conveyor_shifts_and_conserves_material():
+    with m.Model("test", dt=0.5) as model:
+        source = m.Stock("source", initial_value=100)
+        sink = m.Stock("sink", initial_value=0)
+        shipping = m.Flow("shipping", m.Pulse("pulse", 1, 1, 10))
+        source.add_outflow(shipping)
+        belt = m.Conveyor("belt", shipping, delay_time=3)
+        arrivals = m.Flow("arrivals", belt)
+        sink.add_inflow(arrivals)
+
+    assert belt.order == 6
+    results = model.run(duration=8)
+    # shipped during [1, 2), arrives exactly 3 time units later
+    assert results.loc[3.5, "arrivals"] == 0
+    assert results.loc[4.0, "arrivals"] == 10
+    assert results.loc[5.0, "arrivals"] == 0
+    in_transit = results[[f"belt_stages[{i}]" for i in range(6)]].sum(axis=1) * 0.5
+    total = results["source"] + in_transit + results["sink"]
+    assert total.to_list() == pytest.approx([100] * len(results))
+    assert results.loc[8.0, "sink"] == pytest.approx(10)
+
+    # the slots shift once per step with RK4 as well, without dispersing
+    rk4 = model.run(duration=8, method="rk4")
+    assert rk4["arrivals"].to_list() == pytest.approx(results["arrivals"].to_list())
+    assert rk4.loc[8.0, "sink"] == pytest.approx(10)
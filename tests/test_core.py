@@ -160,3 +160,77 @@ def test_function():
 
     f1 = Function("f1", some_test)
     assert f1.compute(dummy_context) == 30.21
+
+
+def test_expressions_are_named_lazily():
+    a = Constant("a", 1)
+    b = Constant("b", 2)
+    eq = Equation(Equation(a, "+", b), "*", 2)
+    assert isinstance(eq.uid, int)
+    assert eq.name == "((a + b) * literal_2)"
+    assert ((a - b) * 2).name == "(2.0 * (a - b))"
+    assert (a + b).uid != (a + b).uid
+
+
+def test_long_chains_build_without_names():
+    total = Constant("c0", 0)
+    for i in range(1, 5000):
+        total = Equation(total, "+", Constant(f"c{i}", i))
+    # rendering the name of a deep chain must not recurse
+    assert total.name.startswith("(" * 4999 + "c0 + c1)")
+    assert total.name.endswith(" + c4999)")
+
+
+def test_elements_have_no_instance_dict():
+    c = Constant("c", 1)
+    assert not hasattr(c, "__dict__")
+    assert not hasattr(c + c, "__dict__")
+
+
+def test_replace_and_subclasses_without_slots():
+    import copy
+    from mead.utils import children
+
+    c = Constant("c", 1)
+    assert copy.replace(c, value=2).value == 2
+
+    class Scaled(Element):
+        def __init__(self, name, inner, factor):
+            super().__init__(name)
+            self.inner = inner
+            self.factor = factor
+
+        def compute(self, context):
+            return self.inner.compute(context) * self.factor
+
+    scaled = Scaled("scaled", c, 3)
+    assert children(scaled) == [c]
+    assert copy.replace(scaled, factor=4).compute(dummy_context) == 4
+
+    d = Constant("d", 4)
+    total = copy.replace(c + d, constant=0.5)
+    assert total.terms == [c, d] and total.compute(dummy_context) == 5.5
+    assert copy.replace(c - d, terms=[d]).compute(dummy_context) == 0
+    product = copy.replace(c * d, factors=[d, d], coefficient=2)
+    assert product.compute(dummy_context) == 32
+    assert copy.replace(c / d).divisors == [d]
+    with pytest.raises(TypeError):
+        copy.replace(c + d, left=c)
+
+
+def test_math_functions_and_logical_operators():
+    import math
+    from mead.core import exp, log, sqrt
+
+    x = Constant("x", 4.0)
+    y = Constant("y", -1.0)
+    assert exp(x).compute(dummy_context) == pytest.approx(math.exp(4))
+    assert log(x).compute(dummy_context) == pytest.approx(math.log(4))
+    assert sqrt(x).compute(dummy_context) == 2
+    assert abs(y).compute(dummy_context) == 1
+    assert (x**0.5).compute(dummy_context) == 2
+    assert (2**x).compute(dummy_context) == 16
+    assert (x & y).compute(dummy_context) == 0
+    assert (x | y).compute(dummy_context) == 1
+    assert (~y).compute(dummy_context) == 1
+    assert exp(log(x)).name == "exp(log(x))"
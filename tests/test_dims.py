@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+import mead as m
+
+
+def test_subscripted_stock_integrates_every_region():
+    regions = 500
+    growth = np.linspace(0.01, 0.05, regions)
+    with m.Model("regions", dt=1) as model:
+        pop = m.Stock("pop", initial_value=np.full(regions, 100.0), dims=("region",))
+        rate = m.Constant("rate", growth, dims=("region",))
+        pop.add_inflow(m.Flow("births", pop * rate))
+
+    results = model.run(duration=2)
+    assert results.loc[2, "pop[0]"] == pytest.approx(100 * 1.01**2)
+    assert results.loc[2, f"pop[{regions - 1}]"] == pytest.approx(100 * 1.05**2)
+    assert results.loc[1, "births[1]"] == pytest.approx(
+        100 * growth[1] * (1 + growth[1])
+    )
+
+
+def test_broadcast_over_different_dims_and_reduce():
+    with m.Model("cohorts", dt=1) as model:
+        pop = m.Stock("pop", initial_value=[10.0, 20.0], dims=("region",))
+        share = m.Constant("share", [0.25, 0.75], dims=("age",))
+        by_age = m.Auxiliary("by_age", pop * share)
+        m.Auxiliary("total", by_age.sum("age"))
+        m.Auxiliary("average", by_age.mean("region"))
+
+    assert by_age.dims == ("region", "age")
+    results = model.run(duration=0)
+    assert results.loc[0, "by_age[1,0]"] == 5
+    assert results.loc[0, "total[0]"] == 10
+    assert results.loc[0, "total[1]"] == 20
+    assert results.loc[0, "average[1]"] == pytest.approx(11.25)
+
+
+def test_flows_are_aligned_to_the_dims_of_their_stock():
+    rate = [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]]
+    with m.Model("permuted", dt=1) as model:
+        pop = m.Stock("pop", initial_value=np.zeros((2, 3)), dims=("a", "b"))
+        pop.add_inflow(m.Flow("arrivals", m.Constant("rate", rate, dims=("b", "a"))))
+        loss = m.Constant("loss", [0.5, 1.0], dims=("a",))
+        pop.add_outflow(m.Flow("departures", loss))
+
+    results = model.run(duration=1)
+    assert results.loc[1, "pop[0,2]"] == 5 - 0.5
+    assert results.loc[1, "pop[1,0]"] == 2 - 1
+
+    with m.Model("wider", dt=1) as model:
+        total = m.Stock("total", 0)
+        total.add_inflow(m.Flow("spread", m.Constant("rate", rate, dims=("b", "a"))))
+    with pytest.raises(ValueError, match="only by"):
+        model.run(duration=1)
+
+
+def test_element_wise_safe_division_and_conditions():
+    with m.Model("division", dt=1) as model:
+        a = m.Constant("a", [1.0, 2.0, 3.0], dims=("i",))
+        b = m.Constant("b", [2.0, 0.0, 1.0], dims=("i",))
+        m.Auxiliary("ratio", a / b)
+        m.IfThenElse("bigger", a - b, a, b)
+        m.Min("smallest", a, b, 1.5)
+
+    results = model.run(duration=0)
+    assert list(results.loc[0, ["ratio[0]", "ratio[1]", "ratio[2]"]]) == [0.5, 0, 3]
+    assert list(results.loc[0, ["bigger[0]", "bigger[1]", "bigger[2]"]]) == [2, 2, 3]
+    assert list(results.loc[0, ["smallest[0]", "smallest[1]", "smallest[2]"]]) == [
+        1,
+        0,
+        1,
+    ]
+
+
+def test_invalid_dims():
+    with pytest.raises(ValueError):
+        m.Stock("pop", initial_value=[1.0, 2.0], dims=("region", "age"))
+    with pytest.raises(ValueError):
+        m.Constant("rate", 1.0).sum("region")
+
+
+def test_coupling_matches_dense_product():
+    matrix = np.array([[0.0, 0.5, 0.0], [0.2, 0.0, 0.0], [0.0, 0.3, 0.1]])
+    with m.Model("network", dt=1) as model:
+        x = m.Constant("x", [1.0, 2.0, 3.0], dims=("node",))
+        coupling = m.Coupling("coupled", x, matrix)
+
+    assert coupling.nnz == 4
+    results = model.run(duration=0)
+    expected = matrix @ [1.0, 2.0, 3.0]
+    assert list(results.loc[0, ["coupled[0]", "coupled[1]", "coupled[2]"]]) == (
+        pytest.approx(list(expected))
+    )
+
+
+def test_coupling_from_edges_conserves_material():
+    nodes = 10_000
+    # every node of a ring receives 10% of the population of the next one
+    edges = [(i, (i + 1) % nodes, 0.1) for i in range(nodes)]
+    initial = np.arange(nodes, dtype=float)
+    with m.Model("ring", dt=1) as model:
+        pop = m.Stock("pop", initial_value=initial, dims=("node",))
+        arriving = m.Coupling.from_edges("arriving", pop, edges, nodes)
+        pop.add_inflow(m.Flow("arrivals", arriving))
+        pop.add_outflow(m.Flow("departures", pop * 0.1))
+
+    results = model.run(duration=3)
+    final = results.loc[3, [f"pop[{i}]" for i in range(nodes)]].to_numpy()
+    assert final.sum() == pytest.approx(initial.sum())
+    assert results.loc[1, "pop[0]"] == pytest.approx(0.1 * 1)
+
+
+def test_function_kernels_run_once_per_subscript_range():
+    calls = []
+
+    def logistic(x, capacity):
+        calls.append(x.shape)
+        return x * (1 - x / capacity)
+
+    class Clipped(m.Kernel):
+        def kernel(self, x, limit):
+            return np.minimum(x, limit)
+
+    with m.Model("kernels", dt=1) as model:
+        pop = m.Stock("pop", initial_value=np.full(100, 10.0), dims=("region",))
+        capacity = m.Constant("capacity", 100)
+        growth = m.Function("growth", logistic, inputs=[pop, capacity], pure=True)
+        pop.add_inflow(m.Flow("births", Clipped("clipped", [growth * 0.1, 5])))
+
+    results = model.run(duration=1)
+    # per recorded step and per derivative evaluation, not per region
+    assert calls == [(100,)] * 3
+    assert results.loc[1, "pop[99]"] == pytest.approx(10 + 0.9)
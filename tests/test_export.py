@@ -0,0 +1,84 @@
+import importlib.util
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import mead as m
+
+
+def _model():
+    with m.Model("exported", dt=0.25) as model:
+        population = m.Stock("population", 100)
+        food = m.Stock("food", 50.0)
+        time = m.Time()
+        rate = m.Constant("rate", 0.05)
+        crowding = m.Table("crowding", population / 100, [(0, 1), (1, 0.8), (2, 0.3)])
+        smooth = m.Smooth("smooth", population, 2, 100)
+        late = m.Delay("late", population * 2, 1.5)
+        pipeline = m.Delay3("pipeline", population, 3, 100)
+        start = m.Initial("start", population * rate + 1)
+        crowded = m.IfThenElse("crowded", population - 120, 1, 0)
+        births = m.Flow(
+            "births",
+            population * rate * crowding
+            + m.Pulse("pulse", 2, 1, 3)
+            + m.Ramp("ramp", 1, 4, 0.5)
+            - m.Step("shock", 5, 0, 10) / 10
+            + m.exp(-time / 10),
+        )
+        eaten = m.Flow(
+            "eaten",
+            m.Min("low", food, population) / 10
+            + crowded
+            + (late - smooth) / 100
+            + start / 100
+            + (pipeline > 90),
+        )
+        population.add_inflow(births)
+        population.add_outflow(m.Flow("deaths", population / 50))
+        food.add_inflow(m.Flow("growth", m.Max("cap", 5, food / 4)))
+        food.add_outflow(eaten)
+    return model
+
+
+def _load(path):
+    spec = importlib.util.spec_from_file_location("exported", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize("method", ["euler", "rk4"])
+def test_exported_module_matches_run(tmp_path, method):
+    model = _model()
+    exported = _load(model.export_python(tmp_path / "exported.py"))
+
+    expected = model.run(duration=10, method=method)
+    results = exported.run(10, method, numpy=True)
+    assert list(results) == ["time", *expected.columns]
+    np.testing.assert_allclose(results["time"], expected.index)
+    for column in expected.columns:
+        np.testing.assert_allclose(results[column], expected[column].astype(float))
+
+
+def test_exported_module_runs_without_dependencies(tmp_path):
+    path = _model().export_python(tmp_path / "exported.py")
+    # no site packages: neither mead, NumPy nor pandas can be imported
+    output = subprocess.run(
+        [sys.executable, "-I", "-S", str(path), "2"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.splitlines()
+    assert output[0].split(",")[:3] == ["time", "growth", "cap"]
+    assert len(output) == 1 + 9
+
+
+def test_export_refuses_python_functions(tmp_path):
+    with m.Model("opaque") as model:
+        stock = m.Stock("stock", 1)
+        stock.add_inflow(m.Flow("inflow", m.Function("f", lambda context: 1.0)))
+    with pytest.raises(ValueError, match="Function 'f'"):
+        model.export_python(tmp_path / "opaque.py")
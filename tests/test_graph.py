@@ -0,0 +1,123 @@
+import pickle
+
+import mead as m
+
+
+def _model(calls):
+    def report(context):
+        calls.append(context["time"])
+        return 0.0
+
+    with m.Model("graph", dt=1) as model:
+        stock = m.Stock("stock", 1)
+        a = m.Auxiliary("a", m.Constant("c", 1))
+        b = m.Auxiliary("b", a * 2 + stock)
+        stock.add_inflow(m.Flow("inflow", b * 0.1))
+        m.Auxiliary("dead", m.Function("report", report) + stock)
+        lagged = m.Delay("lagged", b, 1)
+        m.Auxiliary("shown", lagged + 1)
+    return model, a, b
+
+
+def test_run_skips_elements_that_feed_no_stock_or_output():
+    calls = []
+    model, _, _ = _model(calls)
+
+    results = model.run(duration=2, outputs=["shown"])
+    assert list(results.columns) == ["stock", "shown"]
+    assert calls == []
+    # the delay still finds the history of its input
+    assert results.loc[1, "shown"] == 4
+    assert results.loc[2, "shown"] == 4.3
+
+    assert "dead" in model.run(duration=2).columns
+    assert calls == [0, 1, 2]
+
+
+def test_analyze_reports_graph_statistics():
+    model, a, b = _model([])
+
+    report = model.analyze()
+    assert sorted(report.pruned) == ["dead", "lagged", "report", "shown"]
+    assert report.fan_in["b"] == 2
+    assert report.fan_out["stock"] == 1
+    assert report.loops == []
+    assert report.depth == 7
+    # the constant part of b is hoisted out of the loop
+    assert report.cost < report.nodes
+    assert report.step_cost("rk4") == 4 * report.cost + report.record_cost
+    assert "algebraic loops: 0" in report.summary()
+
+    a.equation = b + 1
+    assert model.analyze().loops == [["b", "a"]]
+
+
+def test_independent_subsystems_run_in_parallel():
+    with m.Model("regions", dt=0.5) as model:
+        for region, rate in (("north", 0.02), ("south", 0.05)):
+            pop = m.Stock(f"{region}_pop", 100)
+            pop.add_inflow(m.Flow(f"{region}_births", pop * rate))
+            m.Delay(f"{region}_lagged", pop, 1)
+
+    parts = sorted(sorted(part) for part in model.subsystems())
+    assert parts == [
+        ["north_births", "north_lagged", "north_pop"],
+        ["south_births", "south_lagged", "south_pop"],
+    ]
+    assert model.analyze().subsystems == 2
+
+    serial = model.run(duration=5, method="rk4")
+    parallel = model.run(duration=5, method="rk4", workers=2)
+    assert sorted(parallel.columns) == sorted(serial.columns)
+    assert parallel[serial.columns].equals(serial)
+
+    outputs = model.run(duration=5, workers=2, outputs=["north_lagged"])
+    assert sorted(outputs.columns) == ["north_lagged", "north_pop", "south_pop"]
+
+
+def test_subsystems_carry_their_own_elements_only():
+    with m.Model("chains", dt=0.5) as model:
+        for chain in range(8):
+            stocks = [m.Stock(f"s{chain}_{i}", 1.0) for i in range(20)]
+            for i, (upstream, downstream) in enumerate(zip(stocks, stocks[1:])):
+                flow = m.Flow(f"f{chain}_{i}", upstream * 0.1)
+                upstream.add_outflow(flow)
+                downstream.add_inflow(flow)
+
+    part = model._subsystem(model.subsystems()[0])
+    assert len(part.stocks) == 20
+    assert all(e.model is part for e in part.elements.values())
+    assert len(pickle.dumps(part)) < len(pickle.dumps(model)) / 4
+    assert model.elements["s0_0"].model is model
+
+
+def _read_north(context):
+    return context["state"]["north"] * 0.1
+
+
+def test_functions_of_the_context_keep_the_model_whole():
+    with m.Model("coupled", dt=0.5) as model:
+        north = m.Stock("north", 100)
+        north.add_inflow(m.Flow("north_births", north * 0.02))
+        south = m.Stock("south", 10)
+        south.add_inflow(m.Flow("migration", m.Function("read", _read_north)))
+
+    assert len(model.subsystems()) == 1
+    serial = model.run(duration=5)
+    parallel = model.run(duration=5, workers=2)
+    assert parallel[serial.columns].equals(serial)
+
+
+def test_long_chains_are_copied_without_recursion():
+    with m.Model("chain", dt=0.5) as model:
+        stocks = [m.Stock(f"s{i}", 1.0) for i in range(2000)]
+        for i, (upstream, downstream) in enumerate(zip(stocks, stocks[1:])):
+            flow = m.Flow(f"f{i}", downstream * 0.1)
+            upstream.add_outflow(flow)
+            downstream.add_inflow(flow)
+
+    part = model._subsystem(model.subsystems()[0])
+    assert len(part.stocks) == 2000
+    assert part.stocks["s1"].inflows[0] is part.elements["f0"]
+    assert part.elements["f0"].equation.dependencies[0] is part.stocks["s1"]
+    assert all(e.model is part for e in part.elements.values())
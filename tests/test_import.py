@@ -0,0 +1,42 @@
+import subprocess
+import sys
+
+# seconds, importing pandas and matplotlib along took over a second
+IMPORT_BUDGET = 0.6
+
+_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import mead
+elapsed = time.perf_counter() - start
+print(elapsed, *sorted(m for m in ("pandas", "matplotlib") if m in sys.modules))
+"""
+
+
+def _import_mead() -> list[str]:
+    return subprocess.run(
+        [sys.executable, "-c", _SCRIPT], capture_output=True, text=True, check=True
+    ).stdout.split()
+
+
+def test_import_leaves_out_pandas_and_matplotlib():
+    elapsed, *heavy = _import_mead()
+    assert heavy == []
+    # the first import may be slowed down by a cold disk cache
+    assert min(float(elapsed), float(_import_mead()[0])) < IMPORT_BUDGET
+
+
+def test_run_and_plot_load_them_on_first_use(tmp_path):
+    script = f"""
+import sys
+import matplotlib
+matplotlib.use("Agg")
+import mead as m
+with m.Model("lazy") as model:
+    m.Stock("stock", 1)
+results = model.run(duration=1)
+assert "pandas" in sys.modules
+model.plot(results, save_path={str(tmp_path / "plot.png")!r})
+"""
+    subprocess.run([sys.executable, "-c", script], check=True)
+    assert (tmp_path / "plot.png").exists()
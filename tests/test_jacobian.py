@@ -0,0 +1,109 @@
+import math
+import numpy as np
+import pytest
+import mead as m
+
+
+def _predator_prey():
+    with m.Model("lotka_volterra", dt=0.1) as model:
+        prey = m.Stock("prey", 10)
+        predators = m.Stock("predators", 5)
+        alpha = m.Constant("alpha", 1.1)
+        beta = m.Constant("beta", 0.4)
+        delta = m.Constant("delta", 0.1)
+        gamma = m.Constant("gamma", 0.4)
+        prey.add_inflow(m.Flow("prey_births", prey * alpha))
+        prey.add_outflow(m.Flow("predation", beta * prey * predators))
+        predators.add_inflow(m.Flow("predator_births", delta * prey * predators))
+        predators.add_outflow(m.Flow("predator_deaths", gamma * predators))
+    return model
+
+
+def test_jacobian_matches_analytic():
+    jacobian = _predator_prey().jacobian()
+    dense = jacobian.to_dense(jacobian(0.0, {"prey": 10, "predators": 5}))
+
+    assert jacobian.stocks == ["prey", "predators"]
+    assert dense[0] == pytest.approx([1.1 - 0.4 * 5, -0.4 * 10])
+    assert dense[1] == pytest.approx([0.1 * 5, 0.1 * 10 - 0.4])
+
+
+def test_jacobian_sparsity_follows_graph():
+    with m.Model("chain", dt=1) as model:
+        stocks = [m.Stock(f"s{i}", 1.0) for i in range(4)]
+        for upstream, downstream in zip(stocks, stocks[1:]):
+            transfer = m.Flow(f"{upstream.name}_out", upstream * 0.5)
+            upstream.add_outflow(transfer)
+            downstream.add_inflow(transfer)
+
+    jacobian = model.jacobian()
+    # sub-diagonal plus diagonal, the last stock has no outflow
+    assert jacobian.nnz == 6
+    assert list(jacobian.indptr) == [0, 1, 3, 5, 6]
+    assert list(jacobian.indices) == [0, 0, 1, 1, 2, 2]
+    assert list(jacobian()) == pytest.approx([-0.5, 0.5, -0.5, 0.5, -0.5, 0.5])
+
+
+def test_opaque_functions_use_colored_finite_differences():
+    with m.Model("opaque", dt=1) as model:
+        stocks = [m.Stock(f"s{i}", float(i + 1)) for i in range(4)]
+        for i, stock in enumerate(stocks):
+            decay = m.Function(
+                f"decay{i}", lambda ctx, n=stock.name: math.exp(ctx["state"][n])
+            )
+            stock.add_outflow(m.Flow(f"out{i}", decay))
+
+    jacobian = model.jacobian()
+    # diagonal pattern discovered by probing, a single color suffices
+    assert jacobian.nnz == 4
+    assert max(jacobian.colors) == 0
+
+    values = jacobian()
+    assert values == pytest.approx([-math.exp(i + 1) for i in range(4)], rel=1e-6)
+
+
+def test_opaque_functions_get_plain_numbers():
+    with m.Model("numpy", dt=1) as model:
+        x = m.Stock("x", 0.5)
+        y = m.Stock("y", 2.0)
+        x.add_outflow(
+            m.Flow(
+                "saturation", m.Function("f", lambda ctx: np.tanh(ctx["state"]["x"]))
+            )
+        )
+        y.add_outflow(m.Flow("decay", y * x))
+
+    jacobian = model.jacobian()
+    assert jacobian.opaque_rows == [0]
+    dense = jacobian.to_dense(jacobian())
+    assert dense[0, 0] == pytest.approx(np.tanh(0.5) ** 2 - 1, rel=1e-6)
+    assert list(dense[1]) == pytest.approx([-2.0, -0.5])
+
+
+class _Saturation(m.Kernel):
+    def kernel(self, x, gain):
+        return np.tanh(gain * x)
+
+
+def _saturating():
+    with m.Model("kernel", dt=0.1) as model:
+        x = m.Stock("x", 0.5)
+        gain = m.Constant("gain", 0.5)
+        x.add_outflow(m.Flow("saturation", _Saturation("saturated", [x, gain])))
+    return model
+
+
+def test_numpy_kernels_are_differentiated_by_finite_differences():
+    model = _saturating()
+    jacobian = model.jacobian()
+    assert jacobian.opaque_rows == [0]
+    assert jacobian()[0] == pytest.approx(-0.5 / np.cosh(0.25) ** 2, rel=1e-6)
+
+    forward = model.run(duration=2, sensitivities=["gain"])
+    gradient = model.gradient(lambda r: r["x"][-1], duration=2)
+    h = 1e-6
+    shifted = _saturating()
+    shifted.elements["gain"].value += h
+    fd = (shifted.run(duration=2).loc[2, "x"] - model.run(duration=2).loc[2, "x"]) / h
+    assert forward.loc[2, "d(x)/d(gain)"] == pytest.approx(fd, rel=1e-4)
+    assert gradient["gain"] == pytest.approx(fd, rel=1e-4)
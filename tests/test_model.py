@@ -1,4 +1,6 @@
-from mead import Model, Flow, Stock, Constant, Delay
+import math
+
+from mead import Model, Flow, Stock, Constant, Delay, Function
 import pytest
 
 # Dummy context for testing elements in isolation within tests
@@ -508,3 +510,22 @@ def test_model_can_be_extended_from_another_model():
     assert (
         results.loc[5, "child_stock"] == 20
     )  # parent = 4 -> 5, child(12) + 4 * 2 = 20
+
+
+def test_run_reuses_one_context_and_solver_buffers():
+    contexts, states = set(), set()
+
+    def rate(context):
+        contexts.add(id(context))
+        states.add(id(context["state"]))
+        return 0.1 * context["state"]["stock"]
+
+    with Model("reuse", dt=1) as model:
+        stock = Stock("stock", 100)
+        stock.add_inflow(Flow("inflow", Function("rate", rate)))
+
+    results = model.run(duration=20, method="rk4")
+    assert len(contexts) == 1
+    # the initial state, the stage buffer and two alternating state buffers
+    assert len(states) == 4
+    assert results.loc[1, "stock"] == pytest.approx(100 * math.exp(0.1), rel=1e-6)
@@ -0,0 +1,101 @@
+import pytest
+import mead as m
+
+
+def _tank():
+    with m.Model("tank", dt=1) as tank:
+        level = m.Stock("level", 10)
+        level.add_outflow(m.Flow("drain", level * m.Constant("rate", 0.1)))
+    return tank
+
+
+def test_instances_share_one_batched_copy():
+    tank = _tank()
+    with m.Model("site", dt=1) as site:
+        total = m.Stock("total", 0)
+    tanks = [
+        site.include(tank, prefix=f"tank_{i}", rate=0.1 + 0.01 * i, level=10 + i)
+        for i in range(200)
+    ]
+    with site:
+        total.add_inflow(m.Flow("collected", tanks[7]["drain"] + tanks[3]["drain"]))
+
+    results = site.run(duration=3)
+    assert results.loc[3, "tank_7.level"] == pytest.approx(17 * (1 - 0.17) ** 3)
+    assert results.loc[3, "tank_199.level"] == pytest.approx(209 * (1 - 2.09) ** 3)
+    assert results.loc[1, "total"] == pytest.approx(17 * 0.17 + 13 * 0.13)
+
+    # one stock integrated for all the instances, the included model untouched
+    assert list(site.stocks) == ["total", "tank.level"]
+    assert site.stocks["tank.level"].dims == ("tank_instance",)
+    assert tank.stocks["level"].initial_value == 10
+
+
+def test_invalid_instances():
+    tank = _tank()
+    site = m.Model("site")
+    site.include(tank, prefix="first")
+    with pytest.raises(ValueError):
+        site.include(tank, prefix="first")
+    with pytest.raises(ValueError):
+        site.include(tank, prefix="second", drain=1)
+    with pytest.raises(ValueError):
+        site.include(_tank(), prefix="third")
+
+
+def _pipeline(rate=1.0, delay_time=2.0):
+    with m.Model("pipeline", dt=0.25) as pipeline:
+        source = m.Stock("source", 5)
+        source.add_inflow(m.Flow("feed", m.Constant("rate", rate) * 2))
+        late = m.DelayN("late", source * 0.5, m.Constant("delay_time", delay_time))
+        belt = m.Conveyor("belt", source * 0.25, 1)
+        source.add_outflow(m.Flow("ship", late + belt))
+    return pipeline
+
+
+@pytest.mark.parametrize("method", ["euler", "rk4"])
+def test_delays_run_per_instance(method):
+    pipeline = _pipeline()
+    site = m.Model("site", dt=0.25)
+    site.include(pipeline, prefix="a")
+    site.include(pipeline, prefix="b", rate=2.0, delay_time=3.0)
+    results = site.run(duration=8, method=method)
+
+    for prefix, alone in (("a", _pipeline()), ("b", _pipeline(2.0, 3.0))):
+        expected = alone.run(duration=8, method=method)
+        for name in ("source", "late", "belt"):
+            assert results[f"{prefix}.{name}"].to_list() == pytest.approx(
+                expected[name].to_list()
+            )
+
+
+def test_models_acting_on_the_whole_context_are_refused():
+    with m.Model("policy") as policy:
+        stock = m.Stock("stock", 10)
+        stock.add_inflow(m.Flow("relief", m.Policy("relief", stock < 5, 1)))
+    with m.Model("opaque") as opaque:
+        m.Function("read", lambda context: context["state"]["stock"])
+
+    site = m.Model("site")
+    with pytest.raises(ValueError, match="Policy"):
+        site.include(policy, prefix="p")
+    with pytest.raises(ValueError, match="declared inputs"):
+        site.include(opaque, prefix="o")
+
+
+def test_values_the_same_for_every_instance_are_split_per_instance():
+    with m.Model("plant", dt=1) as plant:
+        level = m.Stock("level", 1)
+        step = m.Step("step", 2, 0, m.Constant("height", 3))
+        m.Smooth("smooth", level, 2)
+        level.add_inflow(m.Flow("fill", step))
+    site = m.Model("site", dt=1)
+    site.include(plant, prefix="a")
+    site.include(plant, prefix="b", level=2, height=4)
+
+    for results in (site.run(duration=4), site.run(duration=4, native=True)):
+        columns = list(results.columns)
+        assert not [c for c in columns if c.startswith("plant.")]
+        assert list(results["a.step"]) == [0, 0, 3, 3, 3]
+        assert list(results["b.step"]) == [0, 0, 4, 4, 4]
+        assert list(results["b.smooth"])[:2] == [0, 1]
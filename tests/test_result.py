@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import mead as m
+
+
+def _model():
+    with m.Model("regions", dt=0.5) as model:
+        pop = m.Stock("pop", initial_value=[100.0, 50.0], dims=("region",))
+        rate = m.Constant("rate", 0.1)
+        pop.add_inflow(m.Flow("births", pop * rate))
+        m.Auxiliary("total", pop.sum("region"))
+    return model
+
+
+def test_native_result_matches_dataframe():
+    model = _model()
+    frame = model.run(duration=3)
+    result = model.run(duration=3, native=True)
+
+    assert isinstance(result, m.SimulationResult)
+    assert list(result) == list(frame.columns)
+    assert result.model == "regions" and result.dt == 0.5
+    assert result.method == "euler" and result.parameters == {"rate": 0.1}
+    np.testing.assert_array_equal(result.time, frame.index)
+    np.testing.assert_array_equal(result["pop[1]"], frame["pop[1]"])
+    pd.testing.assert_frame_equal(result.to_pandas(), frame, check_dtype=False)
+
+
+def test_conversions_share_memory():
+    result = _model().run(duration=3, native=True)
+
+    assert result["total"].base is result.values
+    assert np.shares_memory(result.to_numpy(), result.values)
+    column = result.columns["births[0]"]
+    assert result.to_numpy()[:, column].tolist() == result["births[0]"].tolist()
+    assert np.shares_memory(result.to_pandas().to_numpy(), result.values)
+
+
+def test_to_arrow():
+    pa = pytest.importorskip("pyarrow")
+    table = _model().run(duration=1, native=True).to_arrow()
+    assert isinstance(table, pa.Table)
+    assert table.column_names[0] == "time"
+
+
+def test_sensitivities_and_workers():
+    with m.Model("growth", dt=1.0) as model:
+        population = m.Stock("population", 100)
+        rate = m.Constant("rate", 0.1)
+        population.add_inflow(m.Flow("births", population * rate))
+        other = m.Stock("other", 1)
+        other.add_inflow(m.Flow("more", other * 2))
+
+    result = model.run(duration=3, sensitivities=[rate], native=True)
+    assert result["d(population)/d(rate)"][3] == pytest.approx(300 * 1.1**2)
+
+    parallel = model.run(duration=3, workers=2, native=True)
+    assert sorted(parallel) == sorted(model.run(duration=3).columns)
+    assert parallel["other"][-1] == 27
@@ -0,0 +1,82 @@
+import pytest
+import mead as m
+from mead.sensitivity import Dual
+
+
+def test_dual_arithmetic():
+    x = Dual.seed("x", 3.0)
+    y = Dual.seed("y", 2.0)
+    eq = (x * y + 1) / y - x
+    # d/dx = 1 - 1 = 0, d/dy = -1/y^2 = -0.25
+    assert eq.value == pytest.approx(0.5)
+    assert eq.derivative("x") == pytest.approx(0.0)
+    assert eq.derivative("y") == pytest.approx(-0.25)
+
+
+def test_dual_comparisons_use_values():
+    x = Dual.seed("x", 3.0)
+    assert x > 2
+    assert x == 3
+    assert min(x, Dual(1.0)).value == 1.0
+
+
+def test_exponential_growth_sensitivity():
+    with m.Model("growth", dt=1.0) as model:
+        population = m.Stock("population", 100)
+        rate = m.Constant("rate", 0.1)
+        population.add_inflow(m.Flow("births", population * rate))
+
+    results = model.run(duration=3, sensitivities=[rate])
+
+    # population(n) = 100 * (1 + rate)^n
+    assert results.loc[3, "population"] == pytest.approx(133.1)
+    # d/d(rate) = 100 * n * (1 + rate)^(n - 1)
+    assert results.loc[3, "d(population)/d(rate)"] == pytest.approx(300 * 1.1**2)
+
+
+@pytest.mark.parametrize("method", ["euler", "rk4"])
+def test_sensitivity_matches_finite_differences(method):
+    def build(rate_value, target_value):
+        with m.Model("fd", dt=0.5) as model:
+            stock = m.Stock("stock", 10)
+            rate = m.Constant("rate", rate_value)
+            target = m.Constant("target", target_value)
+            effect = m.Table("effect", stock, [(0, 0.0), (20, 1.0), (40, 0.5)])
+            limited = m.Min("limited", target - stock, stock * rate)
+            inflow = m.IfThenElse("inflow", target - stock, limited * effect, 0)
+            stock.add_inflow(m.Flow("growth", inflow))
+        return model
+
+    results = build(0.3, 50).run(
+        duration=10, method=method, sensitivities=["rate", "target"]
+    )
+
+    h = 1e-6
+    for name, args in (("rate", (0.3 + h, 50)), ("target", (0.3, 50 + h))):
+        bumped = build(*args).run(duration=10, method=method)
+        fd = (bumped.loc[10, "stock"] - results.loc[10, "stock"]) / h
+        assert results.loc[10, f"d(stock)/d({name})"] == pytest.approx(fd, rel=1e-4)
+
+
+def test_sensitivity_requires_constant():
+    with m.Model("bad", dt=1.0) as model:
+        stock = m.Stock("stock", 1)
+
+    with pytest.raises(ValueError):
+        model.run(duration=1, sensitivities=[stock])
+
+
+def test_math_functions_carry_derivatives():
+    with m.Model("decay", dt=0.1) as model:
+        k = m.Constant("k", 0.5)
+        level = m.Stock("level", 1.0)
+        level.add_inflow(m.Flow("growth", m.exp(-k) * m.sqrt(level) + level**k))
+
+    results = model.run(duration=1, sensitivities=["k"])
+    h = 1e-6
+    with m.Model("decay", dt=0.1) as shifted:
+        k = m.Constant("k", 0.5 + h)
+        level = m.Stock("level", 1.0)
+        level.add_inflow(m.Flow("growth", m.exp(-k) * m.sqrt(level) + level**k))
+    fd = (shifted.run(duration=1).loc[1, "level"] - results.loc[1, "level"]) / h
+    assert results.loc[1, "d(level)/d(k)"] == pytest.approx(fd, rel=1e-4)
@@ -0,0 +1,77 @@
+import json
+
+import numpy as np
+import pytest
+
+import mead as m
+from mead.serialize import register
+
+
+def _model():
+    with m.Model("shipped", dt=0.5) as model:
+        pop = m.Stock("pop", initial_value=np.array([10.0, 20.0, 5.0]), dims=("node",))
+        source = m.Stock("source", 50)
+        spread = m.Coupling.from_edges(
+            "spread", pop, [(0, 1, 0.1), (1, 2, 0.2), (2, 0, 0.3)], 3
+        )
+        pop.add_inflow(m.Flow("arrivals", spread + m.Function("grow", np.sqrt, [pop])))
+        pop.add_outflow(m.Flow("departures", pop * m.Constant("rate", 0.05)))
+        pipeline = m.DelayN("pipeline", pop.sum("node"), 2, order=4)
+        lookup = m.Table("lookup", pipeline, [(0, 0), (100, 1)])
+        relief = m.Policy("relief", source < 45, 10)
+        source.add_outflow(m.Flow("drain", lookup + relief))
+    return model
+
+
+def test_round_trip_runs_the_same():
+    model = _model()
+    data = model.to_bytes()
+    assert json.loads(data)["version"] == 1
+
+    copy = m.Model.from_bytes(data)
+    assert copy.name == "shipped" and copy.dt == 0.5
+    assert copy.stocks["pop"].dims == ("node",)
+    assert copy.run(duration=10).equals(_model().run(duration=10))
+
+
+def test_custom_elements_need_registering():
+    class Doubled(m.Kernel):
+        def kernel(self, x):
+            return 2 * x
+
+    with m.Model("custom") as model:
+        stock = m.Stock("stock", 1)
+        stock.add_inflow(m.Flow("inflow", Doubled("doubled", [stock])))
+
+    with pytest.raises(ValueError, match="register"):
+        model.to_bytes()
+    register(Doubled)
+    copy = m.Model.from_bytes(model.to_bytes())
+    assert copy.run(duration=2).equals(model.run(duration=2))
+
+
+def test_lambdas_and_unknown_versions_are_refused():
+    with m.Model("opaque") as model:
+        m.Function("f", lambda context: 1.0)
+    with pytest.raises(ValueError, match="module-level"):
+        model.to_bytes()
+
+    data = json.loads(_model().to_bytes())
+    data["version"] += 1
+    with pytest.raises(ValueError, match="version"):
+        m.Model.from_bytes(json.dumps(data).encode())
+
+
+class _Controller:
+    def __init__(self, gain):
+        self.gain = gain
+
+    def step(self, context):
+        return self.gain
+
+
+def test_bound_methods_are_refused():
+    with m.Model("bound") as model:
+        m.Function("f", _Controller(2.0).step)
+    with pytest.raises(ValueError, match="module-level"):
+        model.to_bytes()
@@ -0,0 +1,79 @@
+import pytest
+
+import mead as m
+
+
+def _model(fail_after=None):
+    def check(context):
+        if fail_after is not None and context["time"] > fail_after:
+            raise RuntimeError("worker died")
+        return 0.0
+
+    with m.Model("long", dt=0.25) as model:
+        stock = m.Stock("stock", 100)
+        supply = m.Stock("supply", 10)
+        late = m.Delay("late", stock, 1.5)
+        smooth = m.Smooth("smooth", stock, 2, 100)
+        relief = m.Policy("relief", stock > 110, 5)
+        start = m.Initial("start", stock * 2)
+        stock.add_inflow(
+            m.Flow("inflow", (late - smooth) / 10 + m.Step("shock", 3, 1, 4) + relief)
+        )
+        stock.add_outflow(m.Flow("outflow", stock / start + m.Function("check", check)))
+        supply.add_inflow(m.Flow("restock", supply * 0.01))
+    return model
+
+
+@pytest.mark.parametrize("method", ["euler", "rk4"])
+def test_resumed_run_continues_exactly(method):
+    expected = _model().run(duration=10, method=method)
+
+    model = _model()
+    first = model.run(duration=6, method=method)
+    snapshot = model.snapshot()
+    assert snapshot.time == 6
+    # delays look back 1.5, the rest of the history is left out
+    assert len(snapshot.history) < len(first) / 2
+
+    resumed = _model().run(duration=4, method=method, start_from=snapshot)
+    assert resumed.index[0] == 6 and resumed.index[-1] == 10
+    assert resumed.equals(expected.loc[6:])
+
+
+def test_checkpoints_survive_a_failed_run(tmp_path):
+    path = tmp_path / "long.snapshot"
+    with pytest.raises(RuntimeError, match="worker died"):
+        _model(fail_after=9).run(duration=10, checkpoint_every=2, checkpoint_path=path)
+
+    snapshot = m.Snapshot.load(path)
+    assert snapshot.time == 8
+    resumed = _model().run(duration=2, start_from=snapshot)
+    assert resumed.equals(_model().run(duration=10).loc[8:])
+
+
+def test_snapshots_are_checked():
+    model = _model()
+    with pytest.raises(ValueError, match="not been run"):
+        model.snapshot()
+    model.run(duration=1)
+    other = m.Model("other", dt=0.5)
+    with pytest.raises(ValueError, match="dt"):
+        other.run(duration=1, start_from=model.snapshot())
+    with pytest.raises(ValueError, match="multiple of dt"):
+        model.run(duration=1, checkpoint_every=0.1, checkpoint_path="unused")
+
+
+def test_policies_fired_before_the_snapshot_stay_fired():
+    def policy_model():
+        with m.Model("policy", dt=1) as model:
+            stock = m.Stock("stock", 100)
+            bonus = m.Policy("bonus", stock + stock > 200, 10)
+            stock.add_inflow(m.Flow("inflow", bonus + 1))
+        return model
+
+    expected = policy_model().run(duration=6)
+    model = policy_model()
+    model.run(duration=3)
+    resumed = policy_model().run(duration=3, start_from=model.snapshot())
+    assert resumed.loc[6, "stock"] == expected.loc[6, "stock"] == 116
+    assert resumed.equals(expected.loc[3:])